@@ -1,15 +1,318 @@
 # advanced_predictor.py - VERSION CORRIGÉE COMPLÈTE
 import math, random
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional, Union
+from functools import cached_property
+from typing import Dict, List, Tuple, Optional, Sequence, Union
 import logging
 
+import numpy as np
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Profondeurs relevées sur les spots connus : (lat, lon) -> profondeur (m), type de fond
+KNOWN_DEPTHS = {
+    (36.9000, 10.3333): {"depth": 5.0, "type": "sand"},
+    (36.8185, 10.3050): {"depth": 8.0, "type": "mixed"},
+    (36.8687, 10.3418): {"depth": 15.0, "type": "rock"},
+    (36.8475, 11.0940): {"depth": 20.0, "type": "rock"},
+    (37.2747, 9.8739): {"depth": 12.0, "type": "mud"},
+    (36.9540, 8.7580): {"depth": 25.0, "type": "rock"},
+    (35.8254, 10.6360): {"depth": 6.0, "type": "sand"},
+    (35.7833, 10.8333): {"depth": 4.0, "type": "sand"},
+    (33.8078, 10.8451): {"depth": 2.0, "type": "sand"},
+    (36.4000, 10.6000): {"depth": 3.0, "type": "sand"}
+}
+
+# ===== TABLES DU MODÈLE (PARTAGÉES PAR LE CALCUL SCALAIRE ET VECTORISÉ) =====
+SEASONAL_CHLOROPHYLL = {1: 0.3, 2: 0.4, 3: 0.8, 4: 1.5, 5: 2.2, 6: 1.8,
+                        7: 1.2, 8: 0.9, 9: 0.7, 10: 0.5, 11: 0.4, 12: 0.3}
+
+# (lat min, lon min, lat max, lon max)
+COASTAL_ZONES = [
+    (36.0, 10.0, 37.5, 11.5),
+    (35.5, 10.5, 36.5, 11.5),
+    (34.5, 10.0, 35.5, 11.0),
+    (33.0, 10.5, 34.0, 11.5),
+    (36.7, 8.5, 37.0, 9.5),
+    (35.0, 11.0, 35.5, 11.5)
+]
+
+# Températures moyennes de l'eau par région et par mois
+WATER_TEMP_NORTH = {1:14,2:14,3:15,4:17,5:20,6:23,7:26,8:27,9:25,10:22,11:19,12:16}
+WATER_TEMP_CENTER = {1:15,2:15,3:16,4:18,5:21,6:24,7:27,8:28,9:26,10:23,11:20,12:17}
+WATER_TEMP_SOUTH = {1:16,2:16,3:17,4:19,5:22,6:25,7:28,8:29,9:27,10:24,11:21,12:18}
+
+WIND_TOLERANCE_MAX = {"low": 15, "medium": 25, "high": 40}
+WAVE_TOLERANCE_MAX = {"low": 0.5, "medium": 1.0, "high": 2.0}
+
+# Pondérations par groupe d'espèces (None : autres espèces)
+WEATHER_FACTOR_WEIGHTS = {
+    ("loup", "pageot"): {'temp': 0.3, 'wind': 0.2, 'wave': 0.15, 'pressure': 0.15, 'oxygen': 0.2},
+    ("daurade", "sar"): {'temp': 0.25, 'wind': 0.15, 'wave': 0.25, 'pressure': 0.15, 'oxygen': 0.2},
+    None: {'temp': 0.25, 'wind': 0.2, 'wave': 0.2, 'pressure': 0.15, 'oxygen': 0.2}
+}
+ENVIRONMENTAL_WEIGHTS = {
+    ("loup", "pageot"): {
+        'temp': 0.12, 'wind': 0.10, 'pressure': 0.08, 'wave': 0.10,
+        'oxygen': 0.15, 'chlorophyll': 0.12, 'current': 0.10,
+        'turbidity': 0.05, 'weather': 0.18
+    },
+    ("daurade", "sar"): {
+        'temp': 0.10, 'wind': 0.08, 'pressure': 0.06, 'wave': 0.12,
+        'oxygen': 0.14, 'chlorophyll': 0.15, 'current': 0.08,
+        'turbidity': 0.06, 'weather': 0.21
+    },
+    None: {
+        'temp': 0.15, 'wind': 0.12, 'pressure': 0.08, 'wave': 0.10,
+        'oxygen': 0.18, 'chlorophyll': 0.10, 'current': 0.12,
+        'turbidity': 0.05, 'weather': 0.10
+    }
+}
+
+# Bonus régional : espèces favorisées par zone (zones testées dans cet ordre)
+REGIONAL_SPECIES = {
+    'north': (["loup", "daurade", "corbeau", "merlan"], 0.3),
+    'cap_bon': (["thon", "espadon", "sériole", "bonite"], 0.4),
+    'sahel': (["daurade", "sar", "marbré", "mulet"], 0.3),
+    'south': (["daurade", "mulet", "marbré", "orphie"], 0.2)
+}
+_WINTER_ADJUSTMENT = {"loup": 0.2, "daurade": 0.1, "merlan": 0.3, "corbeau": 0.2}
+_SUMMER_ADJUSTMENT = {"daurade": 0.3, "mulet": 0.4, "marbré": 0.3, "sériole": 0.2}
+SEASONAL_ADJUSTMENT = {12: _WINTER_ADJUSTMENT, 1: _WINTER_ADJUSTMENT, 2: _WINTER_ADJUSTMENT,
+                       6: _SUMMER_ADJUSTMENT, 7: _SUMMER_ADJUSTMENT, 8: _SUMMER_ADJUSTMENT}
+
+# Colonnes météo lues par predict_batch
+BATCH_WEATHER_COLUMNS = ('temperature', 'wind_speed', 'pressure', 'wave_height', 'salinity',
+                         'water_temperature', 'turbidity')
+
+LUNAR_CYCLE = 29.53
+TIDE_CYCLE = 12.4
+
+# Codes des profils compilés (valeur absente de la table : dernier code)
+DIEL_CODES = {"diurnal": 0, "nocturnal": 1, "crepuscular": 2}  # autre : 3
+MOON_CODES = {"moderate": 1, "high": 2}  # autre : 0
+TURBIDITY_CODES = {"low": 1, "high": 2}  # autre : 0
+# Ordre des pondérations compilées (ordre des sommes des scores)
+WEATHER_WEIGHT_KEYS = ('temp', 'wind', 'wave', 'pressure', 'oxygen')
+ENVIRONMENTAL_WEIGHT_KEYS = ('temp', 'wind', 'pressure', 'wave', 'oxygen', 'chlorophyll', 'current',
+                             'turbidity', 'weather')
+
+
+def _group_weights(table: Dict, species: str) -> Dict:
+    """Pondérations du groupe de l'espèce"""
+    for group, weights in table.items():
+        if group and species in group:
+            return weights
+    return table[None]
+
+
+def _quantize(value: float, digits: int) -> float:
+    """Arrondi des entrées mémoïsées (même résultat que np.rint(value * 10**digits) / 10**digits)"""
+    scale = 10 ** digits
+    return round(value * scale) / scale
+
+
+def _round_vec(values, digits: int) -> np.ndarray:
+    """round() élément par élément (np.round diffère sur les valeurs à mi-chemin)"""
+    return np.array([round(float(value), digits) for value in np.ravel(values)]).reshape(np.shape(values))
+
+
+class CompiledProfile:
+    """Profil d'espèce compilé au chargement : seuils numériques, codes et pondérations
+    
+    Lu directement par les scores scalaires ; profile_table en est la version
+    colonnaire (une ligne par index) pour predict_batch.
+    """
+
+    __slots__ = ('code', 'index', 'name', 'temp_opt', 'temp_tolerance', 'wind_max', 'wave_max',
+                 'oxygen_min', 'oxygen_low', 'oxygen_high', 'chl_low', 'chl_high',
+                 'current_low', 'current_high', 'turbidity', 'spawning_start', 'spawning_end',
+                 'diel', 'moon', 'base_feeding', 'weather_weights', 'env_weights')
+
+    # Champs numériques repris dans profile_table
+    NUMERIC_FIELDS = ('temp_opt', 'temp_tolerance', 'wind_max', 'wave_max', 'oxygen_min', 'oxygen_low',
+                      'oxygen_high', 'chl_low', 'chl_high', 'current_low', 'current_high', 'turbidity',
+                      'spawning_start', 'spawning_end', 'diel', 'moon', 'base_feeding')
+
+    def __init__(self, code: str, index: int, profile: Dict, temp_opt: float):
+        self.code = code
+        self.index = index
+        self.name = profile.get('name', code)
+        self.temp_opt = temp_opt
+        self.temp_tolerance = profile["temp_tolerance"]
+        self.wind_max = WIND_TOLERANCE_MAX[profile.get("wind_tolerance", "medium")]
+        self.wave_max = WAVE_TOLERANCE_MAX[profile.get("wave_tolerance", "medium")]
+        self.oxygen_min = profile.get("oxygen_min", 3.5)
+        self.oxygen_low, self.oxygen_high = profile.get("oxygen_optimal", [5.0, 8.0])
+        self.chl_low, self.chl_high = profile.get("chlorophyll_optimal", [0.8, 3.0])
+        self.current_low, self.current_high = profile.get("current_preference", [0.1, 0.8])
+        self.turbidity = TURBIDITY_CODES.get(profile.get('turbidity_tolerance'), 0)
+        self.spawning_start, self.spawning_end = profile.get("spawning_season", []) or [13, 0]  # saison vide : jamais
+        self.diel = DIEL_CODES.get(profile["diel_pattern"], 3)
+        self.moon = MOON_CODES.get(profile.get("moon_sensitivity", "moderate"), 0)
+        feeding_intensity = profile.get("feeding_intensity", [0.6, 0.8])
+        self.base_feeding = (feeding_intensity[0] + feeding_intensity[1]) / 2
+        weather_weights = _group_weights(WEATHER_FACTOR_WEIGHTS, code)
+        env_weights = _group_weights(ENVIRONMENTAL_WEIGHTS, code)
+        self.weather_weights = tuple(weather_weights.get(key, 0) for key in WEATHER_WEIGHT_KEYS)
+        self.env_weights = tuple(env_weights.get(key, 0) for key in ENVIRONMENTAL_WEIGHT_KEYS)
+
+
+class SubModelMemo:
+    """Mémoïsation bornée des sous-modèles physiques purs
+    
+    Une table LRU de maxsize entrées par sous-modèle, indexée par ses entrées
+    quantifiées ; la valeur est toujours calculée à partir de ces entrées
+    quantifiées, elle ne dépend donc pas de l'ordre des appels.
+    invalidate() vide les tables après une modification des profils d'espèces
+    ou des constantes ; maxsize = 0 désactive la mémoïsation.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._tables: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def get(self, name: str, key: Tuple, compute, *args):
+        """Valeur de compute(*args) pour key, calculée au premier appel"""
+        if self.maxsize <= 0:
+            return compute(*args)
+        with self._lock:
+            table = self._tables.setdefault(name, OrderedDict())
+            stats = self.stats.setdefault(name, {'hits': 0, 'misses': 0, 'evictions': 0})
+            if key in table:
+                table.move_to_end(key)
+                stats['hits'] += 1
+                return table[key]
+            stats['misses'] += 1
+        value = compute(*args)
+        with self._lock:
+            table[key] = value
+            if len(table) > self.maxsize:
+                table.popitem(last=False)
+                stats['evictions'] += 1
+        return value
+
+    def invalidate(self, name: str = None):
+        """Vide la table de name, ou toutes les tables"""
+        with self._lock:
+            if name is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(name, None)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                name: {**stats, 'entries': len(self._tables.get(name, ())),
+                       'hit_rate': round(stats['hits'] / max(1, stats['hits'] + stats['misses']), 3)}
+                for name, stats in self.stats.items()
+            }
+
+
+class PredictionContext:
+    """Facteurs d'une prédiction, calculés une seule fois et partagés par tous les scores
+    
+    Horloge fixe : les termes datés (eau estimée, chlorophylle, courant, frai)
+    utilisent date, l'horodatage de la situation prédite (défaut : l'instant de
+    création du contexte), jamais datetime.now() en cours de calcul.
+    Sans position, chlorophylle et courant sont lus dans weather_data.
+    """
+
+    def __init__(self, predictor: 'ScientificFishingPredictor', weather_data: Dict, species: str,
+                 date: datetime = None, lat: float = None, lon: float = None):
+        self.predictor = predictor
+        self.weather = weather_data
+        self.species = species
+        self.profile = predictor.compiled_profile(species)
+        self.date = date or datetime.now()
+        self.lat = lat
+        self.lon = lon
+        self.has_position = lat is not None and lon is not None
+
+    @cached_property
+    def water_temperature(self) -> float:
+        if 'water_temperature' in self.weather:
+            return self.weather['water_temperature']
+        if self.has_position:
+            return self.predictor.estimate_water_from_position(self.lat, self.lon, self.date)
+        return self.weather.get('temperature', 20)
+
+    @cached_property
+    def oxygen(self) -> float:
+        return self.predictor.calculate_dissolved_oxygen(
+            self.water_temperature,
+            self.weather.get('salinity', self.predictor.SALINITY_MEDITERRANEAN),
+            self.weather.get('pressure', self.predictor.ATMOSPHERIC_PRESSURE_SEA)
+        )
+
+    @cached_property
+    def chlorophyll(self) -> float:
+        if self.has_position:
+            return self.predictor.estimate_chlorophyll(self.date.month, self.lat, self.lon)
+        return self.weather.get('chlorophyll', 1.5)
+
+    @cached_property
+    def current(self) -> Dict:
+        if self.has_position:
+            return self.predictor.calculate_tidal_current(self.lat, self.lon, self.date)
+        return {'speed_mps': self.weather.get('current_speed', 0.2)}
+
+    # ----- Termes communs aux scores météo et environnemental -----
+
+    @cached_property
+    def temp_score(self) -> float:
+        temp_diff = abs(self.weather.get('temperature', 20) - self.profile.temp_opt)
+        return max(0, 1 - temp_diff / self.profile.temp_tolerance)
+
+    @cached_property
+    def pressure_score(self) -> float:
+        return max(0, 1 - abs(self.weather.get('pressure', 1015) - 1015) / 30)
+
+    @cached_property
+    def oxygen_score(self) -> float:
+        profile = self.profile
+        if self.oxygen < profile.oxygen_min:
+            return 0.0
+        if self.oxygen < profile.oxygen_low:
+            return self.oxygen / profile.oxygen_low
+        if self.oxygen > profile.oxygen_high:
+            return max(0, 1 - (self.oxygen - profile.oxygen_high) / profile.oxygen_high)
+        return 1.0
+
+    @cached_property
+    def weather_factor(self) -> float:
+        return self.predictor.calculate_weather_factor(self.weather, self.species, context=self)
+
+    @cached_property
+    def environmental_score(self) -> float:
+        return self.predictor.calculate_environmental_score(self.weather, self.species, context=self)
+
+    @cached_property
+    def enhanced_weather(self) -> Dict:
+        """weather_data complété des facteurs scientifiques (recommandations, heures optimales)"""
+        enhanced_weather = self.weather.copy()
+        enhanced_weather.update({
+            'oxygen': self.oxygen,
+            'chlorophyll': self.chlorophyll,
+            'current_speed': self.current['speed_mps'],
+            'water_temperature': self.water_temperature,
+            'lat': self.lat,
+            'lon': self.lon
+        })
+        return enhanced_weather
+
+
 class ScientificFishingPredictor:
-    def __init__(self):
+    def __init__(self, memo_size: int = 4096):
+        # Sous-modèles purs mémoïsés (invalider après modification des profils)
+        self.memo = SubModelMemo(memo_size)
+        
         # Profils des espèces améliorés avec plus de données
         self.species_profiles = {
             "loup": {
@@ -129,17 +432,45 @@ class ScientificFishingPredictor:
         self.SALINITY_MEDITERRANEAN = 38.0
         self.ATMOSPHERIC_PRESSURE_SEA = 1013.25
         
+        self.compile_profiles()
         logger.info("ScientificFishingPredictor initialisé avec %d espèces", len(self.species_profiles))
 
+    def compile_profiles(self):
+        """Compile species_profiles (profils et table colonnaire) ; à rappeler après
+        toute modification des profils, vide aussi les sous-modèles mémoïsés"""
+        profiles = {code: CompiledProfile(code, index, profile, self._mean(profile["temp_optimal"]))
+                    for index, (code, profile) in enumerate(self.species_profiles.items())}
+        ordered = list(profiles.values())
+        table = {field: np.array([getattr(profile, field) for profile in ordered], dtype=float)
+                 for field in CompiledProfile.NUMERIC_FIELDS}
+        for i, key in enumerate(WEATHER_WEIGHT_KEYS):
+            table[f'wf_{key}'] = np.array([profile.weather_weights[i] for profile in ordered], dtype=float)
+        for i, key in enumerate(ENVIRONMENTAL_WEIGHT_KEYS):
+            table[f'env_{key}'] = np.array([profile.env_weights[i] for profile in ordered], dtype=float)
+        self.profiles, self.profile_table = profiles, table
+        self.memo.invalidate()
+
+    def compiled_profile(self, species: str) -> CompiledProfile:
+        """Profil compilé de species ('loup' pour une espèce inconnue)"""
+        profile = self.profiles.get(species)
+        return profile if profile is not None else self.profiles["loup"]
+
     # ===== MÉTHODES SCIENTIFIQUES =====
     
     def calculate_dissolved_oxygen(self, water_temp: float, salinity: float = None, 
                                   pressure: float = None) -> float:
-        """Calcule l'oxygène dissous (mg/L)"""
+        """Calcule l'oxygène dissous (mg/L), mémoïsé au 0,1 °C / 0,1 PSU / 0,1 hPa"""
         try:
             salinity = salinity or self.SALINITY_MEDITERRANEAN
             pressure = pressure or self.ATMOSPHERIC_PRESSURE_SEA
-            
+            key = (_quantize(water_temp, 1), _quantize(salinity, 1), _quantize(pressure, 1))
+            return self.memo.get('dissolved_oxygen', key, self._dissolved_oxygen, *key)
+        except Exception as e:
+            logger.error("Erreur calcul oxygène: %s", e)
+            return 6.0
+
+    def _dissolved_oxygen(self, water_temp: float, salinity: float, pressure: float) -> float:
+        try:
             T_kelvin = water_temp + 273.15
             T_ratio = T_kelvin / 100
             
@@ -163,14 +494,17 @@ class ScientificFishingPredictor:
             return 6.0
 
     def estimate_chlorophyll(self, month: int, lat: float, lon: float) -> float:
-        """Estime la chlorophylle-a (mg/m³)"""
+        """Estime la chlorophylle-a (mg/m³), mémoïsée par mois et maille de 0,01°"""
         try:
-            seasonal_chlorophyll = {
-                1: 0.3, 2: 0.4, 3: 0.8, 4: 1.5, 5: 2.2, 6: 1.8,
-                7: 1.2, 8: 0.9, 9: 0.7, 10: 0.5, 11: 0.4, 12: 0.3
-            }
-            
-            base_chl = seasonal_chlorophyll.get(month, 1.0)
+            key = (month, _quantize(lat, 2), _quantize(lon, 2))
+            return self.memo.get('chlorophyll', key, self._chlorophyll, *key)
+        except Exception as e:
+            logger.error("Erreur estimation chlorophylle: %s", e)
+            return 1.5
+
+    def _chlorophyll(self, month: int, lat: float, lon: float) -> float:
+        try:
+            base_chl = SEASONAL_CHLOROPHYLL.get(month, 1.0)
             lat_factor = 1.0 + (lat - 36.0) * 0.05
             coastal_factor = 1.5 if self._is_coastal_tunisia(lat, lon) else 1.0
             
@@ -181,28 +515,31 @@ class ScientificFishingPredictor:
             return 1.5
 
     def _is_coastal_tunisia(self, lat: float, lon: float) -> bool:
-        """Détermine si la position est côtière"""
-        coastal_zones = [
-            (36.0, 10.0, 37.5, 11.5),
-            (35.5, 10.5, 36.5, 11.5),
-            (34.5, 10.0, 35.5, 11.0),
-            (33.0, 10.5, 34.0, 11.5),
-            (36.7, 8.5, 37.0, 9.5),
-            (35.0, 11.0, 35.5, 11.5)
-        ]
-        
-        for min_lat, min_lon, max_lat, max_lon in coastal_zones:
+        """Détermine si la position est côtière (maille de 0,01°)"""
+        key = (_quantize(lat, 2), _quantize(lon, 2))
+        return self.memo.get('coastal', key, self._in_coastal_zone, *key)
+
+    @staticmethod
+    def _in_coastal_zone(lat: float, lon: float) -> bool:
+        for min_lat, min_lon, max_lat, max_lon in COASTAL_ZONES:
             if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
                 return True
         return False
 
     def calculate_tidal_current(self, lat: float, lon: float, 
                               datetime_obj: datetime) -> Dict:
-        """Calcule les courants de marée"""
+        """Calcule les courants de marée, mémoïsés par jour et bande de latitude"""
+        try:
+            band = 3 if lat > 37.0 else 2 if lat > 36.0 else 1 if lat > 35.0 else 0
+            return dict(self.memo.get('tidal_current', (datetime_obj.date(), band),
+                                      self._tidal_current, lat, datetime_obj))
+        except Exception:
+            return self._tidal_current(lat, datetime_obj)  # journalise et retourne le courant par défaut
+
+    def _tidal_current(self, lat: float, datetime_obj: datetime) -> Dict:
         try:
-            lunar_cycle = 29.53
-            days_since_new = (datetime_obj - datetime(datetime_obj.year, 1, 11)).days % lunar_cycle
-            tide_phase = days_since_new / lunar_cycle
+            days_since_new = (datetime_obj - datetime(datetime_obj.year, 1, 11)).days % LUNAR_CYCLE
+            tide_phase = days_since_new / LUNAR_CYCLE
             
             tide_height = 0.3 + 0.2 * math.sin(tide_phase * 2 * math.pi)
             current_speed = 0.05 + 0.15 * abs(math.sin(tide_phase * 4 * math.pi))
@@ -244,23 +581,24 @@ class ScientificFishingPredictor:
 
     # ===== MÉTHODE DE TEMPÉRATURE D'EAU =====
     
-    def estimate_water_from_position(self, lat: float, lon: float) -> float:
-        """Estime température eau basée sur position et saison"""
+    def estimate_water_from_position(self, lat: float, lon: float, date: datetime = None) -> float:
+        """Estime température eau basée sur position et saison (à date, défaut maintenant)"""
         try:
-            month = datetime.now().month
+            date = date or datetime.now()
+            month = date.month
             
             # Températures moyennes pour la Tunisie par région
             if lat > 37.0:  # Nord
-                temps = {1:14,2:14,3:15,4:17,5:20,6:23,7:26,8:27,9:25,10:22,11:19,12:16}
+                temps = WATER_TEMP_NORTH
             elif lat > 36.0:  # Centre (Tunis, Sousse)
-                temps = {1:15,2:15,3:16,4:18,5:21,6:24,7:27,8:28,9:26,10:23,11:20,12:17}
+                temps = WATER_TEMP_CENTER
             else:  # Sud (Sfax, Djerba)
-                temps = {1:16,2:16,3:17,4:19,5:22,6:25,7:28,8:29,9:27,10:24,11:21,12:18}
+                temps = WATER_TEMP_SOUTH
             
             base_temp = temps.get(month, 20)
             
             # Variation journalière
-            hour = datetime.now().hour
+            hour = date.hour
             hour_variation = math.sin(hour * math.pi / 12) * 1.5
             
             return round(base_temp + hour_variation, 1)
@@ -285,50 +623,24 @@ class ScientificFishingPredictor:
 
     # ===== MÉTHODES DE SCORING =====
     
-    def calculate_weather_factor(self, weather_data: Dict, species: str) -> float:
+    def calculate_weather_factor(self, weather_data: Dict, species: str,
+                                 context: PredictionContext = None) -> float:
         """Calcule un facteur météo (0-1)"""
         try:
-            profile = self.species_profiles.get(species, self.species_profiles["loup"])
-            
-            temp_opt = self._mean(profile["temp_optimal"])
-            temp_diff = abs(weather_data.get('temperature', 20) - temp_opt)
-            temp_score = max(0, 1 - temp_diff / profile["temp_tolerance"])
+            context = context or PredictionContext(self, weather_data, species)
+            profile = context.profile
             
-            wind_tolerance = profile.get("wind_tolerance", "medium")
-            wind_max = {"low": 15, "medium": 25, "high": 40}[wind_tolerance]
-            wind_score = max(0, 1 - weather_data.get('wind_speed', 10) / wind_max)
+            wind_score = max(0, 1 - weather_data.get('wind_speed', 10) / profile.wind_max)
+            wave_score = max(0, 1 - weather_data.get('wave_height', 0.5) / profile.wave_max)
             
-            wave_tolerance = profile.get("wave_tolerance", "medium")
-            wave_max = {"low": 0.5, "medium": 1.0, "high": 2.0}[wave_tolerance]
-            wave_score = max(0, 1 - weather_data.get('wave_height', 0.5) / wave_max)
-            
-            pressure_diff = abs(weather_data.get('pressure', 1015) - 1015)
-            pressure_score = max(0, 1 - pressure_diff / 30)
-            
-            oxygen = weather_data.get('oxygen', 6.0)
-            oxygen_opt = profile.get("oxygen_optimal", [5.0, 8.0])
-            if oxygen < profile.get("oxygen_min", 3.5):
-                oxygen_score = 0.0
-            elif oxygen < oxygen_opt[0]:
-                oxygen_score = oxygen / oxygen_opt[0]
-            elif oxygen > oxygen_opt[1]:
-                oxygen_score = max(0, 1 - (oxygen - oxygen_opt[1]) / oxygen_opt[1])
-            else:
-                oxygen_score = 1.0
-            
-            if species in ["loup", "pageot"]:
-                weights = {'temp': 0.3, 'wind': 0.2, 'wave': 0.15, 'pressure': 0.15, 'oxygen': 0.2}
-            elif species in ["daurade", "sar"]:
-                weights = {'temp': 0.25, 'wind': 0.15, 'wave': 0.25, 'pressure': 0.15, 'oxygen': 0.2}
-            else:
-                weights = {'temp': 0.25, 'wind': 0.2, 'wave': 0.2, 'pressure': 0.15, 'oxygen': 0.2}
+            w_temp, w_wind, w_wave, w_pressure, w_oxygen = profile.weather_weights
             
             weather_factor = (
-                temp_score * weights['temp'] +
-                wind_score * weights['wind'] +
-                wave_score * weights['wave'] +
-                pressure_score * weights['pressure'] +
-                oxygen_score * weights.get('oxygen', 0)
+                context.temp_score * w_temp +
+                wind_score * w_wind +
+                wave_score * w_wave +
+                context.pressure_score * w_pressure +
+                context.oxygen_score * w_oxygen
             )
             
             return min(1.0, max(0.0, round(weather_factor, 3)))
@@ -337,113 +649,59 @@ class ScientificFishingPredictor:
             return 0.5
 
     def calculate_environmental_score(self, weather_data: Dict, species: str, 
-                                    lat: float = None, lon: float = None) -> float:
+                                    lat: float = None, lon: float = None,
+                                    context: PredictionContext = None) -> float:
         """Score environnemental (0-1)"""
         try:
-            profile = self.species_profiles.get(species, self.species_profiles["loup"])
-            water_temp = weather_data.get('water_temperature', weather_data.get('temperature', 20))
-            
-            # Oxygène
-            oxygen_level = self.calculate_dissolved_oxygen(
-                water_temp,
-                weather_data.get('salinity', self.SALINITY_MEDITERRANEAN),
-                weather_data.get('pressure', self.ATMOSPHERIC_PRESSURE_SEA)
-            )
-            
-            oxygen_opt = profile.get("oxygen_optimal", [5.0, 8.0])
-            if oxygen_level < profile.get("oxygen_min", 3.5):
-                oxygen_score = 0.0
-            elif oxygen_level < oxygen_opt[0]:
-                oxygen_score = oxygen_level / oxygen_opt[0]
-            elif oxygen_level > oxygen_opt[1]:
-                oxygen_score = max(0, 1 - (oxygen_level - oxygen_opt[1]) / oxygen_opt[1])
-            else:
-                oxygen_score = 1.0
+            context = context or PredictionContext(self, weather_data, species, lat=lat, lon=lon)
+            profile = context.profile
             
             # Chlorophylle
-            if lat and lon:
-                month = datetime.now().month
-                chlorophyll = self.estimate_chlorophyll(month, lat, lon)
-            else:
-                chlorophyll = weather_data.get('chlorophyll', 1.5)
-            
-            chl_opt = profile.get("chlorophyll_optimal", [0.8, 3.0])
-            if chlorophyll < chl_opt[0]:
-                chl_score = chlorophyll / chl_opt[0]
-            elif chlorophyll > chl_opt[1]:
-                chl_score = max(0, 1 - (chlorophyll - chl_opt[1]) / chl_opt[1])
+            chlorophyll = context.chlorophyll
+            if chlorophyll < profile.chl_low:
+                chl_score = chlorophyll / profile.chl_low
+            elif chlorophyll > profile.chl_high:
+                chl_score = max(0, 1 - (chlorophyll - profile.chl_high) / profile.chl_high)
             else:
                 chl_score = 1.0
             
             # Courant
-            if lat and lon:
-                current_data = self.calculate_tidal_current(lat, lon, datetime.now())
-                current_speed = current_data['speed_mps']
-            else:
-                current_speed = weather_data.get('current_speed', 0.2)
-            
-            current_opt = profile.get("current_preference", [0.1, 0.8])
-            if current_speed < current_opt[0]:
-                current_score = current_speed / current_opt[0]
-            elif current_speed > current_opt[1]:
-                current_score = max(0, 1 - (current_speed - current_opt[1]) / current_opt[1])
+            current_speed = context.current['speed_mps']
+            if current_speed < profile.current_low:
+                current_score = current_speed / profile.current_low
+            elif current_speed > profile.current_high:
+                current_score = max(0, 1 - (current_speed - profile.current_high) / profile.current_high)
             else:
                 current_score = 1.0
             
             # Facteurs traditionnels
-            temp_opt = self._mean(profile["temp_optimal"])
-            temp_diff = abs(weather_data.get('temperature', 20) - temp_opt)
-            temp_score = max(0, 1 - temp_diff / profile["temp_tolerance"])
-            
             wind_score = max(0, 1 - weather_data.get('wind_speed', 10) / 40)
-            pressure_diff = abs(weather_data.get('pressure', 1015) - 1015)
-            pressure_score = max(0, 1 - pressure_diff / 30)
             wave_score = max(0, 1 - weather_data.get('wave_height', 0.5) / 2.0)
             
             turbidity = weather_data.get('turbidity', 1.0)
             turbidity_score = 1.0
             if 'turbidity' in weather_data:
-                if profile.get('turbidity_tolerance') == 'low':
+                if profile.turbidity == 1:  # tolérance faible
                     turbidity_score = max(0, 1 - (turbidity - 1.0))
-                elif profile.get('turbidity_tolerance') == 'high':
+                elif profile.turbidity == 2:  # tolérance élevée
                     turbidity_score = 0.8 + (turbidity - 1.0) * 0.1
             
-            weather_factor = self.calculate_weather_factor(weather_data, species)
-            
-            if species in ["loup", "pageot"]:
-                weights = {
-                    'temp': 0.12, 'wind': 0.10, 'pressure': 0.08, 'wave': 0.10,
-                    'oxygen': 0.15, 'chlorophyll': 0.12, 'current': 0.10,
-                    'turbidity': 0.05, 'weather': 0.18
-                }
-            elif species in ["daurade", "sar"]:
-                weights = {
-                    'temp': 0.10, 'wind': 0.08, 'pressure': 0.06, 'wave': 0.12,
-                    'oxygen': 0.14, 'chlorophyll': 0.15, 'current': 0.08,
-                    'turbidity': 0.06, 'weather': 0.21
-                }
-            else:
-                weights = {
-                    'temp': 0.15, 'wind': 0.12, 'pressure': 0.08, 'wave': 0.10,
-                    'oxygen': 0.18, 'chlorophyll': 0.10, 'current': 0.12,
-                    'turbidity': 0.05, 'weather': 0.10
-                }
+            (w_temp, w_wind, w_pressure, w_wave, w_oxygen, w_chlorophyll, w_current,
+             w_turbidity, w_weather) = profile.env_weights
             
             environmental_score = (
-                temp_score * weights['temp'] +
-                wind_score * weights['wind'] +
-                pressure_score * weights['pressure'] +
-                wave_score * weights['wave'] +
-                oxygen_score * weights['oxygen'] +
-                chl_score * weights['chlorophyll'] +
-                current_score * weights['current'] +
-                turbidity_score * weights.get('turbidity', 0) +
-                weather_factor * weights.get('weather', 0)
+                context.temp_score * w_temp +
+                wind_score * w_wind +
+                context.pressure_score * w_pressure +
+                wave_score * w_wave +
+                context.oxygen_score * w_oxygen +
+                chl_score * w_chlorophyll +
+                current_score * w_current +
+                turbidity_score * w_turbidity +
+                context.weather_factor * w_weather
             )
             
-            current_month = datetime.now().month
-            spawning_season = profile.get("spawning_season", [])
-            if spawning_season and spawning_season[0] <= current_month <= spawning_season[1]:
+            if profile.spawning_start <= context.date.month <= profile.spawning_end:
                 environmental_score *= 0.8
             
             return min(1.0, max(0.0, round(environmental_score, 3)))
@@ -457,131 +715,341 @@ class ScientificFishingPredictor:
                               species: str, weather_data: Dict) -> Dict:
         """Prédiction quotidienne - RETOURNE SCORE EN POURCENTAGE (0-100)"""
         try:
-            if not weather_data:
-                weather_data = self._get_default_weather_data()
-            
-            if species not in self.species_profiles:
-                logger.warning("Espèce %s non trouvée, utilisation de 'loup'", species)
-                species = "loup"
-            
-            # Calcul des facteurs scientifiques
-            water_temp = weather_data.get('water_temperature', 
-                                        self.estimate_water_from_position(lat, lon))
-            
-            oxygen_level = self.calculate_dissolved_oxygen(
-                water_temp,
-                weather_data.get('salinity', self.SALINITY_MEDITERRANEAN),
-                weather_data.get('pressure', 1013)
-            )
-            
-            month = date.month
-            chlorophyll_level = self.estimate_chlorophyll(month, lat, lon)
-            current_data = self.calculate_tidal_current(lat, lon, date)
-            
-            # Mise à jour weather_data
-            enhanced_weather = weather_data.copy()
-            enhanced_weather.update({
-                'oxygen': oxygen_level,
-                'chlorophyll': chlorophyll_level,
-                'current_speed': current_data['speed_mps'],
-                'water_temperature': water_temp,
-                'lat': lat,
-                'lon': lon
-            })
-            
-            # Calcul des scores (0-1)
-            env_score = self.calculate_environmental_score(enhanced_weather, species, lat, lon)
-            behavior_score = self.calculate_behavioral_score(date, species)
-            regional_factor = self._calculate_regional_factor(lat, lon, species, date.month)
-            weather_factor = self.calculate_weather_factor(enhanced_weather, species)
-            
-            # Score d'activité global en DÉCIMAL (0-1)
-            activity_score_decimal = (
-                env_score * 0.40 +
-                behavior_score * 0.20 +
-                regional_factor * 0.15 +
-                weather_factor * 0.25
-            )
-            
-            # ASSURER QUE LE SCORE EST BIEN ENTRE 0 ET 1
-            activity_score_decimal = max(0.0, min(1.0, activity_score_decimal))
-            
-            # CONVERSION EN POURCENTAGE POUR FRONTEND (0-100)
-            activity_score_percent = int(round(activity_score_decimal * 100))
-            
-            # S'assurer que le pourcentage est entre 0 et 100
-            activity_score_percent = max(0, min(100, activity_score_percent))
-            
-            # Calcul des heures optimales (scores en DÉCIMAL 0-1)
-            best_hours = self.calculate_best_hours(date, species, enhanced_weather)
-            
-            # Détermination du niveau
-            if activity_score_percent >= 80:
-                opportunity = "EXCELLENTE"
-                color = "#10b981"
-            elif activity_score_percent >= 70:
-                opportunity = "TRÈS BONNE"
-                color = "#22c55e"
-            elif activity_score_percent >= 60:
-                opportunity = "BONNE"
-                color = "#f59e0b"
-            elif activity_score_percent >= 50:
-                opportunity = "MOYENNE"
-                color = "#3b82f6"
-            else:
-                opportunity = "FAIBLE"
-                color = "#ef4444"
-            
-            # Génération recommandations
-            limitations, favorable_factors = self._generate_recommendations(
-                enhanced_weather, species, activity_score_percent
-            )
-            
-            # ===== CORRECTION : AJOUT DE best_fishing_hours =====
-            # Pour compatibilité avec l'API existante qui attend ce champ
-            return {
-                'fishing_opportunity': opportunity,
-                'score': activity_score_percent,  # ← POUR FRONTEND : 0-100%
-                'activity_score': activity_score_percent,  # Alias
-                'activity_score_decimal': round(activity_score_decimal, 3),  # Pour debug
-                'environmental_score': round(env_score, 3),
-                'behavioral_score': round(behavior_score, 3),
-                'regional_factor': round(regional_factor, 3),
-                'weather_factor': round(weather_factor, 3),
-                'color': color,
-                'confidence': round(0.65 + activity_score_decimal * 0.35, 2),
-                'best_hours': best_hours,  # ← Scores en DÉCIMAL 0-1
-                'optimal_hours': best_hours,  # Alias pour predictions.html
-                'best_fishing_hours': best_hours,  # ← CORRECTION : Pour API tunisian_prediction
-                'limitations': limitations[:3],
-                'favorable_factors': favorable_factors[:3],
-                'recommendations': self._combine_recommendations(limitations, favorable_factors),  # Ajouté pour compatibilité
-                'species': species,
-                'species_name': self.species_profiles[species].get('name', species),
-                'date': date.strftime("%Y-%m-%d"),
-                'recommended_techniques': self._get_recommended_techniques(species, enhanced_weather),
-                'bathymetry': self.get_bathymetry_data(lat, lon),
-                'weather_summary': self._get_weather_summary(enhanced_weather),
-                'scientific_factors': {
-                    'dissolved_oxygen': {
-                        'value': oxygen_level,
-                        'unit': 'mg/L',
-                        'optimal_range': f"{self.species_profiles[species].get('oxygen_optimal', [5.0, 8.0])[0]}-{self.species_profiles[species].get('oxygen_optimal', [5.0, 8.0])[1]} mg/L",
-                        'status': 'optimal' if self.species_profiles[species].get('oxygen_optimal', [5.0, 8.0])[0] <= oxygen_level <= self.species_profiles[species].get('oxygen_optimal', [5.0, 8.0])[1] else 'suboptimal'
-                    },
-                    'chlorophyll_a': {
-                        'value': chlorophyll_level,
-                        'unit': 'mg/m³',
-                        'optimal_range': f"{self.species_profiles[species].get('chlorophyll_optimal', [0.8, 3.0])[0]}-{self.species_profiles[species].get('chlorophyll_optimal', [0.8, 3.0])[1]} mg/m³",
-                        'status': 'optimal' if self.species_profiles[species].get('chlorophyll_optimal', [0.8, 3.0])[0] <= chlorophyll_level <= self.species_profiles[species].get('chlorophyll_optimal', [0.8, 3.0])[1] else 'suboptimal'
-                    },
-                    'tidal_current': current_data
-                }
-            }
+            return self.explain_activity(self._score_activity(lat, lon, date, species, weather_data))
         except Exception as e:
             logger.error("Erreur prédiction activité: %s", e)
             return self._get_fallback_prediction(lat, lon, date, species)
 
+    def score_activity(self, lat: float, lon: float, date: datetime,
+                       species: str, weather_data: Dict) -> Dict:
+        """Mode allégé pour les boucles de prévision : composantes numériques seules
+        
+        Même score que predict_daily_activity, sans heures optimales, recommandations,
+        techniques, bathymétrie ni textes ; explain_activity() construit le détail
+        à partir de ce résultat pour la seule prévision affichée.
+        """
+        try:
+            return self._score_activity(lat, lon, date, species, weather_data)
+        except Exception as e:
+            logger.error("Erreur score activité: %s", e)
+            return {'fallback': True, 'score': 50, 'activity_score_decimal': 0.5,
+                    'lat': lat, 'lon': lon, 'date': date, 'species': species}
+
+    def _score_activity(self, lat: float, lon: float, date: datetime,
+                        species: str, weather_data: Dict) -> Dict:
+        if not weather_data:
+            weather_data = self._get_default_weather_data()
+        
+        if species not in self.profiles:
+            logger.warning("Espèce %s non trouvée, utilisation de 'loup'", species)
+            species = "loup"
+        
+        # Facteurs scientifiques calculés une fois, à l'heure de la prédiction
+        context = PredictionContext(self, weather_data, species, date, lat, lon)
+        
+        # Calcul des scores (0-1)
+        env_score = context.environmental_score
+        behavior_score = self.calculate_behavioral_score(date, species)
+        regional_factor = self._calculate_regional_factor(lat, lon, species, date.month)
+        weather_factor = context.weather_factor
+        
+        # Score d'activité global en DÉCIMAL (0-1)
+        activity_score_decimal = (
+            env_score * 0.40 +
+            behavior_score * 0.20 +
+            regional_factor * 0.15 +
+            weather_factor * 0.25
+        )
+        
+        # ASSURER QUE LE SCORE EST BIEN ENTRE 0 ET 1
+        activity_score_decimal = max(0.0, min(1.0, activity_score_decimal))
+        
+        # CONVERSION EN POURCENTAGE POUR FRONTEND (0-100)
+        activity_score_percent = int(round(activity_score_decimal * 100))
+        
+        # S'assurer que le pourcentage est entre 0 et 100
+        activity_score_percent = max(0, min(100, activity_score_percent))
+        
+        return {
+            'score': activity_score_percent,
+            'activity_score_decimal': activity_score_decimal,
+            'environmental_score': env_score,
+            'behavioral_score': behavior_score,
+            'regional_factor': regional_factor,
+            'weather_factor': weather_factor,
+            'lat': lat,
+            'lon': lon,
+            'date': date,
+            'species': species,
+            'enhanced_weather': context.enhanced_weather,
+            'current_data': context.current
+        }
+
+    def activity_best_hours(self, activity: Dict) -> List[Dict]:
+        """Heures optimales d'un résultat de score_activity (scores en DÉCIMAL 0-1)"""
+        if activity.get('fallback'):
+            return [{'hour': 8, 'score': 0.6, 'level': "MOYEN", 'color': "#f59e0b", 'description': "8h-10h"}]
+        return self.calculate_best_hours(activity['date'], activity['species'], activity['enhanced_weather'])
+
+    def explain_activity(self, activity: Dict) -> Dict:
+        """Prédiction détaillée (format predict_daily_activity) d'un résultat de score_activity"""
+        lat, lon, date, species = activity['lat'], activity['lon'], activity['date'], activity['species']
+        if activity.get('fallback'):
+            return self._get_fallback_prediction(lat, lon, date, species)
+        enhanced_weather = activity['enhanced_weather']
+        activity_score_percent = activity['score']
+        activity_score_decimal = activity['activity_score_decimal']
+        oxygen_level = enhanced_weather['oxygen']
+        chlorophyll_level = enhanced_weather['chlorophyll']
+        profile = self.profiles[species]
+        
+        # Calcul des heures optimales (scores en DÉCIMAL 0-1)
+        best_hours = self.activity_best_hours(activity)
+        
+        # Détermination du niveau
+        if activity_score_percent >= 80:
+            opportunity = "EXCELLENTE"
+            color = "#10b981"
+        elif activity_score_percent >= 70:
+            opportunity = "TRÈS BONNE"
+            color = "#22c55e"
+        elif activity_score_percent >= 60:
+            opportunity = "BONNE"
+            color = "#f59e0b"
+        elif activity_score_percent >= 50:
+            opportunity = "MOYENNE"
+            color = "#3b82f6"
+        else:
+            opportunity = "FAIBLE"
+            color = "#ef4444"
+        
+        # Génération recommandations
+        limitations, favorable_factors = self._generate_recommendations(
+            enhanced_weather, species, activity_score_percent
+        )
+        
+        # ===== CORRECTION : AJOUT DE best_fishing_hours =====
+        # Pour compatibilité avec l'API existante qui attend ce champ
+        return {
+            'fishing_opportunity': opportunity,
+            'score': activity_score_percent,  # ← POUR FRONTEND : 0-100%
+            'activity_score': activity_score_percent,  # Alias
+            'activity_score_decimal': round(activity_score_decimal, 3),  # Pour debug
+            'environmental_score': round(activity['environmental_score'], 3),
+            'behavioral_score': round(activity['behavioral_score'], 3),
+            'regional_factor': round(activity['regional_factor'], 3),
+            'weather_factor': round(activity['weather_factor'], 3),
+            'color': color,
+            'confidence': round(0.65 + activity_score_decimal * 0.35, 2),
+            'best_hours': best_hours,  # ← Scores en DÉCIMAL 0-1
+            'optimal_hours': best_hours,  # Alias pour predictions.html
+            'best_fishing_hours': best_hours,  # ← CORRECTION : Pour API tunisian_prediction
+            'limitations': limitations[:3],
+            'favorable_factors': favorable_factors[:3],
+            'recommendations': self._combine_recommendations(limitations, favorable_factors),  # Ajouté pour compatibilité
+            'species': species,
+            'species_name': profile.name,
+            'date': date.strftime("%Y-%m-%d"),
+            'recommended_techniques': self._get_recommended_techniques(species, enhanced_weather),
+            'bathymetry': self.get_bathymetry_data(lat, lon),
+            'weather_summary': self._get_weather_summary(enhanced_weather),
+            'scientific_factors': {
+                'dissolved_oxygen': {
+                    'value': oxygen_level,
+                    'unit': 'mg/L',
+                    'optimal_range': f"{profile.oxygen_low}-{profile.oxygen_high} mg/L",
+                    'status': 'optimal' if profile.oxygen_low <= oxygen_level <= profile.oxygen_high else 'suboptimal'
+                },
+                'chlorophyll_a': {
+                    'value': chlorophyll_level,
+                    'unit': 'mg/m³',
+                    'optimal_range': f"{profile.chl_low}-{profile.chl_high} mg/m³",
+                    'status': 'optimal' if profile.chl_low <= chlorophyll_level <= profile.chl_high else 'suboptimal'
+                },
+                'tidal_current': activity['current_data']
+            }
+        }
+
+    # ===== SCORING VECTORISÉ (NUMPY) =====
+    
+    def predict_batch(self, lats, lons, dates: Union[datetime, Sequence[datetime]], species,
+                      weather: Dict) -> Dict[str, np.ndarray]:
+        """Scores de predict_daily_activity pour N situations en quelques opérations NumPy
+        
+        lats, lons, dates, species : scalaires ou séquences de longueur N
+        weather : colonnes {'temperature': [...], 'wind_speed': ..., ...} (scalaire
+        ou séquence par clé ; clé absente = valeur par défaut du calcul scalaire)
+        Chaque ligne est calculée à sa propre date (horloge de PredictionContext).
+        Retourne des tableaux de longueur N : score (0-100), activity_score_decimal,
+        environmental_score, behavioral_score, regional_factor, weather_factor.
+        Une ligne non calculable (valeur manquante) reçoit le score de secours (50).
+        """
+        if isinstance(dates, datetime):
+            dates = [dates]
+        columns = {key: np.asarray(value, dtype=float) for key, value in weather.items() if value is not None}
+        n = max([len(dates), np.size(lats), np.size(lons), 1 if isinstance(species, str) else len(species)] +
+                [column.size for column in columns.values()])
+        lat = np.broadcast_to(np.asarray(lats, dtype=float), (n,))
+        lon = np.broadcast_to(np.asarray(lons, dtype=float), (n,))
+        dates = list(dates) * n if len(dates) == 1 else list(dates)
+        species = [species] * n if isinstance(species, str) else list(species)
+        species = [code if code in self.profiles else "loup" for code in species]
+        
+        def column(key, default):
+            return np.broadcast_to(columns[key], (n,)) if key in columns else np.full(n, float(default))
+        
+        # Paramètres des profils compilés, une ligne par situation
+        species_index = np.array([self.profiles[code].index for code in species])
+        params = {key: values[species_index] for key, values in self.profile_table.items()}
+        
+        hours = np.array([d.hour for d in dates], dtype=float)
+        months = np.array([d.month for d in dates])
+        days_since = np.array([(d - datetime(d.year, 1, 11)).days for d in dates], dtype=float)
+        
+        # ----- Facteurs scientifiques (PredictionContext) -----
+        if 'water_temperature' in columns:
+            water_temp = column('water_temperature', 0)
+        else:
+            water_temp = self._water_from_position_vec(lat, months, hours)
+        salinity = column('salinity', self.SALINITY_MEDITERRANEAN)
+        salinity = np.where(salinity == 0, self.SALINITY_MEDITERRANEAN, salinity)  # `salinity or ...`
+        oxygen = self._dissolved_oxygen_vec(water_temp, salinity, column('pressure', self.ATMOSPHERIC_PRESSURE_SEA))
+        oxygen_score = self._oxygen_score_vec(oxygen, params)
+        chlorophyll = self._chlorophyll_vec(months, lat, lon)
+        current_speed = self._tidal_speed_vec(days_since)
+        
+        temperature = column('temperature', 20)
+        wind_speed = column('wind_speed', 10)
+        wave_height = column('wave_height', 0.5)
+        pressure = column('pressure', 1015)
+        
+        # ----- Facteur météo (calculate_weather_factor) -----
+        temp_score = np.maximum(0, 1 - np.abs(temperature - params['temp_opt']) / params['temp_tolerance'])
+        pressure_score = np.maximum(0, 1 - np.abs(pressure - 1015) / 30)
+        weather_factor = (
+            temp_score * params['wf_temp'] +
+            np.maximum(0, 1 - wind_speed / params['wind_max']) * params['wf_wind'] +
+            np.maximum(0, 1 - wave_height / params['wave_max']) * params['wf_wave'] +
+            pressure_score * params['wf_pressure'] +
+            oxygen_score * params['wf_oxygen']
+        )
+        weather_factor = np.clip(_round_vec(weather_factor, 3), 0.0, 1.0)
+        
+        # ----- Score environnemental (calculate_environmental_score) -----
+        if 'turbidity' in columns:
+            turbidity = column('turbidity', 1.0)
+            turbidity_score = np.select([params['turbidity'] == 1, params['turbidity'] == 2],
+                                        [np.maximum(0, 1 - (turbidity - 1.0)), 0.8 + (turbidity - 1.0) * 0.1], 1.0)
+        else:
+            turbidity_score = np.ones(n)
+        env_score = (
+            temp_score * params['env_temp'] +
+            np.maximum(0, 1 - wind_speed / 40) * params['env_wind'] +
+            pressure_score * params['env_pressure'] +
+            np.maximum(0, 1 - wave_height / 2.0) * params['env_wave'] +
+            oxygen_score * params['env_oxygen'] +
+            self._range_score_vec(chlorophyll, params['chl_low'], params['chl_high']) * params['env_chlorophyll'] +
+            self._range_score_vec(current_speed, params['current_low'], params['current_high']) * params['env_current'] +
+            turbidity_score * params['env_turbidity'] +
+            weather_factor * params['env_weather']
+        )
+        spawning = (params['spawning_start'] <= months) & (months <= params['spawning_end'])
+        env_score = np.clip(_round_vec(np.where(spawning, env_score * 0.8, env_score), 3), 0.0, 1.0)
+        
+        # ----- Score comportemental (calculate_behavioral_score) -----
+        night_hours = np.where(hours >= 18, hours, hours + 24)
+        diel_score = np.select(
+            [params['diel'] == 0, params['diel'] == 1, params['diel'] == 2],
+            [0.6 + 0.4 * np.exp(-((hours - 14) / 4) ** 2),
+             0.6 + 0.4 * np.exp(-((night_hours - 1) / 4) ** 2),
+             0.5 + 0.5 * np.maximum(np.exp(-((hours - 6) / 2) ** 2), np.exp(-((hours - 19) / 2) ** 2))],
+            0.7)
+        moon_phase = np.mod(days_since, LUNAR_CYCLE) / LUNAR_CYCLE
+        moon_wave = np.abs(np.sin(moon_phase * math.pi))
+        moon_score = np.select([params['moon'] == 2, params['moon'] == 1],
+                               [0.4 + 0.6 * moon_wave, 0.6 + 0.4 * moon_wave],
+                               0.7 + 0.3 * np.sin(moon_phase * math.pi * 2))
+        tide_score = 0.7 + 0.3 * np.abs(np.sin(np.mod(hours, TIDE_CYCLE) / TIDE_CYCLE * 2 * math.pi))
+        behavior_score = diel_score * 0.4 + moon_score * 0.3 + tide_score * 0.2 + params['base_feeding'] * 0.1
+        behavior_score = np.clip(_round_vec(behavior_score, 3), 0.0, 1.0)
+        
+        # ----- Facteur régional (_calculate_regional_factor) -----
+        regional_factor = np.clip(_round_vec(self._regional_factor_vec(lat, lon, species, months), 3), 0.0, 1.0)
+        
+        activity = np.clip(env_score * 0.40 + behavior_score * 0.20 + regional_factor * 0.15 +
+                           weather_factor * 0.25, 0.0, 1.0)
+        score = np.clip(np.rint(activity * 100), 0, 100)
+        valid = np.isfinite(score)
+        return {
+            'score': np.where(valid, score, 50).astype(int),
+            'activity_score_decimal': np.where(valid, _round_vec(activity, 3), 0.5),
+            'environmental_score': env_score,
+            'behavioral_score': behavior_score,
+            'regional_factor': regional_factor,
+            'weather_factor': weather_factor
+        }
+    
+    def _dissolved_oxygen_vec(self, water_temp, salinity, pressure) -> np.ndarray:
+        """calculate_dissolved_oxygen vectorisé"""
+        pressure = np.where(pressure == 0, self.ATMOSPHERIC_PRESSURE_SEA, pressure)
+        water_temp, salinity, pressure = (np.rint(value * 10) / 10 for value in (water_temp, salinity, pressure))
+        T_ratio = (water_temp + 273.15) / 100
+        ln_DO_fresh = (-173.4292 + 249.6339/T_ratio +
+                       143.3483 * np.log(T_ratio) -
+                       21.8492 * T_ratio)
+        salinity_factor = salinity * (-0.033096 + 0.014259*T_ratio - 0.001700*T_ratio**2)
+        DO_sat = np.exp(ln_DO_fresh) * np.exp(salinity_factor) * (pressure / 1013.25)
+        return _round_vec(DO_sat * 0.95, 2)
+    
+    def _chlorophyll_vec(self, months, lat, lon) -> np.ndarray:
+        """estimate_chlorophyll vectorisé"""
+        lat, lon = np.rint(lat * 100) / 100, np.rint(lon * 100) / 100
+        base_chl = np.array([SEASONAL_CHLOROPHYLL.get(int(month), 1.0) for month in months])
+        coastal = np.zeros(lat.shape, dtype=bool)
+        for min_lat, min_lon, max_lat, max_lon in COASTAL_ZONES:
+            coastal |= (min_lat <= lat) & (lat <= max_lat) & (min_lon <= lon) & (lon <= max_lon)
+        estimated_chl = base_chl * (1.0 + (lat - 36.0) * 0.05) * np.where(coastal, 1.5, 1.0)
+        return _round_vec(np.maximum(0.1, np.minimum(5.0, estimated_chl)), 2)
+    
+    @staticmethod
+    def _tidal_speed_vec(days_since_new) -> np.ndarray:
+        """Vitesse du courant de calculate_tidal_current (m/s)"""
+        tide_phase = np.mod(days_since_new, LUNAR_CYCLE) / LUNAR_CYCLE
+        return _round_vec(0.05 + 0.15 * np.abs(np.sin(tide_phase * 4 * math.pi)), 3)
+    
+    @staticmethod
+    def _water_from_position_vec(lat, months, hours) -> np.ndarray:
+        """estimate_water_from_position vectorisé (mois et heure de chaque ligne)"""
+        base_temp = np.select([lat > 37.0, lat > 36.0],
+                              [[WATER_TEMP_NORTH.get(int(month), 20) for month in months],
+                               [WATER_TEMP_CENTER.get(int(month), 20) for month in months]],
+                              [WATER_TEMP_SOUTH.get(int(month), 20) for month in months])
+        return _round_vec(base_temp + np.array([math.sin(hour * math.pi / 12) for hour in hours]) * 1.5, 1)
+    
+    @staticmethod
+    def _range_score_vec(value, low, high) -> np.ndarray:
+        """1 dans [low, high], décroissance linéaire de part et d'autre"""
+        return np.where(value < low, value / low,
+                        np.where(value > high, np.maximum(0, 1 - (value - high) / high), 1.0))
+    
+    def _oxygen_score_vec(self, oxygen, params: Dict) -> np.ndarray:
+        return np.where(oxygen < params['oxygen_min'], 0.0,
+                        self._range_score_vec(oxygen, params['oxygen_low'], params['oxygen_high']))
+    
+    @staticmethod
+    def _regional_factor_vec(lat, lon, species: List[str], months) -> np.ndarray:
+        """_calculate_regional_factor vectorisé (avant arrondi)"""
+        north = lat > 37.0
+        cap_bon = ~north & (lat > 36.5) & (lon > 10.8)
+        sahel = ~north & ~cap_bon & (lat > 35.5) & (lon > 10.5)
+        south = ~north & ~cap_bon & ~sahel & (lat < 34.0)
+        factor = np.full(lat.shape, 0.5)
+        for region, mask in (('north', north), ('cap_bon', cap_bon), ('sahel', sahel), ('south', south)):
+            favored, value = REGIONAL_SPECIES[region]
+            factor = np.where(mask & np.isin(species, favored), factor + value, factor)
+        seasonal = np.array([SEASONAL_ADJUSTMENT.get(int(month), {}).get(code, np.nan) for month, code in zip(months, species)])
+        return np.where(np.isnan(seasonal), factor, factor + seasonal)
+
     # ===== NOUVELLE MÉTHODE POUR COMBINER RECOMMANDATIONS =====
     def _combine_recommendations(self, limitations: List[str], favorable_factors: List[str]) -> List[str]:
         """Combine limitations et favorable_factors en une liste de recommandations"""
@@ -606,14 +1074,13 @@ class ScientificFishingPredictor:
                            weather_data: Dict) -> List[Dict]:
         """Calcule les meilleures heures - RETOURNE SCORES EN DÉCIMAL (0-1)"""
         try:
-            profile = self.species_profiles.get(species, self.species_profiles["loup"])
-            diel_pattern = profile["diel_pattern"]
+            diel = self.compiled_profile(species).diel
             
-            if diel_pattern == "diurnal":
+            if diel == 0:  # diurne
                 base_hours = [(8, 0.7), (10, 0.8), (12, 0.9), (14, 0.85), (16, 0.75)]
-            elif diel_pattern == "nocturnal":
+            elif diel == 1:  # nocturne
                 base_hours = [(20, 0.7), (22, 0.85), (0, 0.9), (2, 0.8), (4, 0.7)]
-            elif diel_pattern == "crepuscular":
+            elif diel == 2:  # crépusculaire
                 base_hours = [(5, 0.8), (6, 0.9), (7, 0.85), (18, 0.85), (19, 0.9), (20, 0.8)]
             else:
                 base_hours = [(9, 0.7), (12, 0.8), (15, 0.7)]
@@ -662,12 +1129,12 @@ class ScientificFishingPredictor:
             adjusted_hours = []
             for hour, base_score in base_hours:
                 # Facteur horaire
-                if diel_pattern == "diurnal":
+                if diel == 0:
                     hour_factor = 1.0 - abs(hour - 13) / 12 * 0.3
-                elif diel_pattern == "nocturnal":
+                elif diel == 1:
                     night_hour = hour if hour >= 18 else hour + 24
                     hour_factor = 1.0 - abs(night_hour - 1) / 12 * 0.3
-                elif diel_pattern == "crepuscular":
+                elif diel == 2:
                     dawn_factor = 1.0 - abs(hour - 6) / 6 * 0.3
                     dusk_factor = 1.0 - abs(hour - 19) / 6 * 0.3
                     hour_factor = max(dawn_factor, dusk_factor)
@@ -711,44 +1178,44 @@ class ScientificFishingPredictor:
     # ===== MÉTHODES UTILITAIRES =====
     
     def calculate_behavioral_score(self, date: datetime, species: str) -> float:
-        """Score comportemental (0-1)"""
+        """Score comportemental (0-1), mémoïsé par espèce, jour et heure"""
         try:
-            profile = self.species_profiles.get(species, self.species_profiles["loup"])
+            return self.memo.get('behavioral', (species, date.date(), date.hour),
+                                 self._behavioral_score, date, species)
+        except Exception:
+            return 0.5
+
+    def _behavioral_score(self, date: datetime, species: str) -> float:
+        try:
+            profile = self.compiled_profile(species)
             hour = date.hour
-            diel_pattern = profile["diel_pattern"]
             
-            if diel_pattern == "diurnal":
+            if profile.diel == 0:  # diurne
                 diel_score = 0.6 + 0.4 * math.exp(-((hour - 14) / 4) ** 2)
-            elif diel_pattern == "nocturnal":
+            elif profile.diel == 1:  # nocturne
                 night_hour = hour if hour >= 18 else hour + 24
                 diel_score = 0.6 + 0.4 * math.exp(-((night_hour - 1) / 4) ** 2)
-            elif diel_pattern == "crepuscular":
+            elif profile.diel == 2:  # crépusculaire
                 dawn_score = math.exp(-((hour - 6) / 2) ** 2)
                 dusk_score = math.exp(-((hour - 19) / 2) ** 2)
                 diel_score = 0.5 + 0.5 * max(dawn_score, dusk_score)
             else:
                 diel_score = 0.7
             
-            lunar_cycle = 29.53
-            days_since_new_moon = (date - datetime(date.year, 1, 11)).days % lunar_cycle
-            moon_phase = days_since_new_moon / lunar_cycle
+            days_since_new_moon = (date - datetime(date.year, 1, 11)).days % LUNAR_CYCLE
+            moon_phase = days_since_new_moon / LUNAR_CYCLE
             
-            moon_sensitivity = profile.get("moon_sensitivity", "moderate")
-            if moon_sensitivity == "high":
+            if profile.moon == 2:  # sensibilité forte
                 moon_score = 0.4 + 0.6 * abs(math.sin(moon_phase * math.pi))
-            elif moon_sensitivity == "moderate":
+            elif profile.moon == 1:  # modérée
                 moon_score = 0.6 + 0.4 * abs(math.sin(moon_phase * math.pi))
             else:
                 moon_score = 0.7 + 0.3 * math.sin(moon_phase * math.pi * 2)
             
-            tide_cycle = 12.4
-            tide_phase = (hour % tide_cycle) / tide_cycle
+            tide_phase = (hour % TIDE_CYCLE) / TIDE_CYCLE
             tide_score = 0.7 + 0.3 * abs(math.sin(tide_phase * 2 * math.pi))
             
-            feeding_intensity = profile.get("feeding_intensity", [0.6, 0.8])
-            base_feeding = (feeding_intensity[0] + feeding_intensity[1]) / 2
-            
-            score = diel_score * 0.4 + moon_score * 0.3 + tide_score * 0.2 + base_feeding * 0.1
+            score = diel_score * 0.4 + moon_score * 0.3 + tide_score * 0.2 + profile.base_feeding * 0.1
             return min(1.0, max(0.0, round(score, 3)))
         except:
             return 0.5
@@ -760,29 +1227,22 @@ class ScientificFishingPredictor:
             factor = 0.5
             
             if lat > 37.0:
-                if species in ["loup", "daurade", "corbeau", "merlan"]:
-                    factor += 0.3
+                region = 'north'
             elif lat > 36.5 and lon > 10.8:
-                if species in ["thon", "espadon", "sériole", "bonite"]:
-                    factor += 0.4
+                region = 'cap_bon'
             elif lat > 35.5 and lon > 10.5:
-                if species in ["daurade", "sar", "marbré", "mulet"]:
-                    factor += 0.3
+                region = 'sahel'
             elif lat < 34.0:
-                if species in ["daurade", "mulet", "marbré", "orphie"]:
-                    factor += 0.2
-            
-            seasonal_adjustment = {
-                12: {"loup": 0.2, "daurade": 0.1, "merlan": 0.3, "corbeau": 0.2},
-                1: {"loup": 0.2, "daurade": 0.1, "merlan": 0.3, "corbeau": 0.2},
-                2: {"loup": 0.2, "daurade": 0.1, "merlan": 0.3, "corbeau": 0.2},
-                6: {"daurade": 0.3, "mulet": 0.4, "marbré": 0.3, "sériole": 0.2},
-                7: {"daurade": 0.3, "mulet": 0.4, "marbré": 0.3, "sériole": 0.2},
-                8: {"daurade": 0.3, "mulet": 0.4, "marbré": 0.3, "sériole": 0.2}
-            }
+                region = 'south'
+            else:
+                region = None
+            if region:
+                favored, bonus = REGIONAL_SPECIES[region]
+                if species in favored:
+                    factor += bonus
             
-            if month in seasonal_adjustment and species in seasonal_adjustment[month]:
-                factor += seasonal_adjustment[month][species]
+            if month in SEASONAL_ADJUSTMENT and species in SEASONAL_ADJUSTMENT[month]:
+                factor += SEASONAL_ADJUSTMENT[month][species]
             
             return min(1.0, max(0.0, round(factor, 3)))
         except:
@@ -794,7 +1254,7 @@ class ScientificFishingPredictor:
         limitations = []
         favorable_factors = []
         
-        profile = self.species_profiles.get(species, self.species_profiles["loup"])
+        profile = self.compiled_profile(species)
         
         # Vérifications
         oxygen = weather_data.get('oxygen', 6.0)
@@ -829,7 +1289,7 @@ class ScientificFishingPredictor:
         elif wave_height < 0.5:
             favorable_factors.append("Mer calme")
         
-        temp_diff = abs(weather_data.get('temperature', 20) - self._mean(profile["temp_optimal"]))
+        temp_diff = abs(weather_data.get('temperature', 20) - profile.temp_opt)
         if temp_diff > 8:
             limitations.append("Température non optimale")
         else:
@@ -854,23 +1314,10 @@ class ScientificFishingPredictor:
     def get_bathymetry_data(self, lat: float, lon: float) -> Dict:
         """Données bathymétriques"""
         try:
-            known_depths = {
-                (36.9000, 10.3333): {"depth": 5.0, "type": "sand"},
-                (36.8185, 10.3050): {"depth": 8.0, "type": "mixed"},
-                (36.8687, 10.3418): {"depth": 15.0, "type": "rock"},
-                (36.8475, 11.0940): {"depth": 20.0, "type": "rock"},
-                (37.2747, 9.8739): {"depth": 12.0, "type": "mud"},
-                (36.9540, 8.7580): {"depth": 25.0, "type": "rock"},
-                (35.8254, 10.6360): {"depth": 6.0, "type": "sand"},
-                (35.7833, 10.8333): {"depth": 4.0, "type": "sand"},
-                (33.8078, 10.8451): {"depth": 2.0, "type": "sand"},
-                (36.4000, 10.6000): {"depth": 3.0, "type": "sand"}
-            }
-            
             min_distance = float('inf')
             best_match = None
             
-            for known_coords, data in known_depths.items():
+            for known_coords, data in KNOWN_DEPTHS.items():
                 known_lat, known_lon = known_coords
                 distance = math.sqrt((lat - known_lat)**2 + (lon - known_lon)**2)
                 if distance < min_distance:
@@ -1,12 +1,19 @@
 """Fishing Predictor Pro - Application Flask principale (Version scientifique corrigée)"""
-import os, json, logging, time, math, hashlib, random, concurrent.futures
+import os, json, logging, time, math, hashlib, hmac, random
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, send_from_directory, make_response, redirect
-import requests, smtplib
+from flask import Flask, render_template, request, jsonify, send_from_directory, make_response, redirect, g, has_app_context
+import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from advanced_predictor import ScientificFishingPredictor
+from advanced_predictor import ScientificFishingPredictor, KNOWN_DEPTHS, BATCH_WEATHER_COLUMNS
 from config import config
+from cache_manager import cache, cache_janitor, single_flight, snap_to_grid
+from warmup import CacheWarmer
+from forecast_service import Forecast24h, HourlyScore
+from openmeteo_client import openmeteo, wmo_condition
+from upstream import get_breaker, get_upstream_stats, hedge_executor, http_client, io_executor, source_registry
+from rate_limiter import rate_limiter
+from prefetch_scheduler import PopularityTracker, PrefetchScheduler
 
 # ===== DONNÉES OCÉANOGRAPHIQUES RÉELLES =====
 try:
@@ -38,7 +45,10 @@ except Exception as e:
     print(f"⚠️ Erreur chargement WEkEO: {e}")
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
-predictor = ScientificFishingPredictor()
+predictor = ScientificFishingPredictor(memo_size=config.PREDICTOR_MEMO_SIZE)
+
+# Maintenance du cache en arrière-plan (un thread par worker)
+cache_janitor.start()
 
 # ===== CONFIGURATION EMAIL GMAIL UNIQUEMENT =====
 GMAIL_USER = config.GMAIL_USER
@@ -55,53 +65,57 @@ FAVORITES_FILE = config.FAVORITES_FILE
 ALERTS_FILE = config.ALERTS_FILE
 EMAIL_LOGS_FILE = config.EMAIL_LOGS_FILE
 
-# ===== CONFIGURATION DE LIMITATION D'APPELS API =====
-API_RATE_LIMITS = {
-    'openweather': {'max_per_hour':60,'max_per_day':1000,'cache_duration':30*60,'use_cache_only':False,'count_today':0,'last_reset':None},
-    'stormglass': {'max_per_day':10,'cache_duration':6*60*60,'use_cache_only':True},
-    'worldtides': {'max_per_day':10,'cache_duration':6*60*60,'use_cache_only':True},
-    'nominatim': {'max_per_hour':1,'cache_duration':24*60*60,'use_cache_only':False},
-    'emodnet': {'max_per_hour':10,'cache_duration':7*24*60*60,'use_cache_only':True}
-}
+# ===== LIMITATION D'APPELS API (BUDGETS PARTAGÉS, rate_limiter.py) =====
+def get_api_calls_today(api_name: str) -> int:
+    """Nombre d'appels du jour, partagé entre tous les workers"""
+    return rate_limiter.status(api_name).get('used_today', 0)
 
-# ===== SYSTÈME DE CACHE PERSISTANT SUR DISQUE =====
+# ===== SYSTÈME DE CACHE HIÉRARCHISÉ (MÉMOIRE LRU + DISQUE PARTAGÉ) =====
 CACHE_DIR = config.CACHE_DIR
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 def save_to_cache(api_name: str, params: dict, data: dict, duration_hours: int = 24):
-    """Sauvegarde les données dans un cache persistant sur disque"""
-    try:
-        param_str = json.dumps(params, sort_keys=True)
-        cache_key = hashlib.md5(f"{api_name}_{param_str}".encode()).hexdigest()
-        cache_file = os.path.join(CACHE_DIR, f"{api_name}_{cache_key}.json")
-        cache_data = {'data':data,'timestamp':time.time(),'expires_at':time.time()+(duration_hours*3600),'api_name':api_name,'params':params}
-        with open(cache_file, 'w', encoding='utf-8') as f: json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        return True
+    """Sauvegarde les données dans le cache (mémoire + disque)"""
+    try: return cache.set(api_name, params, data, ttl=duration_hours * 3600)
     except Exception as e:
         print(f"❌ Erreur sauvegarde cache: {e}")
         return False
 
 def load_from_cache(api_name: str, params: dict, max_age_hours: int = 24):
-    """Charge les données depuis le cache persistant"""
-    try:
-        param_str = json.dumps(params, sort_keys=True)
-        cache_key = hashlib.md5(f"{api_name}_{param_str}".encode()).hexdigest()
-        cache_file = os.path.join(CACHE_DIR, f"{api_name}_{cache_key}.json")
-        if not os.path.exists(cache_file): return None
-        with open(cache_file, 'r', encoding='utf-8') as f: cache_data = json.load(f)
-        current_time = time.time()
-        if current_time > cache_data.get('expires_at', 0):
-            os.remove(cache_file); return None
-        cache_age = current_time - cache_data.get('timestamp', 0)
-        if cache_age > max_age_hours * 3600: return None
-        return cache_data['data']
+    """Charge les données depuis le cache (mémoire puis disque)"""
+    try: return cache.get(api_name, params, max_age=max_age_hours * 3600)
     except Exception: return None
 
+def serve_with_revalidation(namespace: str, params: dict, builder, ttl: int):
+    """Stale-while-revalidate : sert l'entrée expirée (fenêtre de grâce) et la reconstruit en arrière-plan"""
+    def build():
+        if has_app_context(): return builder()
+        with app.app_context(): return builder()
+    data, freshness, age = cache.get_or_revalidate(namespace, params, build, ttl=ttl, grace=config.CACHE_STALE_GRACE)
+    if data is None: return None
+    return {**data, 'freshness': freshness, 'cache_age_seconds': int(age)}
+
 # ===== CACHE MÉMOIRE POUR DONNÉES FRÉQUEMMENT UTILISÉES =====
-weather_cache = {}
 WEATHER_CACHE_DURATION = config.WEATHER_CACHE_DURATION
 WEATHER_CONDITIONS_FR = {'Clear':'Ciel dégagé','Sunny':'Ensoleillé','Clouds':'Nuageux','Cloudy':'Nuageux','Rain':'Pluie','Drizzle':'Bruine','Thunderstorm':'Orage','Snow':'Neige','Mist':'Brume','Fog':'Brouillard','Haze':'Brume','Dust':'Poussiéreux','Smoke':'Fumée','Ash':'Cendres','Squall':'Rafales','Tornado':'Tornade'}
 
+# Villes et ports les plus recherchés (recherche de lieux, préchauffage du cache)
+TUNISIAN_CITIES = [
+    {'name':'Tunis','lat':36.8065,'lon':10.1815},
+    {'name':'Bizerte','lat':37.2747,'lon':9.8739},
+    {'name':'Sousse','lat':35.8254,'lon':10.6360},
+    {'name':'Hammamet','lat':36.4000,'lon':10.6000},
+    {'name':'Monastir','lat':35.7833,'lon':10.8333},
+    {'name':'Mahdia','lat':35.5047,'lon':11.0622},
+    {'name':'Sfax','lat':34.7400,'lon':10.7600},
+    {'name':'Djerba','lat':33.8078,'lon':10.8451},
+    {'name':'Tabarka','lat':36.9540,'lon':8.7580},
+    {'name':'Zarzis','lat':33.5000,'lon':11.1167},
+    {'name':'Kélibia','lat':36.8475,'lon':11.0940},
+    {'name':'La Marsa','lat':36.8782,'lon':10.3247},
+    {'name':'Gammarth','lat':36.9000,'lon':10.3167}
+]
+
 # ===== FONCTIONS EMAIL GMAIL UNIQUEMENT =====
 def send_confirmation_email(email: str, confirmation_id: str) -> bool:
     """Envoie un email de confirmation d'abonnement via Gmail"""
@@ -166,21 +180,29 @@ def save_email_log(email: str, email_type: str, confirmation_id: str, sent: bool
     except Exception as e: print(f"⚠️ Erreur sauvegarde log email: {e}")
 
 # ===== FONCTIONS MÉTÉO AVEC CACHE =====
-def get_openweather_data_with_limits(lat: float, lon: float):
-    """Récupère les données météo avec gestion des limites d'API"""
+def get_openweather_data_with_limits(lat: float, lon: float, force: bool = False):
+    """Récupère les données météo avec gestion des limites d'API
+
+    force : ignore le cache 'openweather' (rafraîchissement planifié).
+    source du résultat : 'cache', 'api', 'api_error' (appel amont fait, échec)
+    ou 'fallback' (aucun appel : disjoncteur ouvert ou quota atteint).
+    """
+    lat, lon = snap_to_grid('openweather', lat, lon)
     params = {'lat': lat, 'lon': lon}
-    cached_data = load_from_cache('openweather', params, max_age_hours=1)
-    if cached_data: return {'success': True, 'weather': cached_data, 'source': 'cache'}
-    limits = API_RATE_LIMITS['openweather']
-    if limits.get('use_cache_only', False): return get_fallback_weather_data(lat, lon)
-    if limits['count_today'] >= limits['max_per_day']: return get_fallback_weather_data(lat, lon)
+    if not force:
+        cached_data = load_from_cache('openweather', params, max_age_hours=1)
+        if cached_data: return {'success': True, 'weather': cached_data, 'source': 'cache'}
+    breaker = get_breaker('openweather')
+    if not breaker.allow(): return {**get_fallback_weather_data(lat, lon), 'source': 'fallback'}
+    if not rate_limiter.acquire('openweather'):
+        breaker.release(); return {**get_fallback_weather_data(lat, lon), 'source': 'fallback'}
     try:
         url = "https://api.openweathermap.org/data/2.5/weather"
         params_api = {'lat':lat,'lon':lon,'appid':OPENWEATHER_API_KEY,'units':'metric','lang':'fr'}
-        response = requests.get(url, params=params_api, timeout=5)
+        response = http_client.get(url, params=params_api, timeout=5)
         if response.status_code == 200:
             data = response.json()
-            API_RATE_LIMITS['openweather']['count_today'] += 1
+            breaker.record_success()
             wind_deg = data['wind'].get('deg', 0)
             wind_direction = get_wind_direction_name(wind_deg)
             wind_impact = get_wind_fishing_impact(wind_deg, lat, lon)
@@ -218,11 +240,14 @@ def get_openweather_data_with_limits(lat: float, lon: float):
             }
             save_to_cache('openweather', {'lat': lat, 'lon': lon}, weather_info, 12)
             return {'success': True, 'weather': weather_info, 'source': 'api'}
-        elif response.status_code == 429:
-            API_RATE_LIMITS['openweather']['use_cache_only'] = True
-            return get_fallback_weather_data(lat, lon)
-        else: return get_fallback_weather_data(lat, lon)
-    except Exception as e: return get_fallback_weather_data(lat, lon)
+        if response.status_code == 429:  # pause gérée par rate_limiter (http_client), pas un échec de la source
+            breaker.release()
+        else:
+            breaker.record_failure()
+        return {**get_fallback_weather_data(lat, lon), 'source': 'api_error'}
+    except Exception as e:
+        breaker.record_failure()
+        return {**get_fallback_weather_data(lat, lon), 'source': 'api_error'}
 
 def get_fallback_weather_data(lat: float, lon: float): return generate_consistent_weather(lat, lon)
 
@@ -266,16 +291,57 @@ def is_wind_onshore(lat, lon, wind_direction):
     # En Tunisie, la mer est à l'EST, donc vent d'est = onshore
     return (0 <= wind_direction <= 90) or (270 <= wind_direction <= 360)
 
-def get_cached_weather(lat: float, lon: float, force_refresh: bool = False):
-    """Récupère les données météo avec cache intelligent et limitation"""
-    cache_key = f"{lat:.4f}_{lon:.4f}"; now = time.time()
-    if not force_refresh and cache_key in weather_cache:
-        cached_data, timestamp = weather_cache[cache_key]
-        if now - timestamp < WEATHER_CACHE_DURATION: return cached_data
-    weather_result = get_openweather_data_with_limits(lat, lon)
-    if weather_result['success']: weather_cache[cache_key] = (weather_result, now)
+def get_cached_weather(lat: float, lon: float, force_refresh: bool = False, count_hit: bool = True):
+    """Récupère les données météo avec cache intelligent et limitation
+
+    count_hit : compte la demande de la maille pour le préchargement ; False pour
+    les appels internes (constructeurs, préchauffage), la route l'ayant déjà comptée.
+    """
+    grid_lat, grid_lon = snap_to_grid('weather', lat, lon)
+    params = {'lat': grid_lat, 'lon': grid_lon}
+    if count_hit: weather_prefetcher.hit(grid_lat, grid_lon)
+    if not force_refresh:
+        cached_data = cache.get('weather', params, max_age=WEATHER_CACHE_DURATION)
+        if cached_data: return cached_data
+    return single_flight.do(('weather', grid_lat, grid_lon), _fetch_weather, grid_lat, grid_lon, params)
+
+def _fetch_weather(lat: float, lon: float, params: dict, scheduled: bool = False):
+    """Appel amont unique (coalescé) pour get_cached_weather
+
+    scheduled : rafraîchissement planifié, appel OpenWeather forcé (cache
+    'openweather' ignoré) ; en cas d'échec l'entrée en cache est conservée.
+    """
+    # Maille rare et part non réservée du quota épuisée : modèle de secours
+    if not scheduled and not weather_prefetcher.allow_on_demand(lat, lon):
+        return {**get_fallback_weather_data(lat, lon), 'source': 'fallback'}
+    weather_result = get_openweather_data_with_limits(lat, lon, force=scheduled)
+    if weather_result['success'] and (not scheduled or weather_result['source'] == 'api'):
+        cache.set('weather', params, weather_result, ttl=WEATHER_CACHE_DURATION)
     return weather_result
 
+# ===== PRÉCHARGEMENT DES MAILLES POPULAIRES (QUOTA OPENWEATHER) =====
+def weather_cache_age(lat: float, lon: float):
+    """Âge (secondes) de l'entrée météo de la maille, None si absente"""
+    entry = cache._lookup('weather', {'lat': lat, 'lon': lon})
+    return time.time() - entry[1] if entry else None
+
+def refresh_weather_cell(lat: float, lon: float):
+    """Rafraîchissement planifié d'une maille chaude : True si données réelles obtenues,
+    False si l'appel OpenWeather a échoué, None si aucun appel n'a été fait"""
+    result = single_flight.do(('weather', lat, lon), _fetch_weather, lat, lon, {'lat': lat, 'lon': lon}, scheduled=True)
+    source = result.get('source') if result else None
+    return True if source == 'api' else False if source == 'api_error' else None
+
+def openweather_budget() -> dict:
+    return {'used_today': get_api_calls_today('openweather'), 'max_per_day': config.RATE_LIMITS['openweather']['max_per_day']}
+
+weather_prefetcher = PrefetchScheduler(
+    PopularityTracker(cache.disk, half_life=config.POPULARITY_HALF_LIFE), 'weather', refresh_weather_cell,
+    weather_cache_age, openweather_budget, cache.counters, ttl=WEATHER_CACHE_DURATION,
+    reserve_share=config.PREFETCH_QUOTA_SHARE, lead=config.PREFETCH_LEAD, interval=config.PREFETCH_INTERVAL,
+    max_cells=config.PREFETCH_MAX_CELLS, claim_tick=lambda slot: cache.counters.incr(f"prefetch_tick_{slot}") == 1)
+if config.PREFETCH_ENABLED: weather_prefetcher.start()
+
 def generate_consistent_weather(lat: float, lon: float):
     """Génère des données météo COHÉRENTES basées sur la position et la date (pas l'heure)"""
     now = datetime.now()
@@ -415,7 +481,8 @@ def estimate_seabed_type(lat: float, lon: float, depth: float) -> str:
 
 def get_tide_data_with_cache(lat: float, lon: float) -> dict:
     """Récupère les données de marée - VERSION CORRIGÉE"""
-    params = {'lat': lat, 'lon': lon}
+    grid_lat, grid_lon = snap_to_grid('worldtides', lat, lon)
+    params = {'lat': grid_lat, 'lon': grid_lon}
     cached_data = load_from_cache('worldtides', params, max_age_hours=6)
     if cached_data: return cached_data
     fallback_data = get_fallback_tide_data(lat, lon)
@@ -459,21 +526,32 @@ def get_fallback_tide_data(lat: float, lon: float) -> dict:
 
 def get_location_name_with_cache(lat: float, lon: float) -> dict:
     """Récupère le nom de localisation avec cache"""
-    params = {'lat': lat, 'lon': lon}
+    grid_lat, grid_lon = snap_to_grid('nominatim', lat, lon)
+    params = {'lat': grid_lat, 'lon': grid_lon}
     cached_data = load_from_cache('nominatim', params, max_age_hours=24)
     if cached_data: return cached_data
-    if API_RATE_LIMITS['nominatim'].get('use_cache_only', False): return get_fallback_location_data(lat, lon)
+    result = single_flight.do(('nominatim', grid_lat, grid_lon), _fetch_location_name, grid_lat, grid_lon, params)
+    return result or get_fallback_location_data(lat, lon)
+
+def _fetch_location_name(lat: float, lon: float, params: dict):
+    """Appel Nominatim unique (coalescé) pour get_location_name_with_cache, None si échec"""
+    breaker = get_breaker('nominatim')
+    if not breaker.allow(): return None
+    if not rate_limiter.acquire('nominatim', wait=config.NOMINATIM_MAX_WAIT):
+        breaker.release(); return None
     try:
         url = NOMINATIM_API
         params_api = {'lat':lat,'lon':lon,'format':'json','zoom':10,'addressdetails':1}
         headers = {'User-Agent': 'FishingPredictorPro/1.0'}
-        response = requests.get(url, params=params_api, headers=headers, timeout=5)
+        response = http_client.get(url, params=params_api, headers=headers, timeout=5)
         if response.status_code == 200:
             data = response.json()
             result = {'success':True,'name':data.get('display_name', f'Position {lat:.4f}, {lon:.4f}'),'address':data.get('address', {}),'type':data.get('type', 'water')}
+            breaker.record_success()
             save_to_cache('nominatim', params, result, 24); return result
     except Exception as e: print(f"⚠️ Erreur Nominatim: {e}")
-    return get_fallback_location_data(lat, lon)
+    breaker.record_failure()
+    return None
 
 def get_fallback_location_data(lat: float, lon: float) -> dict:
     """Données de localisation de secours"""
@@ -549,46 +627,8 @@ def get_marine_data_multi_source(lat: float, lon: float) -> dict:
         'data_source': 'simulation'
     }
     
-    if WEKEO_ENABLED:
-        try:
-            wekeo_wind = wekeo_enhancer.get_wind_data(lat, lon)
-            if wekeo_wind and wekeo_wind.get('wind_speed_kmh'):
-                marine_data['wind_speed_kmh'] = wekeo_wind['wind_speed_kmh']
-                marine_data['wind_direction_deg'] = wekeo_wind['wind_direction_deg']
-                marine_data['data_quality'] = wekeo_wind.get('quality', 'high')
-                marine_data['data_source'] = wekeo_wind.get('source', 'WEkEO')
-        except Exception as e:
-            pass
-    
-    if marine_data['wind_speed_kmh'] is None:
-        try:
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                'latitude': lat,
-                'longitude': lon,
-                'current': 'wind_speed_10m,wind_direction_10m',
-                'timezone': 'Africa/Tunis'
-            }
-            response = requests.get(url, params=params, timeout=3)
-            if response.status_code == 200:
-                data = response.json()['current']
-                marine_data['wind_speed_kmh'] = data['wind_speed_10m']
-                marine_data['wind_direction_deg'] = data['wind_direction_10m']
-                marine_data['data_source'] = 'Open-Meteo'
-                marine_data['data_quality'] = 'medium'
-        except Exception as e:
-            pass
-    
-    if marine_data['wind_speed_kmh'] is None:
-        weather_result = get_cached_weather(lat, lon)
-        if weather_result['success']:
-            marine_data['wind_speed_kmh'] = weather_result['weather']['wind_speed']
-            marine_data['wind_direction_deg'] = weather_result['weather']['wind_direction']
-            marine_data['data_source'] = weather_result['weather'].get('source', 'simulation')
-            marine_data['data_quality'] = 'low'
-        else:
-            marine_data['wind_speed_kmh'] = 10
-            marine_data['wind_direction_deg'] = 270
+    grid_lat, grid_lon = snap_to_grid('marine', lat, lon)
+    marine_data.update(single_flight.do(('marine', grid_lat, grid_lon), _fetch_marine_wind, lat, lon, grid_lat, grid_lon))
     
     marine_data['water_temperature'] = predictor.estimate_water_from_position(lat, lon)
     marine_data['chlorophyll'] = predictor.estimate_chlorophyll(datetime.now().month, lat, lon)
@@ -598,93 +638,106 @@ def get_marine_data_multi_source(lat: float, lon: float) -> dict:
     return marine_data
 
 
-# ===== FONCTION INTERNE POUR RÉUTILISATION DES PRÉVISIONS 24H =====
-def api_24h_forecast_internal(lat, lon, species):
-    """Version interne de api_24h_forecast pour réutilisation"""
-    try:
-        current_time = datetime.now()
-        hourly_data = []
-        
-        # Fonction interne pour obtenir TOUTES les données marines
-        def get_complete_marine_data(target_time):
-            """Retourne toutes les données marines pour une date/heure spécifique"""
-            # Météo pour cette heure
-            weather_result = get_cached_weather(lat, lon)
-            weather = weather_result['weather'] if weather_result['success'] else generate_consistent_weather(lat, lon)['weather']
-            
-            # Données marines multi-sources
-            marine = get_marine_data_multi_source(lat, lon)
-            
-            # Température de l'eau estimée
-            water_temp = predictor.estimate_water_from_position(lat, lon)
-            
-            # Oxygène dissous
-            oxygen = predictor.calculate_dissolved_oxygen(
-                water_temp,
-                config.SALINITY_MEDITERRANEAN,
-                weather['pressure']
-            )
-            
-            # Chlorophylle
-            chlorophyll = marine.get('chlorophyll', 
-                predictor.estimate_chlorophyll(target_time.month, lat, lon))
-            
-            # Courant tidal
-            current = predictor.calculate_tidal_current(lat, lon, target_time)
-            
-            return {
-                'temperature': weather['temperature'],
-                'wind_speed': marine.get('wind_speed_kmh', weather['wind_speed']) / 3.6,
-                'wind_direction': marine.get('wind_direction_deg', weather['wind_direction']),
-                'pressure': weather['pressure'],
-                'wave_height': weather.get('wave_height', calculate_wave_height(weather['wind_speed'])),
-                'turbidity': weather.get('turbidity', 1.0),
-                'humidity': weather['humidity'],
-                'condition': weather['condition'],
-                'water_temperature': water_temp,
-                'salinity': config.SALINITY_MEDITERRANEAN,
-                'current_speed': current['speed_mps'],
-                'oxygen': oxygen,
-                'chlorophyll': chlorophyll
-            }
-        
-        # Calculer pour CHAQUE heure avec les données COMPLÈTES
-        for hour_offset in range(24):
-            forecast_time = current_time + timedelta(hours=hour_offset)
-            
-            # Données marines COMPLÈTES pour cette heure
-            marine_data = get_complete_marine_data(forecast_time)
-            
-            # Prédiction COMPLÈTE pour cette heure
-            prediction = predictor.predict_daily_activity(
-                lat, 
-                lon, 
-                forecast_time, 
-                species, 
-                marine_data
-            )
-            
-            # Récupération du score (déjà en pourcentage 0-100)
-            score = int(round(prediction['score']))
-            
-            hourly_data.append({
-                'hour': forecast_time.hour,
-                'time': forecast_time.strftime('%H:%M'),
-                'score': score,
-                'timestamp': forecast_time.timestamp()
-            })
-        
-        hours = [f"{d['hour']}h" for d in hourly_data]
-        scores = [d['score'] for d in hourly_data]
-        
-        return jsonify({
-            'status': 'success',
-            'hours': hours,
-            'scores': scores,
-            'current_score': scores[0] if scores else 0
+def _fetch_marine_wind(lat: float, lon: float, grid_lat: float, grid_lon: float) -> dict:
+    """Vent marin : cache → cascade WEkEO / Open-Meteo / météo courante (ordre adaptatif, appels coalescés)"""
+    wind_params = {'lat': grid_lat, 'lon': grid_lon}
+    cached_wind = cache.get('marine', wind_params, max_age=WEATHER_CACHE_DURATION)
+    if cached_wind:
+        return cached_wind
+    
+    steps = [('wekeo', lambda: _wind_from_wekeo(lat, lon))] if WEKEO_ENABLED else []
+    steps += [('openmeteo', lambda: _wind_from_openmeteo(grid_lat, grid_lon)),
+              ('weather', lambda: _wind_from_weather(lat, lon))]
+    _, wind = source_registry.cascade('wind', steps, budget=config.CASCADE_LATENCY_BUDGET['wind'])
+    if wind is None:
+        wind = {'wind_speed_kmh': 10, 'wind_direction_deg': 270, 'data_quality': 'standard', 'data_source': 'simulation'}
+    cache.set('marine', wind_params, wind, ttl=WEATHER_CACHE_DURATION)
+    return wind
+
+def _wind_from_wekeo(lat: float, lon: float):
+    wekeo_wind = wekeo_enhancer.get_wind_data(lat, lon)
+    if not (wekeo_wind and wekeo_wind.get('wind_speed_kmh')): return None
+    return {'wind_speed_kmh': wekeo_wind['wind_speed_kmh'], 'wind_direction_deg': wekeo_wind['wind_direction_deg'],
+            'data_quality': wekeo_wind.get('quality', 'high'), 'data_source': wekeo_wind.get('source', 'WEkEO')}
+
+def _wind_from_openmeteo(lat: float, lon: float):
+    openmeteo_wind = openmeteo.current_wind(lat, lon)
+    return {**openmeteo_wind, 'data_source': 'Open-Meteo', 'data_quality': 'medium'} if openmeteo_wind else None
+
+def _wind_from_weather(lat: float, lon: float):
+    weather_result = get_cached_weather(lat, lon, count_hit=False)
+    if not weather_result['success']: return None
+    return {'wind_speed_kmh': weather_result['weather']['wind_speed'], 'wind_direction_deg': weather_result['weather']['wind_direction'],
+            'data_source': weather_result['weather'].get('source', 'simulation'), 'data_quality': 'low'}
+
+
+# ===== SÉRIE HORAIRE (UNE SEULE REQUÊTE OPEN-METEO PAR POSITION) =====
+def get_hourly_conditions(lat: float, lon: float, start_time: datetime, hours: int = 24) -> list:
+    """Conditions d'entrée du prédicteur pour chaque heure à partir de start_time
+
+    Valeurs horaires Open-Meteo ; sans série disponible, la météo et le vent
+    actuels (récupérés une seule fois) sont utilisés pour toutes les heures.
+    """
+    series = openmeteo.hourly_series(lat, lon)
+    index = {int(t): i for i, t in enumerate(series['time'])} if series else {}
+    current = None
+    conditions = []
+    for hour_offset in range(hours):
+        target_time = start_time + timedelta(hours=hour_offset)
+        water_temp = predictor.estimate_water_from_position(lat, lon, target_time)
+        i = index.get(int(target_time.timestamp()) // 3600 * 3600)
+        if i is not None and all(values[i] is not None for values in series.values()):
+            weather = {'temperature': series['temperature'][i], 'humidity': series['humidity'][i],
+                       'pressure': series['pressure'][i], 'wind_speed': series['wind_speed'][i],
+                       'wind_direction': series['wind_direction'][i],
+                       'condition': wmo_condition(series['weather_code'][i])}
+            wind_speed_kmh, wind_direction = weather['wind_speed'], weather['wind_direction']
+        else:
+            if current is None:
+                weather_result = get_cached_weather(lat, lon, count_hit=False)
+                current = (weather_result['weather'] if weather_result['success'] else generate_consistent_weather(lat, lon)['weather'],
+                           get_marine_data_multi_source(lat, lon))
+            weather, marine = current
+            wind_speed_kmh = marine.get('wind_speed_kmh', weather['wind_speed'])
+            wind_direction = marine.get('wind_direction_deg', weather['wind_direction'])
+        current_data = predictor.calculate_tidal_current(lat, lon, target_time)
+        conditions.append({
+            'temperature': weather['temperature'],
+            'wind_speed': wind_speed_kmh / 3.6,
+            'wind_direction': wind_direction,
+            'pressure': weather['pressure'],
+            'wave_height': weather.get('wave_height', calculate_wave_height(weather['wind_speed'])),
+            'turbidity': weather.get('turbidity', 1.0),
+            'humidity': weather['humidity'],
+            'condition': weather['condition'],
+            'water_temperature': water_temp,
+            'salinity': config.SALINITY_MEDITERRANEAN,
+            'current_speed': current_data['speed_mps'],
+            'oxygen': predictor.calculate_dissolved_oxygen(water_temp, config.SALINITY_MEDITERRANEAN, weather['pressure']),
+            'chlorophyll': predictor.estimate_chlorophyll(target_time.month, lat, lon)
         })
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)})
+    return conditions
+
+def score_hourly(lat: float, lon: float, species: str, start_time: datetime, hours: int = 24) -> list:
+    """Scores horaires en une passe sur la série de conditions (calcul vectorisé)"""
+    conditions = get_hourly_conditions(lat, lon, start_time, hours)
+    if not conditions: return []
+    times = [start_time + timedelta(hours=hour_offset) for hour_offset in range(len(conditions))]
+    columns = {key: [row[key] for row in conditions] for key in BATCH_WEATHER_COLUMNS if key in conditions[0]}
+    scores = predictor.predict_batch(lat, lon, times, species, columns)['score']
+    return [HourlyScore(hour=forecast_time.hour, time=forecast_time.strftime('%H:%M'), score=int(score),
+                        timestamp=forecast_time.timestamp()) for forecast_time, score in zip(times, scores)]
+
+def get_24h_forecast(lat: float, lon: float, species: str) -> Forecast24h:
+    """Prévisions 24h typées, mémorisées pour la durée de la requête (flask.g)"""
+    now = datetime.now()
+    key = (lat, lon, species, now.strftime('%Y%m%d%H'))
+    memo = g.setdefault('forecast_24h', {}) if has_app_context() else {}
+    if key not in memo:
+        memo[key] = Forecast24h(lat=lat, lon=lon, species=species, generated_at=now,
+                                hourly=score_hourly(lat, lon, species, now))
+    return memo[key]
+
 
 # ===== ROUTES PRINCIPALES =====
 @app.route('/')
@@ -711,7 +764,8 @@ def api_current_weather():
         lat = float(request.args.get('lat', 36.8065)); lon = float(request.args.get('lon', 10.1815))
         refresh = request.args.get('refresh', 'false').lower() == 'true'
         weather_result = get_cached_weather(lat, lon, force_refresh=refresh)
-        return jsonify({'status':'success','weather':weather_result['weather'],'source':weather_result.get('source','cache'),'cached':weather_result.get('source')=='cache','api_limits':{'openweather_today':API_RATE_LIMITS['openweather']['count_today'],'openweather_max':API_RATE_LIMITS['openweather']['max_per_day'],'cache_mode':API_RATE_LIMITS['openweather'].get('use_cache_only',False)},'next_refresh':(datetime.now()+timedelta(minutes=30)).isoformat()})
+        openweather_budget = rate_limiter.status('openweather')
+        return jsonify({'status':'success','weather':weather_result['weather'],'source':weather_result.get('source','cache'),'cached':weather_result.get('source')=='cache','api_limits':{'openweather_today':openweather_budget.get('used_today',0),'openweather_max':config.RATE_LIMITS['openweather']['max_per_day'],'cache_mode':openweather_budget.get('blocked_reason') not in (None,'rate')},'next_refresh':(datetime.now()+timedelta(minutes=30)).isoformat()})
     except Exception as e:
         print(f"❌ Erreur API météo: {e}")
         return jsonify({'status':'error','message':str(e)})
@@ -720,197 +774,183 @@ def api_current_weather():
 def api_tunisian_prediction():
     try:
         lat = float(request.args.get('lat', 36.8065)); lon = float(request.args.get('lon', 10.1815)); species = request.args.get('species', 'loup')
-        cache_key = f"prediction_{lat:.4f}_{lon:.4f}_{species}"
-        cached_prediction = load_from_cache('prediction', {'lat': lat, 'lon': lon, 'species': species}, max_age_hours=1)
-        if cached_prediction: return jsonify(cached_prediction)
-        
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_location = executor.submit(get_location_name_with_cache, lat, lon)
-            future_bathymetry = executor.submit(get_real_bathymetry, lat, lon)
-            future_weather = executor.submit(get_cached_weather, lat, lon)
-            location_info = future_location.result()
-            bathymetry = future_bathymetry.result()
-            weather_result = future_weather.result()
-        
-        marine_data = get_marine_data_multi_source(lat, lon)
-        
-        if weather_result['success']:
-            real_weather = weather_result['weather']
-            predictor_weather = {
-                'temperature':real_weather['temperature'],
-                'wind_speed':marine_data.get('wind_speed_kmh', real_weather['wind_speed'])/3.6,
-                'wind_direction':marine_data.get('wind_direction_deg', real_weather['wind_direction']),
-                'pressure':real_weather['pressure'],
-                'wave_height':real_weather.get('wave_height', 0.5),
-                'turbidity':real_weather.get('turbidity', 1.0),
-                'humidity':real_weather['humidity'],
-                'condition':real_weather['condition'],
-                'water_temperature':marine_data['water_temperature'],
-                'salinity':marine_data['salinity'],
-                'current_speed':marine_data['current_speed']
-            }
-            weather_source = real_weather.get('source', 'OpenWeatherMap')
-        else:
-            fallback_weather = generate_consistent_weather(lat, lon)['weather']
-            predictor_weather = {
-                'temperature':fallback_weather['temperature'],
-                'wind_speed':marine_data.get('wind_speed_kmh', fallback_weather['wind_speed'])/3.6,
-                'wind_direction':marine_data.get('wind_direction_deg', fallback_weather['wind_direction']),
-                'pressure':fallback_weather['pressure'],
-                'wave_height':fallback_weather['wave_height'],
-                'turbidity':fallback_weather['turbidity'],
-                'humidity':fallback_weather['humidity'],
-                'condition':fallback_weather['condition'],
-                'water_temperature':marine_data['water_temperature'],
-                'salinity':marine_data['salinity'],
-                'current_speed':marine_data['current_speed']
-            }
-            weather_source = 'modèle cohérent'
-        
-        oxygen_level = predictor.calculate_dissolved_oxygen(marine_data['water_temperature'],marine_data['salinity'],predictor_weather['pressure'])
-        chlorophyll_level = marine_data.get('chlorophyll', predictor.estimate_chlorophyll(datetime.now().month, lat, lon))
-        current_data = predictor.calculate_tidal_current(lat, lon, datetime.now())
-        predictor_weather.update({'oxygen': oxygen_level,'chlorophyll': chlorophyll_level})
-        
-        prediction = predictor.predict_daily_activity(lat, lon, datetime.now(), species, predictor_weather)
-        
-        depth = bathymetry.get('depth', 10)
-        depth_factor = calculate_depth_factor(depth, species)
-        weather_score = calculate_weather_score(predictor_weather)
-        
-        # Récupérer le score de l'advanced_predictor (déjà en pourcentage 0-100)
-        activity_score_percent = prediction['score']
-        
-        # 👇 NOUVELLE VERSION : Utiliser le pictogramme comme source de vérité
-        forecast_response = api_24h_forecast_internal(lat, lon, species)
-        if forecast_response.status_code == 200:
-            try:
-                forecast_data = json.loads(forecast_response.data)
-                if forecast_data.get('scores') and len(forecast_data['scores']) > 0:
-                    # L'heure actuelle correspond à l'index de l'heure courante
-                    current_hour = datetime.now().hour
-                    # Chercher l'index de l'heure actuelle dans le pictogramme
-                    current_index = -1
-                    for i, h in enumerate(forecast_data['hours']):
-                        if h == f"{current_hour}h":
-                            current_index = i
-                            break
-                    
-                    if current_index >= 0:
-                        final_score = forecast_data['scores'][current_index]
-                    else:
-                        # Fallback si l'heure n'est pas trouvée
-                        final_score = forecast_data['scores'][0]
-                else:
-                    final_score = forecast_data['current_score']
-            except Exception as e:
-                print(f"⚠️ Erreur parsing forecast: {e}")
-                final_score = round(
-                    activity_score_percent * 0.35 + 
-                    depth_factor * 25 + 
-                    weather_score * 40
-                )
-        else:
-            # Fallback sur l'ancien calcul
-            final_score = round(
-                activity_score_percent * 0.35 + 
-                depth_factor * 25 + 
-                weather_score * 40
-            )
-        
-        final_score = max(0, min(100, final_score))
-        
-        prediction_id = hashlib.md5(f"{lat:.4f}_{lon:.4f}_{species}_{datetime.now().strftime('%Y%m%d')}".encode()).hexdigest()[:12]
-        
-        response_data = {
-            'status':'success',
-            'prediction_id':prediction_id,
-            'stable':True,
-            'valid_until':(datetime.now()+timedelta(minutes=60)).isoformat(),
-            'scores':{
-                'final':int(final_score),
-                'environmental':int(round(prediction['environmental_score']*100)),
-                'behavioral':int(round(prediction['behavioral_score']*100)),
-                'bathymetry_factor':int(round(depth_factor*100)),
-                'weather_factor':int(round(weather_score*100)),
-                'components':{
-                    'scientific':int(round(prediction['environmental_score']*100)),
-                    'depth':int(round(depth_factor*100)),
-                    'regional':int(round(prediction['regional_factor']*100)),
-                    'weather':int(round(weather_score*100))
-                }
-            },
-            'weather':{
-                'temperature':predictor_weather['temperature'],
-                'wind_speed':marine_data.get('wind_speed_kmh',0),
-                'wind_direction':predictor_weather.get('wind_direction',0),
-                'wind_direction_abbr':real_weather.get('wind_direction_abbr','N'),
-                'wind_direction_name':real_weather.get('wind_direction_name','Nord'),
-                'wind_direction_icon':real_weather.get('wind_direction_icon','⬆️'),
-                'wind_fishing_impact':real_weather.get('wind_fishing_impact','neutre'),
-                'wind_offshore': False,
-                'wind_onshore':real_weather.get('wind_onshore',False),
-                'pressure':predictor_weather['pressure'],
-                'humidity':predictor_weather.get('humidity',60),
-                'condition':predictor_weather['condition'],
-                'condition_fr':weather_result['weather'].get('condition_fr', predictor_weather['condition']),
-                'wave_height':predictor_weather['wave_height'],
-                'updated':datetime.now().isoformat(),
-                'source':weather_source
-            },
-            'scientific_factors':prediction.get('scientific_factors',{
-                'dissolved_oxygen':{'value':oxygen_level,'unit':'mg/L'},
-                'chlorophyll_a':{'value':chlorophyll_level,'unit':'mg/m³'},
-                'tidal_current':current_data
-            }),
-            'recommendations':{
-                'tips':[
-                    f"Opportunité: {prediction['fishing_opportunity']}",
-                    f"Heures optimales: {', '.join([str(h['hour'])+'h' for h in prediction['best_fishing_hours'][:3]])}",
-                    f"Profondeur optimale: {get_optimal_depth(species)}",
-                    f"Type de fond recommandé: {get_optimal_seabed(species)}",
-                    f"Météo: {weather_result['weather'].get('condition_fr', predictor_weather['condition'])}, {predictor_weather['temperature']:.1f}°C, Vent: {marine_data.get('wind_speed_kmh', 0):.1f} km/h"
-                ],
-                'techniques':prediction.get('recommended_techniques', ['surfcasting', 'pêche à soutenir'])
-            },
-            'bathymetry':{
-                **bathymetry,
-                'optimal_for_species':is_depth_optimal(depth, species),
-                'zone':location_info.get('address', {}).get('state', 'Zone côtière'),
-                'recommended_fishing':[
-                    f"Profondeur: {depth}m ({'optimale' if is_depth_optimal(depth, species) else 'sous-optimale'})",
-                    f"Type de fond: {bathymetry.get('seabed_description', 'mixte')}",
-                    f"Précision: {bathymetry.get('accuracy', 'moyenne')}"
-                ]
-            },
-            'location':{
-                'lat':lat,
-                'lon':lon,
-                'name':location_info.get('name', f'Spot ({lat:.4f}, {lon:.4f})'),
-                'type':location_info.get('type', 'water'),
-                'region':location_info.get('address', {}).get('state', 'Tunisie')
-            },
-            'metadata':{
-                'species':species,
-                'timestamp':datetime.now().isoformat(),
-                'data_source':bathymetry.get('source', 'modèle scientifique'),
-                'weather_source':weather_source,
-                'prediction_stable':True,
-                'cache_duration_minutes':60,
-                'next_update_recommended':(datetime.now()+timedelta(minutes=60)).strftime('%H:%M'),
-                'api_usage_info':{
-                    'openweather_calls_today':API_RATE_LIMITS['openweather']['count_today'],
-                    'using_cache':weather_result.get('source')=='cache'
-                }
-            }
-        }
-        
-        save_to_cache('prediction', {'lat': lat, 'lon': lon, 'species': species}, response_data, 1)
+        weather_prefetcher.hit(*snap_to_grid('weather', lat, lon))  # une demande par requête, même servie du cache
+        response_data = serve_with_revalidation('prediction', {'lat': lat, 'lon': lon, 'species': species},
+                                                lambda: build_tunisian_prediction(lat, lon, species),
+                                                ttl=config.PREDICTION_CACHE_DURATION)
         return jsonify(response_data)
     except Exception as e:
         print(f"❌ Erreur prédiction: {e}")
         return jsonify({'status':'error','message':str(e),'fallback':{'scores':{'final':65},'recommendations':{'tips':['Utilisez notre modèle scientifique pour des prédictions précises']}}})
 
+def build_tunisian_prediction(lat: float, lon: float, species: str) -> dict:
+    """Construit la réponse complète de /api/tunisian_prediction (chemin froid)"""
+    # Toutes les sources démarrent en même temps : latence = la plus lente, pas la somme
+    calls = {
+        'location': (get_location_name_with_cache, lat, lon),
+        'bathymetry': (get_real_bathymetry, lat, lon),
+        'weather': (lambda: get_cached_weather(lat, lon, count_hit=False),),
+        'marine': (get_marine_data_multi_source, lat, lon),
+        'forecast_24h': (get_24h_forecast, lat, lon, species)
+    }
+    if REAL_OCEAN_ENABLED:
+        calls['sst'] = (real_ocean.get_sea_surface_temperature, lat, lon)
+        calls['chlorophyll'] = (real_ocean.get_chlorophyll, lat, lon)
+    results = io_executor.gather(calls)
+    location_info, bathymetry, weather_result = results['location'], results['bathymetry'], results['weather']
+    marine_data, forecast = results['marine'], results['forecast_24h']
+    # Mesures satellite/modèle amont si disponibles (les climatologies de secours sont ignorées)
+    for key, field in (('sst', 'water_temperature'), ('chlorophyll', 'chlorophyll')):
+        measure = results.get(key) or {}
+        if measure.get('value') and not measure.get('estimated'):
+            marine_data[field] = measure['value']
+    
+    if weather_result['success']:
+        real_weather = weather_result['weather']
+        predictor_weather = {
+            'temperature':real_weather['temperature'],
+            'wind_speed':marine_data.get('wind_speed_kmh', real_weather['wind_speed'])/3.6,
+            'wind_direction':marine_data.get('wind_direction_deg', real_weather['wind_direction']),
+            'pressure':real_weather['pressure'],
+            'wave_height':real_weather.get('wave_height', 0.5),
+            'turbidity':real_weather.get('turbidity', 1.0),
+            'humidity':real_weather['humidity'],
+            'condition':real_weather['condition'],
+            'water_temperature':marine_data['water_temperature'],
+            'salinity':marine_data['salinity'],
+            'current_speed':marine_data['current_speed']
+        }
+        weather_source = real_weather.get('source', 'OpenWeatherMap')
+    else:
+        fallback_weather = generate_consistent_weather(lat, lon)['weather']
+        predictor_weather = {
+            'temperature':fallback_weather['temperature'],
+            'wind_speed':marine_data.get('wind_speed_kmh', fallback_weather['wind_speed'])/3.6,
+            'wind_direction':marine_data.get('wind_direction_deg', fallback_weather['wind_direction']),
+            'pressure':fallback_weather['pressure'],
+            'wave_height':fallback_weather['wave_height'],
+            'turbidity':fallback_weather['turbidity'],
+            'humidity':fallback_weather['humidity'],
+            'condition':fallback_weather['condition'],
+            'water_temperature':marine_data['water_temperature'],
+            'salinity':marine_data['salinity'],
+            'current_speed':marine_data['current_speed']
+        }
+        weather_source = 'modèle cohérent'
+    
+    oxygen_level = predictor.calculate_dissolved_oxygen(marine_data['water_temperature'],marine_data['salinity'],predictor_weather['pressure'])
+    chlorophyll_level = marine_data.get('chlorophyll', predictor.estimate_chlorophyll(datetime.now().month, lat, lon))
+    current_data = predictor.calculate_tidal_current(lat, lon, datetime.now())
+    predictor_weather.update({'oxygen': oxygen_level,'chlorophyll': chlorophyll_level})
+    
+    prediction = predictor.predict_daily_activity(lat, lon, datetime.now(), species, predictor_weather)
+    
+    depth = bathymetry.get('depth', 10)
+    depth_factor = calculate_depth_factor(depth, species)
+    weather_score = calculate_weather_score(predictor_weather)
+    
+    # Récupérer le score de l'advanced_predictor (déjà en pourcentage 0-100)
+    activity_score_percent = prediction['score']
+    
+    # 👇 NOUVELLE VERSION : Utiliser le pictogramme comme source de vérité
+    final_score = forecast.score_at(datetime.now().hour)
+    if final_score is None:
+        # Fallback sur l'ancien calcul
+        final_score = round(
+            activity_score_percent * 0.35 + 
+            depth_factor * 25 + 
+            weather_score * 40
+        )
+    
+    final_score = max(0, min(100, final_score))
+    
+    prediction_id = hashlib.md5(f"{lat:.4f}_{lon:.4f}_{species}_{datetime.now().strftime('%Y%m%d')}".encode()).hexdigest()[:12]
+    
+    response_data = {
+        'status':'success',
+        'prediction_id':prediction_id,
+        'stable':True,
+        'valid_until':(datetime.now()+timedelta(minutes=60)).isoformat(),
+        'scores':{
+            'final':int(final_score),
+            'environmental':int(round(prediction['environmental_score']*100)),
+            'behavioral':int(round(prediction['behavioral_score']*100)),
+            'bathymetry_factor':int(round(depth_factor*100)),
+            'weather_factor':int(round(weather_score*100)),
+            'components':{
+                'scientific':int(round(prediction['environmental_score']*100)),
+                'depth':int(round(depth_factor*100)),
+                'regional':int(round(prediction['regional_factor']*100)),
+                'weather':int(round(weather_score*100))
+            }
+        },
+        'weather':{
+            'temperature':predictor_weather['temperature'],
+            'wind_speed':marine_data.get('wind_speed_kmh',0),
+            'wind_direction':predictor_weather.get('wind_direction',0),
+            'wind_direction_abbr':real_weather.get('wind_direction_abbr','N'),
+            'wind_direction_name':real_weather.get('wind_direction_name','Nord'),
+            'wind_direction_icon':real_weather.get('wind_direction_icon','⬆️'),
+            'wind_fishing_impact':real_weather.get('wind_fishing_impact','neutre'),
+            'wind_offshore': False,
+            'wind_onshore':real_weather.get('wind_onshore',False),
+            'pressure':predictor_weather['pressure'],
+            'humidity':predictor_weather.get('humidity',60),
+            'condition':predictor_weather['condition'],
+            'condition_fr':weather_result['weather'].get('condition_fr', predictor_weather['condition']),
+            'wave_height':predictor_weather['wave_height'],
+            'updated':datetime.now().isoformat(),
+            'source':weather_source
+        },
+        'scientific_factors':prediction.get('scientific_factors',{
+            'dissolved_oxygen':{'value':oxygen_level,'unit':'mg/L'},
+            'chlorophyll_a':{'value':chlorophyll_level,'unit':'mg/m³'},
+            'tidal_current':current_data
+        }),
+        'recommendations':{
+            'tips':[
+                f"Opportunité: {prediction['fishing_opportunity']}",
+                f"Heures optimales: {', '.join([str(h['hour'])+'h' for h in prediction['best_fishing_hours'][:3]])}",
+                f"Profondeur optimale: {get_optimal_depth(species)}",
+                f"Type de fond recommandé: {get_optimal_seabed(species)}",
+                f"Météo: {weather_result['weather'].get('condition_fr', predictor_weather['condition'])}, {predictor_weather['temperature']:.1f}°C, Vent: {marine_data.get('wind_speed_kmh', 0):.1f} km/h"
+            ],
+            'techniques':prediction.get('recommended_techniques', ['surfcasting', 'pêche à soutenir'])
+        },
+        'bathymetry':{
+            **bathymetry,
+            'optimal_for_species':is_depth_optimal(depth, species),
+            'zone':location_info.get('address', {}).get('state', 'Zone côtière'),
+            'recommended_fishing':[
+                f"Profondeur: {depth}m ({'optimale' if is_depth_optimal(depth, species) else 'sous-optimale'})",
+                f"Type de fond: {bathymetry.get('seabed_description', 'mixte')}",
+                f"Précision: {bathymetry.get('accuracy', 'moyenne')}"
+            ]
+        },
+        'location':{
+            'lat':lat,
+            'lon':lon,
+            'name':location_info.get('name', f'Spot ({lat:.4f}, {lon:.4f})'),
+            'type':location_info.get('type', 'water'),
+            'region':location_info.get('address', {}).get('state', 'Tunisie')
+        },
+        'metadata':{
+            'species':species,
+            'timestamp':datetime.now().isoformat(),
+            'data_source':bathymetry.get('source', 'modèle scientifique'),
+            'weather_source':weather_source,
+            'prediction_stable':True,
+            'cache_duration_minutes':60,
+            'next_update_recommended':(datetime.now()+timedelta(minutes=60)).strftime('%H:%M'),
+            'api_usage_info':{
+                'openweather_calls_today':get_api_calls_today('openweather'),
+                'using_cache':weather_result.get('source')=='cache'
+            }
+        }
+    }
+    
+    return response_data
+
 @app.route('/api/24h_forecast')
 def api_24h_forecast():
     """Prévisions sur 24h scientifiquement exactes - MÊME niveau de détail pour toutes les heures"""
@@ -919,151 +959,9 @@ def api_24h_forecast():
         lon = float(request.args.get('lon', 10.1815))
         species = request.args.get('species', 'loup')
         
-        current_time = datetime.now()
-        hourly_data = []
-        
-        # Fonction interne pour obtenir TOUTES les données marines
-        def get_complete_marine_data(target_time):
-            """Retourne toutes les données marines pour une date/heure spécifique"""
-            # Météo pour cette heure
-            weather_result = get_cached_weather(lat, lon)
-            weather = weather_result['weather'] if weather_result['success'] else generate_consistent_weather(lat, lon)['weather']
-            
-            # Données marines multi-sources
-            marine = get_marine_data_multi_source(lat, lon)
-            
-            # Température de l'eau estimée
-            water_temp = predictor.estimate_water_from_position(lat, lon)
-            
-            # Oxygène dissous
-            oxygen = predictor.calculate_dissolved_oxygen(
-                water_temp,
-                config.SALINITY_MEDITERRANEAN,
-                weather['pressure']
-            )
-            
-            # Chlorophylle
-            chlorophyll = marine.get('chlorophyll', 
-                predictor.estimate_chlorophyll(target_time.month, lat, lon))
-            
-            # Courant tidal
-            current = predictor.calculate_tidal_current(lat, lon, target_time)
-            
-            return {
-                'temperature': weather['temperature'],
-                'wind_speed': marine.get('wind_speed_kmh', weather['wind_speed']) / 3.6,
-                'wind_direction': marine.get('wind_direction_deg', weather['wind_direction']),
-                'pressure': weather['pressure'],
-                'wave_height': weather.get('wave_height', calculate_wave_height(weather['wind_speed'])),
-                'turbidity': weather.get('turbidity', 1.0),
-                'humidity': weather['humidity'],
-                'condition': weather['condition'],
-                'water_temperature': water_temp,
-                'salinity': config.SALINITY_MEDITERRANEAN,
-                'current_speed': current['speed_mps'],
-                'oxygen': oxygen,
-                'chlorophyll': chlorophyll
-            }
-        
-        # Calculer pour CHAQUE heure avec les données COMPLÈTES
-        for hour_offset in range(24):
-            forecast_time = current_time + timedelta(hours=hour_offset)
-            
-            # Données marines COMPLÈTES pour cette heure
-            marine_data = get_complete_marine_data(forecast_time)
-            
-            # Prédiction COMPLÈTE pour cette heure
-            prediction = predictor.predict_daily_activity(
-                lat, 
-                lon, 
-                forecast_time, 
-                species, 
-                marine_data
-            )
-            
-            # Récupération du score (déjà en pourcentage 0-100)
-            score = int(round(prediction['score']))
-            
-            hourly_data.append({
-                'hour': forecast_time.hour,
-                'time': forecast_time.strftime('%H:%M'),
-                'score': score,
-                'timestamp': forecast_time.timestamp()
-            })
-        
-        # Extraire les listes
-        hours = [f"{d['hour']}h" for d in hourly_data]
-        scores = [d['score'] for d in hourly_data]
-        
-        # Le score actuel est simplement la première heure
-        current_score = scores[0]
-        current_hour = current_time.hour
-        
-        # Trouver le meilleur score (parmi toutes les heures)
-        best_score = max(scores)
-        best_indices = [i for i, s in enumerate(scores) if s == best_score]
-        best_idx = best_indices[0]
-        best_hour = hours[best_idx]
-        best_time = hourly_data[best_idx]['time']
-        best_hour_number = hourly_data[best_idx]['hour']
-        
-        # Comparer avec le score actuel (qui est déjà dans la liste)
-        if current_score == best_score and best_idx == 0:
-            note = "🔥 Le meilleur moment est MAINTENANT !"
-        elif current_score == best_score:
-            note = f"🔥 Meilleur moment également à {best_hour}"
-        else:
-            note = None
-        
-        # Calculer la tendance (comparer les premières heures)
-        if len(scores) >= 4:
-            if scores[3] > scores[0] + 3:
-                trend = 'rising'
-            elif scores[3] < scores[0] - 3:
-                trend = 'falling'
-            else:
-                trend = 'stable'
-        else:
-            trend = 'stable'
-        
-        # Meilleurs créneaux (fenêtres de 3h)
-        best_windows = []
-        window_size = 3
-        for i in range(len(hourly_data) - window_size + 1):
-            window_scores = scores[i:i+window_size]
-            avg_score = sum(window_scores) / window_size
-            best_windows.append({
-                'start': hourly_data[i]['time'],
-                'end': hourly_data[i+window_size-1]['time'],
-                'avg_score': round(avg_score, 1),
-                'peak': max(window_scores),
-                'start_hour': hourly_data[i]['hour'],
-                'end_hour': hourly_data[i+window_size-1]['hour']
-            })
-        
-        best_windows.sort(key=lambda x: x['avg_score'], reverse=True)
-        
-        response = {
-            'status': 'success',
-            'hours': hours,
-            'scores': scores,
-            'current_hour': current_hour,
-            'current_score': current_score,
-            'best_hour': best_hour,
-            'best_time': best_time,
-            'best_hour_number': best_hour_number,
-            'best_score': best_score,
-            'best_windows': best_windows[:3],
-            'trend': trend,
-            'note': note,
-            'metadata': {
-                'location': {'lat': lat, 'lon': lon},
-                'species': species,
-                'data_source': 'scientific_complete',
-                'timestamp': datetime.now().isoformat()
-            }
-        }
-        
+        response = serve_with_revalidation('forecast_24h', {'lat': lat, 'lon': lon, 'species': species},
+                                           lambda: build_24h_forecast(lat, lon, species),
+                                           ttl=config.FORECAST_24H_CACHE_DURATION)
         return jsonify(response)
         
     except Exception as e:
@@ -1081,6 +979,10 @@ def api_24h_forecast():
             'best_score': 0
         })
 
+def build_24h_forecast(lat: float, lon: float, species: str) -> dict:
+    """Calcule les prévisions 24h (chemin froid de /api/24h_forecast)"""
+    return get_24h_forecast(lat, lon, species).to_dict()
+
 @app.route('/api/location_search')
 def api_location_search():
     """Recherche de localisations par nom"""
@@ -1093,22 +995,7 @@ def api_location_search():
                 return jsonify({'status':'success','results':[{'lat':lat,'lon':lon,'name':f'Position ({lat:.4f}, {lon:.4f})','type':'coordinates'}]})
             except: pass
         locations = []
-        tunisian_cities = [
-            {'name':'Tunis','lat':36.8065,'lon':10.1815},
-            {'name':'Bizerte','lat':37.2747,'lon':9.8739},
-            {'name':'Sousse','lat':35.8254,'lon':10.6360},
-            {'name':'Hammamet','lat':36.4000,'lon':10.6000},
-            {'name':'Monastir','lat':35.7833,'lon':10.8333},
-            {'name':'Mahdia','lat':35.5047,'lon':11.0622},
-            {'name':'Sfax','lat':34.7400,'lon':10.7600},
-            {'name':'Djerba','lat':33.8078,'lon':10.8451},
-            {'name':'Tabarka','lat':36.9540,'lon':8.7580},
-            {'name':'Zarzis','lat':33.5000,'lon':11.1167},
-            {'name':'Kélibia','lat':36.8475,'lon':11.0940},
-            {'name':'La Marsa','lat':36.8782,'lon':10.3247},
-            {'name':'Gammarth','lat':36.9000,'lon':10.3167}
-        ]
-        for city in tunisian_cities:
+        for city in TUNISIAN_CITIES:
             if query.lower() in city['name'].lower():
                 locations.append({'lat':city['lat'],'lon':city['lon'],'name':city['name'],'type':'city'})
         if not locations and len(query) > 2:
@@ -1841,16 +1728,98 @@ def admin_email_logs():
 
 # ===== FONCTIONS DE MAINTENANCE DU CACHE =====
 def cleanup_old_cache():
-    """Nettoie les fichiers de cache expirés"""
+    """Passe de maintenance immédiate (le janitor tourne ensuite en arrière-plan)"""
     try:
-        for filename in os.listdir(CACHE_DIR):
-            if filename.endswith('.json'):
-                filepath = os.path.join(CACHE_DIR, filename)
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f: cache_data = json.load(f)
-                    if time.time() > cache_data.get('expires_at', 0): os.remove(filepath)
-                except Exception: os.remove(filepath)
-    except Exception: pass
+        report = cache_janitor.run_once()
+        print(f"🧹 Cache: {report['entries']} entrées ({report['bytes']} octets) et {report['files']} anciens fichiers ({report['file_bytes']} octets) récupérés")
+    except Exception as e: print(f"⚠️ Nettoyage cache: {e}")
+
+@app.route('/api/upstreams')
+def api_upstreams():
+    """État des disjoncteurs, des pools HTTP et de l'exécuteur I/O des sources amont"""
+    try: return jsonify({'status':'success','upstreams':get_upstream_stats(),'http':http_client.get_stats(),'executor':io_executor.get_stats(),'hedge_executor':hedge_executor.get_stats(),'openmeteo':openmeteo.get_stats(),'sources':source_registry.get_stats(),'timestamp':datetime.now().isoformat()})
+    except Exception as e: return jsonify({'status':'error','message':str(e)})
+
+@app.route('/api/rate_limits')
+def api_rate_limits():
+    """Budget restant par source amont (jetons, fenêtres horaire et journalière, pause après 429)"""
+    try: return jsonify({'status':'success','sources':rate_limiter.get_status(),'prefetch':weather_prefetcher.get_stats(),'timestamp':datetime.now().isoformat()})
+    except Exception as e: return jsonify({'status':'error','message':str(e)})
+
+# ===== PRÉCHAUFFAGE DU CACHE =====
+def get_warmup_spots() -> list:
+    """Spots à préchauffer : favoris, villes, spots experts puis profondeurs connues (sans doublons)"""
+    spots = []
+    if 'favorites' in config.WARMUP_SOURCES and os.path.exists(FAVORITES_FILE):
+        try:
+            with open(FAVORITES_FILE, 'r', encoding='utf-8') as f: favorites = json.load(f)
+            spots += [{'name': fav.get('name', 'Favori'), 'lat': float(fav['lat']), 'lon': float(fav['lon'])}
+                      for fav in favorites if fav.get('lat') is not None and fav.get('lon') is not None]
+        except Exception as e: print(f"⚠️ Favoris illisibles pour le préchauffage: {e}")
+    if 'cities' in config.WARMUP_SOURCES:
+        spots += [{'name': city['name'], 'lat': city['lat'], 'lon': city['lon']} for city in TUNISIAN_CITIES]
+    if 'expert' in config.WARMUP_SOURCES:
+        try:
+            from bathymetry_gebco import TUNISIA_EXPERT_SPOTS
+            spots += [{'name': name, 'lat': round((lat_min + lat_max) / 2, 4), 'lon': round((lon_min + lon_max) / 2, 4)}
+                      for lat_min, lat_max, lon_min, lon_max, _, name in TUNISIA_EXPERT_SPOTS]
+        except ImportError as e: print(f"⚠️ Spots experts indisponibles: {e}")
+    if 'known_depths' in config.WARMUP_SOURCES:
+        spots += [{'name': f'Spot ({lat:.4f}, {lon:.4f})', 'lat': lat, 'lon': lon} for lat, lon in KNOWN_DEPTHS]
+    unique = {}
+    for spot in spots: unique.setdefault((round(spot['lat'], 4), round(spot['lon'], 4)), spot)
+    return list(unique.values())[:config.WARMUP_MAX_SPOTS]
+
+def warm_spot(spot: dict, species: str):
+    """Précalcule prédiction et prévisions 24h (météo, marine, bathymétrie au passage)"""
+    lat, lon = spot['lat'], spot['lon']
+    params = {'lat': lat, 'lon': lon, 'species': species}
+    with app.app_context():  # un seul contexte : les prévisions 24h sont calculées une fois
+        serve_with_revalidation('prediction', params, lambda: build_tunisian_prediction(lat, lon, species), ttl=config.PREDICTION_CACHE_DURATION)
+        serve_with_revalidation('forecast_24h', params, lambda: build_24h_forecast(lat, lon, species), ttl=config.FORECAST_24H_CACHE_DURATION)
+
+def warmup_quota_ok() -> bool:
+    """Le préchauffage ne consomme qu'une part du quota journalier OpenWeather"""
+    budget = rate_limiter.status('openweather')
+    if not budget.get('available', True) and budget.get('blocked_reason') != 'rate': return False
+    return budget.get('used_today', 0) < config.RATE_LIMITS['openweather']['max_per_day'] * config.WARMUP_QUOTA_SHARE
+
+def claim_warmup_run(slot: int) -> bool:
+    """Un seul worker préchauffe par créneau (compteur partagé)"""
+    return cache.counters.incr(f"warmup_{slot}") == 1
+
+def prefetch_spots(spots: list) -> dict:
+    """Préchargement Open-Meteo groupé (prévisions + marine) pour tous les spots d'une passe"""
+    return openmeteo.prefetch((spot['lat'], spot['lon']) for spot in spots)
+
+cache_warmer = CacheWarmer(warm_spot, warmup_quota_ok, claim_run=claim_warmup_run, delay=config.WARMUP_DELAY,
+                           prefetch=prefetch_spots)
+
+def start_cache_warmup(exclusive: bool = True) -> bool:
+    species = config.WARMUP_SPECIES or list(predictor.species_profiles.keys())
+    interval = config.WARMUP_INTERVAL if exclusive else 0
+    return cache_warmer.start(get_warmup_spots, species, interval=interval, exclusive=exclusive)
+
+@app.route('/api/cache/warmup', methods=['GET', 'POST'])
+def api_cache_warmup():
+    """Progression du préchauffage (GET) ou lancement manuel (POST, jeton admin requis)"""
+    try:
+        started = False
+        if request.method == 'POST':
+            token = request.headers.get('X-Admin-Token', '')
+            if not config.WARMUP_ADMIN_TOKEN or not hmac.compare_digest(token.encode(), config.WARMUP_ADMIN_TOKEN.encode()):
+                return jsonify({'status':'error','message':'Lancement manuel non autorisé'}), 403
+            started = start_cache_warmup(exclusive=False)
+            if not started:
+                return jsonify({'status':'error','message':'Préchauffage déjà en cours','warmup':cache_warmer.get_progress()}), 409
+        return jsonify({'status':'success','started':started,'warmup':cache_warmer.get_progress(),'timestamp':datetime.now().isoformat()})
+    except Exception as e: return jsonify({'status':'error','message':str(e)})
+
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """Compteurs du cache (hits/misses/évictions par niveau et par API, sous-modèles du prédicteur)"""
+    try: return jsonify({'status':'success','cache':cache.get_stats(),'coalescing':single_flight.get_stats(),'janitor':cache_janitor.get_stats(),'predictor_memo':predictor.memo.get_stats(),'timestamp':datetime.now().isoformat()})
+    except Exception as e: return jsonify({'status':'error','message':str(e)})
 
 # ===== ROUTES STATIQUES =====
 @app.route('/static/js/leaflet.js')
@@ -2014,11 +1983,12 @@ def api_forecast_10days():
         
         print(f"📊 Prévisions 10 jours demandées pour ({lat}, {lon}) - {species}")
         
-        # Essayer d'abord les données réelles Open-Meteo
+        # Essayer d'abord les données réelles Open-Meteo (stale-while-revalidate)
         try:
-            forecast = get_openmeteo_10day_forecast(lat, lon)
-            if forecast['success']:
-                return process_real_forecast(forecast['data'], lat, lon, species)
+            response = serve_with_revalidation('forecast_10d', {'lat': lat, 'lon': lon, 'species': species},
+                                               lambda: build_10day_forecast(lat, lon, species),
+                                               ttl=config.FORECAST_10D_CACHE_DURATION)
+            if response: return jsonify(response)
         except Exception as e:
             print(f"⚠️ Prévisions réelles échouées: {e}")
         
@@ -2029,35 +1999,11 @@ def api_forecast_10days():
         print(f"❌ Erreur prévisions: {e}")
         return jsonify({'status': 'error', 'message': str(e)})
 
-def get_openmeteo_10day_forecast(lat: float, lon: float) -> dict:
-    """Récupère prévisions Open-Meteo (données horaires incluses)"""
-    try:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            'latitude': lat,
-            'longitude': lon,
-            'hourly': 'temperature_2m,relativehumidity_2m,precipitation,windspeed_10m,winddirection_10m,weathercode',
-            'daily': 'temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max,winddirection_10m_dominant,weathercode',
-            'timezone': 'Africa/Tunis',
-            'forecast_days': 10
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            return {
-                'success': True,
-                'data': response.json(),
-                'source': 'Open-Meteo',
-                'timestamp': datetime.now().isoformat()
-            }
-        else:
-            print(f"⚠️ Open-Meteo erreur {response.status_code}")
-            return {'success': False}
-            
-    except Exception as e:
-        print(f"⚠️ Open-Meteo exception: {e}")
-        return {'success': False}
+def build_10day_forecast(lat: float, lon: float, species: str):
+    """Prévisions 10 jours réelles, None si Open-Meteo est indisponible (non mis en cache)"""
+    forecast = openmeteo.get_forecast(lat, lon)
+    if not forecast: return None
+    return process_real_forecast(forecast, lat, lon, species)
 
 def process_real_forecast(forecast_data: dict, lat: float, lon: float, species: str) -> dict:
     """Transforme prévisions réelles pour la pêche avec pénalité vent et fiabilité"""
@@ -2085,9 +2031,9 @@ def process_real_forecast(forecast_data: dict, lat: float, lon: float, species:
         temp_min = daily['temperature_2m_min'][i]
         temp_avg = (temp_max + temp_min) / 2
         
-        wind_speed = daily['windspeed_10m_max'][i]
-        wind_direction = daily['winddirection_10m_dominant'][i]
-        weather_code = daily.get('weathercode', [0] * days)[i]
+        wind_speed = daily['wind_speed_10m_max'][i]
+        wind_direction = daily['wind_direction_10m_dominant'][i]
+        weather_code = daily.get('weather_code', [0] * days)[i]
         precipitation = daily.get('precipitation_sum', [0] * days)[i]
         
         condition_map = {
@@ -2110,8 +2056,8 @@ def process_real_forecast(forecast_data: dict, lat: float, lon: float, species:
             for j, time_str in enumerate(hourly['time']):
                 if time_str.startswith(date_str):
                     h = int(time_str[11:13])
-                    speed = hourly['windspeed_10m'][j]
-                    direction = hourly['winddirection_10m'][j]
+                    speed = hourly['wind_speed_10m'][j]
+                    direction = hourly['wind_direction_10m'][j]
                     direction_info = get_wind_direction_name(direction)
                     hourly_wind.append({
                         'time': f"{h:02d}h",
@@ -2137,11 +2083,11 @@ def process_real_forecast(forecast_data: dict, lat: float, lon: float, species:
             'current_speed': 0.2
         }
         
-        # Prédiction
-        prediction = predictor.predict_daily_activity(lat, lon, date, species, weather_for_prediction)
+        # Prédiction (mode allégé : seuls le score et les heures optimales sont servis)
+        activity = predictor.score_activity(lat, lon, date, species, weather_for_prediction)
         
         # Récupérer le score de base (déjà en pourcentage 0-100)
-        base_score = prediction['score']
+        base_score = activity['score']
         
         # === CORRECTION : AJOUTER UNE PÉNALITÉ POUR VENT FORT ===
         wind_penalty = 1.0
@@ -2218,7 +2164,7 @@ def process_real_forecast(forecast_data: dict, lat: float, lon: float, species:
                 'direction': wind_direction,
                 'direction_name': get_wind_direction_name(wind_direction)['name']
             },
-            'best_hours': prediction['best_fishing_hours'][:2],
+            'best_hours': predictor.activity_best_hours(activity)[:2],
             'recommendation': alert,  # Message d'alerte
             'data_source': 'real_forecast',
             'hourly_wind': hourly_wind
@@ -2226,7 +2172,7 @@ def process_real_forecast(forecast_data: dict, lat: float, lon: float, species:
     
     scores = [day['score'] for day in results]
     
-    return jsonify({
+    return {
         'status': 'success',
         'forecast': results,
         'location': f'Position ({lat:.4f}, {lon:.4f})',
@@ -2235,7 +2181,7 @@ def process_real_forecast(forecast_data: dict, lat: float, lon: float, species:
         'source': 'Open-Meteo (données réelles)',
         'trend': 'improving' if len(scores) > 1 and scores[-1] > scores[0] else 'stable',
         'timestamp': datetime.now().isoformat()
-    })
+    }
 
 def api_forecast_10days_fallback(lat: float, lon: float, species: str):
     """Fallback avec données saisonnières simulées mais cohérentes"""
@@ -2465,6 +2411,9 @@ def quick_test_wekeo():
         print(f"❌ ERREUR test rapide: {e}")
         return jsonify({'status': 'error', 'message': str(e)})
 
+# Préchauffage optionnel au démarrage (chaque worker, un seul l'exécute par créneau)
+if config.WARMUP_ENABLED: start_cache_warmup()
+
 # ===== DÉMARRAGE DE L'APPLICATION =====
 if __name__=='__main__':
     print("\n" + "="*60)
@@ -2,17 +2,73 @@
 import os
 import numpy as np
 import netCDF4 as nc
-import hashlib
-import json
-import time
+
+from cache_manager import cache
+
+# === TES SPOTS - AJOUTE LES TIENS ICI ===
+TUNISIA_EXPERT_SPOTS = [
+    # [lat_min, lat_max, lon_min, lon_max, profondeur, nom]
+    # --- CAP BON / KÉLIBIA ---
+    [36.84, 36.86, 11.08, 11.10, 45, "Kélibia Nord - Canyon"],
+    [36.81, 36.83, 11.09, 11.11, 30, "Kélibia Sud - Plateau"],
+    [36.86, 36.88, 11.05, 11.07, 35, "El Haouaria"],
+    
+    # --- GHAR EL MELH ---
+    [37.15, 37.17, 10.17, 10.19, 2.5, "Ghar El Melh - Lagune"],
+    [37.17, 37.19, 10.19, 10.21, 8, "Ghar El Melh - Mer"],
+    
+    # --- BIZERTE ---
+    [37.26, 37.28, 9.86, 9.88, 50, "Bizerte - Large"],
+    [37.27, 37.29, 9.84, 9.86, 35, "Bizerte - Canal"],
+    [37.24, 37.26, 9.88, 9.90, 15, "Bizerte - Baie"],
+    
+    # --- TUNIS ---
+    [36.79, 36.81, 10.17, 10.19, 25, "Tunis - Rade"],
+    [36.80, 36.82, 10.20, 10.22, 30, "Tunis - Large"],
+    [36.78, 36.80, 10.15, 10.17, 15, "Tunis - Côte"],
+    
+    # --- HAMMAMET ---
+    [36.41, 36.43, 10.61, 10.63, 15, "Hammamet - Nord"],
+    [36.39, 36.41, 10.59, 10.61, 12, "Hammamet - Centre"],
+    [36.37, 36.39, 10.57, 10.59, 18, "Hammamet - Sud"],
+    
+    # --- SOUSSE / MONASTIR ---
+    [35.81, 35.83, 10.63, 10.65, 12, "Sousse - Port"],
+    [35.77, 35.79, 10.82, 10.84, 10, "Monastir - Ribat"],
+    [35.75, 35.77, 10.85, 10.87, 15, "Monastir - Large"],
+    
+    # --- MAHDIA ---
+    [35.49, 35.51, 11.05, 11.07, 25, "Mahdia - Cap"],
+    [35.47, 35.49, 11.08, 11.10, 30, "Mahdia - Large"],
+    
+    # --- DJERBA ---
+    [33.80, 33.82, 10.84, 10.86, 8, "Djerba - Houmt Souk"],
+    [33.78, 33.80, 10.88, 10.90, 15, "Djerba - Large"],
+    [33.72, 33.74, 10.74, 10.76, 6, "Djerba - Ajim"],
+    
+    # --- ZARZIS ---
+    [33.49, 33.51, 11.11, 11.13, 15, "Zarzis - Port"],
+    [33.48, 33.50, 11.14, 11.16, 20, "Zarzis - Large"],
+    
+    # --- TABARKA ---
+    [36.94, 36.96, 8.74, 8.76, 60, "Tabarka - Canyon"],
+    [36.95, 36.97, 8.77, 8.79, 45, "Tabarka - Rochers"],
+    
+    # --- GOLFE DE TUNIS ---
+    [36.83, 36.85, 10.30, 10.32, 35, "Golfe de Tunis - Centre"],
+    [36.82, 36.84, 10.25, 10.27, 30, "Golfe de Tunis - Sud"],
+    
+    # --- ZONES SUPPLÉMENTAIRES ---
+    [37.05, 37.07, 11.01, 11.03, 55, "Cap Bon - Extrême Nord"],
+    [35.55, 35.57, 11.10, 11.12, 40, "Mahdia - Sud"],
+    [34.72, 34.74, 10.74, 10.76, 12, "Sfax - Kerkennah"],
+]
 
 class GebcoBathymetry:
     """Bathymétrie précise - GEBCO 2025 Tunisie + SPOTS EXPERTS PRIORITAIRES"""
     
     def __init__(self, file_path='data/gebco_tunisie.nc'):
         self.file_path = file_path
-        self.cache_dir = 'data/bathymetry_cache'
-        os.makedirs(self.cache_dir, exist_ok=True)
         self.lats = None
         self.lons = None
         self.depths = None
@@ -41,20 +97,12 @@ class GebcoBathymetry:
             return False
     
     def get_depth(self, lat, lon):
-        """Récupère la profondeur depuis GEBCO (avec cache)"""
-        
-        # Cache disque
-        cache_key = hashlib.md5(f"{lat:.4f}_{lon:.4f}".encode()).hexdigest()
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
+        """Récupère la profondeur depuis GEBCO (avec cache partagé)"""
         
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    cached = json.load(f)
-                if time.time() - cached['timestamp'] < 86400 * 30:  # 30 jours
-                    return cached['depth']
-            except:
-                pass
+        cache_params = {'lat': round(lat, 4), 'lon': round(lon, 4)}
+        cached = cache.get('bathymetry', cache_params)
+        if cached:
+            return cached['depth']
         
         if self.lats is None or self.lons is None or self.depths is None:
             return None
@@ -66,14 +114,7 @@ class GebcoBathymetry:
         # Profondeur = valeur absolue (négatif = mer)
         depth = abs(float(self.depths[lat_idx, lon_idx]))
         
-        # Sauvegarde cache
-        with open(cache_file, 'w') as f:
-            json.dump({
-                'depth': depth,
-                'timestamp': time.time(),
-                'lat': lat,
-                'lon': lon
-            }, f)
+        cache.set('bathymetry', cache_params, {'depth': depth})
         
         return depth
     
@@ -113,66 +154,7 @@ class GebcoBathymetry:
         Ces données sont PLUS FIABLES que GEBCO !
         """
         
-        # === TES SPOTS - AJOUTE LES TIENS ICI ===
-        spots = [
-            # [lat_min, lat_max, lon_min, lon_max, profondeur, nom]
-            # --- CAP BON / KÉLIBIA ---
-            [36.84, 36.86, 11.08, 11.10, 45, "Kélibia Nord - Canyon"],
-            [36.81, 36.83, 11.09, 11.11, 30, "Kélibia Sud - Plateau"],
-            [36.86, 36.88, 11.05, 11.07, 35, "El Haouaria"],
-            
-            # --- GHAR EL MELH ---
-            [37.15, 37.17, 10.17, 10.19, 2.5, "Ghar El Melh - Lagune"],
-            [37.17, 37.19, 10.19, 10.21, 8, "Ghar El Melh - Mer"],
-            
-            # --- BIZERTE ---
-            [37.26, 37.28, 9.86, 9.88, 50, "Bizerte - Large"],
-            [37.27, 37.29, 9.84, 9.86, 35, "Bizerte - Canal"],
-            [37.24, 37.26, 9.88, 9.90, 15, "Bizerte - Baie"],
-            
-            # --- TUNIS ---
-            [36.79, 36.81, 10.17, 10.19, 25, "Tunis - Rade"],
-            [36.80, 36.82, 10.20, 10.22, 30, "Tunis - Large"],
-            [36.78, 36.80, 10.15, 10.17, 15, "Tunis - Côte"],
-            
-            # --- HAMMAMET ---
-            [36.41, 36.43, 10.61, 10.63, 15, "Hammamet - Nord"],
-            [36.39, 36.41, 10.59, 10.61, 12, "Hammamet - Centre"],
-            [36.37, 36.39, 10.57, 10.59, 18, "Hammamet - Sud"],
-            
-            # --- SOUSSE / MONASTIR ---
-            [35.81, 35.83, 10.63, 10.65, 12, "Sousse - Port"],
-            [35.77, 35.79, 10.82, 10.84, 10, "Monastir - Ribat"],
-            [35.75, 35.77, 10.85, 10.87, 15, "Monastir - Large"],
-            
-            # --- MAHDIA ---
-            [35.49, 35.51, 11.05, 11.07, 25, "Mahdia - Cap"],
-            [35.47, 35.49, 11.08, 11.10, 30, "Mahdia - Large"],
-            
-            # --- DJERBA ---
-            [33.80, 33.82, 10.84, 10.86, 8, "Djerba - Houmt Souk"],
-            [33.78, 33.80, 10.88, 10.90, 15, "Djerba - Large"],
-            [33.72, 33.74, 10.74, 10.76, 6, "Djerba - Ajim"],
-            
-            # --- ZARZIS ---
-            [33.49, 33.51, 11.11, 11.13, 15, "Zarzis - Port"],
-            [33.48, 33.50, 11.14, 11.16, 20, "Zarzis - Large"],
-            
-            # --- TABARKA ---
-            [36.94, 36.96, 8.74, 8.76, 60, "Tabarka - Canyon"],
-            [36.95, 36.97, 8.77, 8.79, 45, "Tabarka - Rochers"],
-            
-            # --- GOLFE DE TUNIS ---
-            [36.83, 36.85, 10.30, 10.32, 35, "Golfe de Tunis - Centre"],
-            [36.82, 36.84, 10.25, 10.27, 30, "Golfe de Tunis - Sud"],
-            
-            # --- ZONES SUPPLÉMENTAIRES ---
-            [37.05, 37.07, 11.01, 11.03, 55, "Cap Bon - Extrême Nord"],
-            [35.55, 35.57, 11.10, 11.12, 40, "Mahdia - Sud"],
-            [34.72, 34.74, 10.74, 10.76, 12, "Sfax - Kerkennah"],
-        ]
-        
-        for spot in spots:
+        for spot in TUNISIA_EXPERT_SPOTS:
             lat_min, lat_max, lon_min, lon_max, depth, name = spot
             if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max:
                 return {
@@ -0,0 +1,702 @@
+# cache_manager.py
+"""
+Cache hiérarchisé pour les réponses d'API
+Mémoire (LRU borné, TTL) → Disque (base SQLite indexée, partagée entre workers)
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from config import config
+
+
+def snap_to_grid(source: str, lat: float, lon: float) -> Tuple[float, float]:
+    """Aligne une position sur le nœud le plus proche de la grille native de la source"""
+    resolution = config.CACHE_GRID_RESOLUTION.get(source)
+    if not resolution:
+        return round(lat, 4), round(lon, 4)
+    return (round(round(lat / resolution) * resolution, 4),
+            round(round(lon / resolution) * resolution, 4))
+
+
+def position_params(namespace: str, lat: float, lon: float) -> Dict:
+    """Paramètres de clé pour une position, alignés sur la grille du namespace"""
+    grid_lat, grid_lon = snap_to_grid(namespace, lat, lon)
+    return {'lat': grid_lat, 'lon': grid_lon}
+
+
+class MemoryLRUCache:
+    """Tier mémoire : LRU borné en nombre d'entrées et en octets, avec TTL"""
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # clé -> (data, stored_at, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """Retourne (data, stored_at, expires_at) ou None si absent/expiré"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            data, stored_at, expires_at, size = entry
+            if time.time() > expires_at:
+                self._remove(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return data, stored_at, expires_at
+
+    def set(self, key: str, data: Any, expires_at: float, size: int, stored_at: float = None):
+        """Ajoute une entrée et évince les moins récemment utilisées si besoin"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (data, stored_at or time.time(), expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.stats['evictions'] += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def purge_expired(self) -> int:
+        """Retire les entrées expirées encore présentes en mémoire"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if now > entry[2]]
+            for key in expired:
+                self._remove(key)
+            self.stats['expirations'] += len(expired)
+        return len(expired)
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
+
+
+class SQLiteCacheStore:
+    """Tier disque : base SQLite unique (WAL) avec index d'expiration
+
+    - recherche par clé primaire (namespace, key) en O(log n)
+    - purge des entrées expirées via l'index, sans lire les payloads
+    - écritures atomiques (transaction) partagées entre workers gunicorn
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cache_entries ("
+        " namespace TEXT NOT NULL,"
+        " key TEXT NOT NULL,"
+        " stored_at REAL NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " payload BLOB NOT NULL,"
+        " PRIMARY KEY (namespace, key)"
+        ") WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_cache_expiry ON cache_entries (expires_at, size)",
+        "CREATE INDEX IF NOT EXISTS idx_cache_namespace_expiry ON cache_entries (namespace, expires_at, size)",
+        "CREATE TABLE IF NOT EXISTS counters ("
+        " name TEXT PRIMARY KEY,"
+        " value INTEGER NOT NULL,"
+        " updated_at REAL NOT NULL"
+        ") WITHOUT ROWID",
+    )
+
+    def __init__(self, db_path: str, busy_timeout: float = 5.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._local = threading.local()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'errors': 0}
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Une connexion par thread et par processus (sûr après fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _encode(data: Any) -> bytes:
+        return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _decode(payload: bytes) -> Any:
+        return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+    def get(self, namespace: str, key: str) -> Optional[Dict]:
+        try:
+            row = self._connect().execute(
+                "SELECT stored_at, expires_at, payload FROM cache_entries"
+                " WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+            if row is None or time.time() > row[1]:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            return {'data': self._decode(row[2]), 'timestamp': row[0], 'expires_at': row[1]}
+        except Exception as e:
+            print(f"⚠️ Erreur lecture cache SQLite: {e}")
+            self.stats['errors'] += 1
+            return None
+
+    def set(self, namespace: str, key: str, data: Any, stored_at: float, expires_at: float) -> bool:
+        try:
+            payload = self._encode(data)
+            self._connect().execute(
+                "INSERT OR REPLACE INTO cache_entries"
+                " (namespace, key, stored_at, expires_at, size, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, stored_at, expires_at, len(payload), payload))
+            self.stats['writes'] += 1
+            return True
+        except Exception as e:
+            print(f"❌ Erreur sauvegarde cache: {e}")
+            self.stats['errors'] += 1
+            return False
+
+    def delete(self, namespace: str, key: str):
+        try:
+            self._connect().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except Exception as e:
+            print(f"⚠️ Erreur suppression cache: {e}")
+
+    def purge_expired(self, now: float = None, limit: int = None) -> Dict:
+        """Supprime les entrées expirées (index seul, aucun payload lu)
+
+        limit borne le nombre d'entrées supprimées par appel (purge incrémentale).
+        """
+        now = now or time.time()
+        query = ("SELECT namespace, key, size FROM cache_entries WHERE expires_at < ?"
+                 " ORDER BY expires_at")
+        params = (now,)
+        if limit:
+            query += " LIMIT ?"
+            params = (now, limit)
+        return self._delete_selected(query, params, "purge")
+
+    def evict(self, namespace: str, bytes_needed: int, limit: int = 500) -> Dict:
+        """Libère au moins bytes_needed octets d'un namespace (expiration la plus proche d'abord)"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT namespace, key, size FROM cache_entries WHERE namespace = ?"
+            " ORDER BY expires_at LIMIT ?", (namespace, limit)).fetchall()
+        selected, total = [], 0
+        for row in rows:
+            if total >= bytes_needed:
+                break
+            selected.append(row)
+            total += row[2]
+        return self._delete_rows(conn, selected, "éviction")
+
+    def _delete_selected(self, query: str, params: Tuple, label: str) -> Dict:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(query, params).fetchall()
+            return self._delete_rows(conn, rows, label, in_transaction=True)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️ Erreur {label} cache: {e}")
+            return {'entries': 0, 'bytes': 0, 'namespaces': {}}
+
+    @staticmethod
+    def _delete_rows(conn: sqlite3.Connection, rows, label: str, in_transaction: bool = False) -> Dict:
+        """Supprime les lignes (namespace, key, size) et agrège le volume récupéré"""
+        report = {'entries': 0, 'bytes': 0, 'namespaces': {}}
+        try:
+            if not in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                             [(namespace, key) for namespace, key, _ in rows])
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️ Erreur {label} cache: {e}")
+            return report
+        for namespace, _, size in rows:
+            ns_report = report['namespaces'].setdefault(namespace, {'entries': 0, 'bytes': 0})
+            ns_report['entries'] += 1
+            ns_report['bytes'] += size
+            report['entries'] += 1
+            report['bytes'] += size
+        return report
+
+    def namespace_sizes(self) -> Dict[str, int]:
+        """Taille (octets compressés) de chaque namespace, via l'index (namespace, expires_at, size)"""
+        try:
+            return dict(self._connect().execute(
+                "SELECT namespace, SUM(size) FROM cache_entries GROUP BY namespace").fetchall())
+        except Exception as e:
+            print(f"⚠️ Erreur lecture tailles cache: {e}")
+            return {}
+
+    def info(self) -> Dict:
+        info = dict(self.stats)
+        try:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+            info.update({'entries': count, 'bytes': total, 'path': self.db_path})
+        except Exception:
+            pass
+        return info
+
+
+class SharedCounters:
+    """Compteurs partagés entre tous les workers (incréments atomiques en SQLite)"""
+
+    def __init__(self, store: SQLiteCacheStore):
+        self.store = store
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        conn = self.store._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO counters (name, value, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value,"
+                " updated_at = excluded.updated_at", (name, amount, time.time()))
+            value = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+            conn.execute("COMMIT")
+            return value
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️ Erreur compteur partagé {name}: {e}")
+            return 0
+
+    def get(self, name: str) -> int:
+        try:
+            row = self.store._connect().execute(
+                "SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+            return row[0] if row else 0
+        except Exception as e:
+            print(f"⚠️ Erreur lecture compteur {name}: {e}")
+            return 0
+
+
+class _InFlightCall:
+    """Appel en cours partagé par le leader et ses suiveurs"""
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalescence des requêtes concurrentes : un seul appel amont en vol par clé
+
+    Les appels concurrents avec la même clé attendent le leader et partagent
+    son résultat ou son exception.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def do(self, key: Tuple, fn, *args, **kwargs):
+        namespace = key[0] if isinstance(key, tuple) and key else str(key)
+        with self._lock:
+            ns_stats = self._stats.setdefault(namespace, {'calls': 0, 'executed': 0, 'collapsed': 0, 'errors': 0})
+            ns_stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+                ns_stats['executed'] += 1
+            else:
+                call.waiters += 1
+                ns_stats['collapsed'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                ns_stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = {ns: dict(s) for ns, s in self._stats.items()}
+            in_flight = len(self._calls)
+        return {
+            'in_flight': in_flight,
+            'collapsed_total': sum(s['collapsed'] for s in stats.values()),
+            'namespaces': stats
+        }
+
+
+class TieredCache:
+    """Cache à deux niveaux : LRU mémoire devant le stockage disque
+
+    Le tier mémoire conserve le JSON sérialisé : comme le tier disque, chaque
+    lecture retourne une copie que l'appelant peut modifier sans altérer l'entrée.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 2048,
+                 max_bytes: int = 32 * 1024 * 1024):
+        self.memory = MemoryLRUCache(max_entries, max_bytes)
+        self.disk = SQLiteCacheStore(db_path)
+        self.counters = SharedCounters(self.disk)
+        self._namespace_stats = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(namespace: str, params: Dict) -> str:
+        """Clé stable : md5 du namespace et des paramètres triés"""
+        param_str = json.dumps(params, sort_keys=True)
+        return hashlib.md5(f"{namespace}_{param_str}".encode()).hexdigest()
+
+    def get(self, namespace: str, params: Dict, max_age: float = None) -> Optional[Any]:
+        """Cherche en mémoire puis sur disque ; max_age en secondes"""
+        entry = self._lookup(namespace, params, max_age)
+        return entry[0] if entry is not None else None
+
+    def _lookup(self, namespace: str, params: Dict, max_age: float = None) -> Optional[Tuple[Any, float]]:
+        """Retourne (data, stored_at) ou None ; compte les hits/miss par namespace"""
+        key = self.make_key(namespace, params)
+        memory_key = f"{namespace}:{key}"
+        now = time.time()
+
+        cached = self.memory.get(memory_key)
+        if cached is not None:
+            serialized, stored_at, _ = cached
+            if max_age is None or now - stored_at <= max_age:
+                self._count(namespace, 'memory_hits')
+                return json.loads(serialized), stored_at
+
+        entry = self.disk.get(namespace, key)
+        if entry is not None:
+            stored_at = entry.get('timestamp', 0)
+            if max_age is None or now - stored_at <= max_age:
+                data = entry['data']
+                serialized = json.dumps(data, ensure_ascii=False)
+                self.memory.set(memory_key, serialized, entry['expires_at'], len(serialized), stored_at)
+                self._count(namespace, 'disk_hits')
+                return data, stored_at
+
+        self._count(namespace, 'misses')
+        return None
+
+    def get_or_revalidate(self, namespace: str, params: Dict, builder, ttl: float,
+                          grace: float) -> Tuple[Any, str, float]:
+        """Stale-while-revalidate : retourne (data, fraîcheur, âge en secondes)
+
+        - 'fresh' : entrée plus jeune que ttl
+        - 'stale' : entrée expirée mais dans la fenêtre de grâce, servie
+          immédiatement pendant qu'un thread la reconstruit en arrière-plan
+        - 'miss'  : aucune entrée exploitable, builder() exécuté (coalescé)
+        Une réponse None du builder n'est pas mise en cache.
+        """
+        entry = self._lookup(namespace, params, ttl + grace)
+        if entry is not None:
+            data, stored_at = entry
+            age = max(0.0, time.time() - stored_at)
+            if age <= ttl:
+                return data, 'fresh', age
+            self._count(namespace, 'stale_hits')
+            self._schedule_refresh(namespace, params, builder, ttl, grace)
+            return data, 'stale', age
+
+        key = self.make_key(namespace, params)
+        data = single_flight.do((namespace, key), self._build_and_store,
+                                namespace, params, builder, ttl, grace)
+        return data, 'miss', 0.0
+
+    def _build_and_store(self, namespace: str, params: Dict, builder, ttl: float, grace: float):
+        data = builder()
+        if data is not None:
+            # L'entrée reste lisible pendant la fenêtre de grâce
+            self.set(namespace, params, data, ttl=ttl + grace)
+        return data
+
+    def _schedule_refresh(self, namespace: str, params: Dict, builder, ttl: float, grace: float):
+        """Lance un seul rafraîchissement en arrière-plan par clé"""
+        refresh_key = (namespace, self.make_key(namespace, params))
+        with self._lock:
+            if refresh_key in self._refreshing:
+                return
+            self._refreshing.add(refresh_key)
+
+        def run():
+            try:
+                self._build_and_store(namespace, params, builder, ttl, grace)
+                self._count(namespace, 'refreshes')
+            except Exception as e:
+                self._count(namespace, 'refresh_errors')
+                print(f"⚠️ Rafraîchissement cache '{namespace}' échoué: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(refresh_key)
+
+        threading.Thread(target=run, name=f"cache-refresh-{namespace}", daemon=True).start()
+
+    def set(self, namespace: str, params: Dict, data: Any, ttl: float = None,
+            persist: bool = True) -> bool:
+        """Enregistre en mémoire et (optionnellement) sur disque
+
+        ttl en secondes ; par défaut celui du namespace (config.CACHE_TTL).
+        """
+        if ttl is None:
+            ttl = config.CACHE_TTL.get(namespace, config.CACHE_DEFAULT_TTL)
+        key = self.make_key(namespace, params)
+        now = time.time()
+        expires_at = now + ttl
+        serialized = json.dumps(data, ensure_ascii=False)
+        self.memory.set(f"{namespace}:{key}", serialized, expires_at, len(serialized), now)
+        self._count(namespace, 'writes')
+        if not persist:
+            return True
+        return self.disk.set(namespace, key, data, now, expires_at)
+
+    def invalidate(self, namespace: str, params: Dict):
+        key = self.make_key(namespace, params)
+        self.memory.delete(f"{namespace}:{key}")
+        self.disk.delete(namespace, key)
+
+    def purge_expired(self, limit: int = None) -> Dict:
+        """Purge les entrées expirées (mémoire, puis disque par lots de limit)"""
+        self.memory.purge_expired()
+        return self.disk.purge_expired(limit=limit)
+
+    def _count(self, namespace: str, counter: str):
+        with self._lock:
+            ns_stats = self._namespace_stats.setdefault(
+                namespace, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0,
+                            'stale_hits': 0, 'refreshes': 0, 'refresh_errors': 0})
+            ns_stats[counter] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            namespaces = {ns: dict(s) for ns, s in self._namespace_stats.items()}
+        for ns, s in namespaces.items():
+            lookups = s['memory_hits'] + s['disk_hits'] + s['misses']
+            s['hit_rate'] = round((s['memory_hits'] + s['disk_hits']) / lookups, 3) if lookups else 0.0
+            s['grid_deg'] = config.CACHE_GRID_RESOLUTION.get(ns)
+        return {
+            'memory': self.memory.info(),
+            'disk': self.disk.info(),
+            'namespaces': namespaces
+        }
+
+
+class CacheJanitor:
+    """Maintenance en arrière-plan de tous les caches, bornée dans le temps
+
+    À chaque passe (dans la limite de time_budget secondes) :
+    1. entrées SQLite expirées supprimées par lots via l'index d'expiration
+    2. quotas de taille par namespace (évince l'expiration la plus proche d'abord)
+    3. anciens répertoires de fichiers JSON balayés par morceaux, la passe
+       suivante reprenant là où la précédente s'est arrêtée
+    """
+
+    def __init__(self, cache: TieredCache, interval: float = 300, time_budget: float = 0.5,
+                 batch_size: int = 500, quotas: Dict = None, default_quota: int = None,
+                 legacy_dirs: Dict = None):
+        self.cache = cache
+        self.interval = interval
+        self.time_budget = time_budget
+        self.batch_size = batch_size
+        self.quotas = quotas or {}
+        self.default_quota = default_quota
+        self.legacy_dirs = legacy_dirs or {}
+        self._scanners = {}
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.stats = {'runs': 0, 'entries': 0, 'bytes': 0, 'files': 0, 'file_bytes': 0,
+                      'namespaces': {}, 'last_run': None, 'last_duration_ms': 0, 'last_report': None}
+
+    def start(self):
+        """Démarre le thread de maintenance (un par processus, sûr après fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='cache-janitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        delay = min(self.interval, 10)
+        while not self._stop.wait(delay):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Maintenance cache: {e}")
+            delay = self.interval
+
+    def run_once(self) -> Dict:
+        """Exécute une passe de maintenance et retourne le volume récupéré"""
+        with self._run_lock:
+            started = time.monotonic()
+            deadline = started + self.time_budget
+            report = {'entries': 0, 'bytes': 0, 'files': 0, 'file_bytes': 0,
+                      'namespaces': {}, 'complete': True}
+
+            # 1. Entrées expirées, par lots
+            while True:
+                purged = self.cache.purge_expired(limit=self.batch_size)
+                self._merge(report, purged)
+                if purged['entries'] < self.batch_size:
+                    break
+                if time.monotonic() >= deadline:
+                    report['complete'] = False
+                    break
+
+            # 2. Quotas par namespace
+            for namespace, used in self.cache.disk.namespace_sizes().items():
+                quota = self.quotas.get(namespace, self.default_quota)
+                while quota and used > quota:
+                    if time.monotonic() >= deadline:
+                        report['complete'] = False
+                        break
+                    evicted = self.cache.disk.evict(namespace, used - quota, limit=self.batch_size)
+                    if not evicted['entries']:
+                        break
+                    self._merge(report, evicted)
+                    used -= evicted['bytes']
+
+            # 3. Anciens répertoires de cache fichier
+            for directory, max_age in self.legacy_dirs.items():
+                if time.monotonic() >= deadline:
+                    report['complete'] = False
+                    break
+                if not self._sweep_directory(directory, max_age, deadline, report):
+                    report['complete'] = False
+
+            self._record(report, time.monotonic() - started)
+            return report
+
+    def _sweep_directory(self, directory: str, max_age: float, deadline: float, report: Dict) -> bool:
+        """Supprime les fichiers plus vieux que max_age ; False si le budget est épuisé avant la fin"""
+        scanner = self._scanners.get(directory)
+        if scanner is None:
+            if not os.path.isdir(directory):
+                return True
+            scanner = self._scanners[directory] = os.scandir(directory)
+        cutoff = time.time() - max_age
+        for entry in scanner:
+            try:
+                if entry.is_file() and entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    if stat.st_mtime < cutoff:
+                        os.remove(entry.path)
+                        report['files'] += 1
+                        report['file_bytes'] += stat.st_size
+            except OSError:
+                pass
+            if time.monotonic() >= deadline:
+                return False
+        scanner.close()
+        del self._scanners[directory]
+        return True
+
+    @staticmethod
+    def _merge(report: Dict, deleted: Dict):
+        report['entries'] += deleted['entries']
+        report['bytes'] += deleted['bytes']
+        for namespace, ns_deleted in deleted.get('namespaces', {}).items():
+            ns_report = report['namespaces'].setdefault(namespace, {'entries': 0, 'bytes': 0})
+            ns_report['entries'] += ns_deleted['entries']
+            ns_report['bytes'] += ns_deleted['bytes']
+
+    def _record(self, report: Dict, duration: float):
+        self.stats['runs'] += 1
+        for counter in ('entries', 'bytes', 'files', 'file_bytes'):
+            self.stats[counter] += report[counter]
+        self._merge({'entries': 0, 'bytes': 0, 'namespaces': self.stats['namespaces']}, report)
+        self.stats['last_run'] = time.time()
+        self.stats['last_duration_ms'] = round(duration * 1000, 1)
+        self.stats['last_report'] = report
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['namespaces'] = {ns: dict(s) for ns, s in self.stats['namespaces'].items()}
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        stats['quotas'] = {ns: self.quotas.get(ns, self.default_quota)
+                           for ns in self.cache.disk.namespace_sizes()}
+        return stats
+
+
+# ===== INSTANCES GLOBALES =====
+single_flight = SingleFlight()
+
+cache = TieredCache(
+    config.CACHE_DB_FILE,
+    max_entries=config.CACHE_MEMORY_MAX_ENTRIES,
+    max_bytes=config.CACHE_MEMORY_MAX_BYTES
+)
+
+cache_janitor = CacheJanitor(
+    cache,
+    interval=config.CACHE_JANITOR_INTERVAL,
+    time_budget=config.CACHE_JANITOR_TIME_BUDGET,
+    quotas=config.CACHE_NAMESPACE_QUOTAS,
+    default_quota=config.CACHE_DEFAULT_NAMESPACE_QUOTA,
+    legacy_dirs=config.CACHE_LEGACY_DIRS
+)
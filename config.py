@@ -30,6 +30,7 @@ class Config:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     DATA_DIR = os.path.join(BASE_DIR, 'data')
     CACHE_DIR = os.path.join(BASE_DIR, 'api_cache')
+    CACHE_DB_FILE = os.getenv('CACHE_DB_FILE', os.path.join(CACHE_DIR, 'cache.sqlite3'))
     TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
     STATIC_DIR = os.path.join(BASE_DIR, 'static')
     
@@ -48,18 +49,125 @@ class Config:
     ATMOSPHERIC_PRESSURE_SEA = 1013.25
     
     # ===== LIMITES API =====
-    API_LIMITS = {
-        'openweather': {'max_per_day': 1000, 'cache_duration': 30*60},
-        'stormglass': {'max_per_day': 10, 'cache_duration': 6*60*60},
-        'worldtides': {'max_per_day': 10, 'cache_duration': 6*60*60},
-        'nominatim': {'max_per_hour': 1, 'cache_duration': 24*60*60},
-        'emodnet': {'max_per_hour': 10, 'cache_duration': 7*24*60*60},
-        'openmeteo': {'max_per_hour': 100, 'cache_duration': 30*60},
-        'meteoconcept': {'max_per_day': 100, 'cache_duration': 60*60}
+    # Budgets par source : seau à jetons (rate/s, burst) + plafonds horaire/journalier,
+    # état partagé entre workers (rate_limiter.py) ; host relie les 429 HTTP à la source
+    RATE_LIMITS = {
+        'openweather': {'rate': 1.0, 'burst': 5, 'max_per_hour': int(os.getenv('OPENWEATHER_MAX_PER_HOUR', 60)),
+                        'max_per_day': int(os.getenv('OPENWEATHER_MAX_PER_DAY', 1000)),
+                        'host': 'api.openweathermap.org'},
+        'nominatim': {'rate': 1.0, 'burst': 1, 'host': 'nominatim.openstreetmap.org'},  # 1 req/s max
+        'openmeteo': {'rate': 10.0, 'burst': 10, 'max_per_hour': 5000, 'max_per_day': 10000,
+                      'host': 'api.open-meteo.com'},
+        'openmeteo_marine': {'rate': 10.0, 'burst': 10, 'max_per_hour': 5000, 'max_per_day': 10000,
+                             'host': 'marine-api.open-meteo.com'}
     }
+    RATE_LIMIT_PENALTY_BASE = float(os.getenv('RATE_LIMIT_PENALTY_BASE', 60))  # pause après un 429 sans Retry-After
+    RATE_LIMIT_PENALTY_MAX = float(os.getenv('RATE_LIMIT_PENALTY_MAX', 3600))
+    NOMINATIM_MAX_WAIT = float(os.getenv('NOMINATIM_MAX_WAIT', 1.5))  # attente max d'un jeton Nominatim (s)
     
     # ===== CACHE =====
     WEATHER_CACHE_DURATION = 30 * 60  # 30 minutes
+    PREDICTION_CACHE_DURATION = 60 * 60  # 1 heure
+    FORECAST_24H_CACHE_DURATION = 30 * 60  # 30 minutes
+    FORECAST_10D_CACHE_DURATION = 60 * 60  # 1 heure
+    # TTL par namespace, alignés sur la validité réelle des données (secondes)
+    CACHE_DEFAULT_TTL = 60 * 60
+    CACHE_TTL = {
+        'weather': WEATHER_CACHE_DURATION,
+        'marine': WEATHER_CACHE_DURATION,
+        'openmeteo': 60 * 60,             # prévisions Open-Meteo (horaire + 10 jours)
+        'openmeteo_marine': 60 * 60,      # Open-Meteo Marine (vagues, SST)
+        'wind': 60 * 60,                  # vent WEkEO/ERA5 et Open-Meteo : pas horaire
+        'sst': 6 * 60 * 60,               # SST : analyse quotidienne (NOAA MUR, CMEMS)
+        'chl': 24 * 60 * 60,              # chlorophylle : produit journalier
+        'bathymetry': 180 * 24 * 60 * 60  # GEBCO : grille statique
+    }
+    # Maintenance en arrière-plan (CacheJanitor)
+    CACHE_JANITOR_INTERVAL = int(os.getenv('CACHE_JANITOR_INTERVAL', 300))  # secondes
+    CACHE_JANITOR_TIME_BUDGET = float(os.getenv('CACHE_JANITOR_TIME_BUDGET', 0.5))  # secondes par passe
+    CACHE_NAMESPACE_QUOTAS = {  # octets compressés sur disque
+        'prediction': 64 * 1024 * 1024,
+        'forecast_24h': 32 * 1024 * 1024,
+        'forecast_10d': 32 * 1024 * 1024
+    }
+    CACHE_DEFAULT_NAMESPACE_QUOTA = int(os.getenv('CACHE_DEFAULT_NAMESPACE_QUOTA', 64 * 1024 * 1024))
+    CACHE_LEGACY_DIRS = {  # anciens caches fichier -> âge maximal (secondes)
+        os.path.join(DATA_DIR, 'bathymetry_cache'): 30 * 24 * 3600,
+        os.path.join(DATA_DIR, 'wekeo_cache'): 3600,
+        os.path.join(DATA_DIR, 'real_ocean_cache'): 24 * 3600
+    }
+    # Grille de quantification des clés de cache par source (degrés), alignée sur
+    # la résolution native de chaque fournisseur : les positions d'une même maille
+    # partagent la même entrée
+    CACHE_GRID_RESOLUTION = {
+        'openweather': 0.1,   # OpenWeather ~11 km
+        'weather': 0.1,
+        'marine': 0.1,        # Open-Meteo ~11 km
+        'openmeteo': 0.1,
+        'openmeteo_marine': 0.05,   # Open-Meteo Marine ~5 km
+        'wind': 0.25,         # WEkEO / ERA5 0.25°
+        'sst': 0.05,          # NOAA MUR 0.01°, Open-Meteo Marine ~5 km
+        'chl': 0.05,          # Copernicus ~4 km
+        'worldtides': 0.1,
+        'nominatim': 0.01     # géocodage inverse ~1 km
+    }
+    # Fenêtre stale-while-revalidate : entrée expirée servie pendant le rafraîchissement
+    CACHE_STALE_GRACE = int(os.getenv('CACHE_STALE_GRACE', 30 * 60))
+    CACHE_MEMORY_MAX_ENTRIES = int(os.getenv('CACHE_MEMORY_MAX_ENTRIES', 2048))
+    CACHE_MEMORY_MAX_BYTES = int(os.getenv('CACHE_MEMORY_MAX_BYTES', 32 * 1024 * 1024))  # 32 Mo
+    PREDICTOR_MEMO_SIZE = int(os.getenv('PREDICTOR_MEMO_SIZE', 4096))  # entrées par sous-modèle mémoïsé (0 = désactivé)
+    
+    # ===== CLIENT HTTP AMONT (POOLS KEEP-ALIVE, RETRIES) =====
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 10))  # connexions conservées par hôte
+    HTTP_MAX_CONCURRENCY_PER_HOST = int(os.getenv('HTTP_MAX_CONCURRENCY_PER_HOST', 4))
+    HTTP_HOST_CONCURRENCY = {
+        'nominatim.openstreetmap.org': 1  # politique d'usage Nominatim
+    }
+    HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+    HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', 0.3))  # secondes, exponentiel
+    HTTP_RETRY_JITTER = float(os.getenv('HTTP_RETRY_JITTER', 0.3))  # gigue aléatoire max (secondes)
+    OPENMETEO_BATCH_SIZE = int(os.getenv('OPENMETEO_BATCH_SIZE', 50))  # positions par requête multi-positions
+    
+    # ===== EXÉCUTEUR I/O PARTAGÉ (APPELS AMONT EN PARALLÈLE) =====
+    IO_EXECUTOR_WORKERS = int(os.getenv('IO_EXECUTOR_WORKERS', 16))
+    IO_EXECUTOR_MAX_QUEUE = int(os.getenv('IO_EXECUTOR_MAX_QUEUE', 64))  # au-delà : exécution dans l'appelant
+    
+    # ===== DISJONCTEURS ET CACHE NÉGATIF (SOURCES AMONT) =====
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3))  # échecs consécutifs avant ouverture
+    CIRCUIT_RECOVERY_TIMEOUT = int(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', 60))  # secondes avant la sonde semi-ouverte
+    NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', 5 * 60))  # échec mémorisé par source et position
+    
+    # ===== CASCADES MULTI-SOURCES (ORDRE ADAPTATIF) =====
+    CASCADE_LATENCY_BUDGET = {  # secondes par requête pour l'ensemble d'une cascade
+        'wind': float(os.getenv('WIND_LATENCY_BUDGET', 8)),
+        'sst': float(os.getenv('SST_LATENCY_BUDGET', 12)),
+        'chl': float(os.getenv('CHL_LATENCY_BUDGET', 12))
+    }
+    SOURCE_MIN_SUCCESS_RATE = float(os.getenv('SOURCE_MIN_SUCCESS_RATE', 0.5))  # en dessous : source rétrogradée
+    SOURCE_PROBE_INTERVAL = int(os.getenv('SOURCE_PROBE_INTERVAL', 60))  # secondes avant de resonder une source écartée
+    # Mode couvert (SST, chlorophylle) : sources lancées en parallèle, décalées de HEDGE_STAGGER
+    HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'True').lower() == 'true'
+    HEDGE_STAGGER = float(os.getenv('HEDGE_STAGGER', 0.5))  # secondes entre deux lancements
+    HEDGE_GRACE = float(os.getenv('HEDGE_GRACE', 2.0))  # attente des sources mieux classées après une réponse
+    HEDGE_EXECUTOR_WORKERS = int(os.getenv('HEDGE_EXECUTOR_WORKERS', 8))
+    
+    # ===== PRÉCHAUFFAGE DU CACHE =====
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'False').lower() == 'true'
+    WARMUP_INTERVAL = int(os.getenv('WARMUP_INTERVAL', 0))  # secondes, 0 = au démarrage uniquement
+    WARMUP_SOURCES = os.getenv('WARMUP_SOURCES', 'favorites,cities,expert,known_depths').split(',')
+    WARMUP_SPECIES = [s for s in os.getenv('WARMUP_SPECIES', '').split(',') if s]  # vide = toutes
+    WARMUP_MAX_SPOTS = int(os.getenv('WARMUP_MAX_SPOTS', 60))
+    WARMUP_QUOTA_SHARE = float(os.getenv('WARMUP_QUOTA_SHARE', 0.2))  # part du quota journalier OpenWeather
+    WARMUP_DELAY = float(os.getenv('WARMUP_DELAY', 1.0))  # secondes entre spots (Nominatim : 1 req/s)
+    WARMUP_ADMIN_TOKEN = os.getenv('WARMUP_ADMIN_TOKEN', '')  # en-tête X-Admin-Token du POST manuel (vide = désactivé)
+    
+    # ===== PRÉCHARGEMENT PAR POPULARITÉ (QUOTA OPENWEATHER) =====
+    PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'True').lower() == 'true'
+    PREFETCH_INTERVAL = int(os.getenv('PREFETCH_INTERVAL', 300))  # secondes entre deux passes
+    PREFETCH_QUOTA_SHARE = float(os.getenv('PREFETCH_QUOTA_SHARE', 0.5))  # part du quota réservée aux mailles chaudes
+    PREFETCH_MAX_CELLS = int(os.getenv('PREFETCH_MAX_CELLS', 50))  # mailles chaudes suivies
+    PREFETCH_LEAD = int(os.getenv('PREFETCH_LEAD', 300))  # rafraîchir avant expiration (secondes)
+    POPULARITY_HALF_LIFE = int(os.getenv('POPULARITY_HALF_LIFE', 24 * 3600))  # décroissance des demandes
     
     # ===== URLS API =====
     OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
@@ -0,0 +1,122 @@
+# forecast_service.py
+"""
+Service interne des prévisions 24h
+Structures typées partagées par /api/24h_forecast et /api/tunisian_prediction :
+la sérialisation JSON n'a lieu qu'à la frontière HTTP (to_dict)
+"""
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class HourlyScore:
+    """Score de pêche d'une heure"""
+    hour: int
+    time: str
+    score: int
+    timestamp: float
+
+
+@dataclass(frozen=True)
+class ScoreWindow:
+    """Créneau de plusieurs heures consécutives"""
+    start: str
+    end: str
+    avg_score: float
+    peak: int
+    start_hour: int
+    end_hour: int
+
+
+@dataclass
+class Forecast24h:
+    """Prévisions horaires d'un spot pour une espèce"""
+    lat: float
+    lon: float
+    species: str
+    generated_at: datetime
+    hourly: List[HourlyScore] = field(default_factory=list)
+
+    @property
+    def hours(self) -> List[str]:
+        return [f"{h.hour}h" for h in self.hourly]
+
+    @property
+    def scores(self) -> List[int]:
+        return [h.score for h in self.hourly]
+
+    @property
+    def current_score(self) -> int:
+        return self.hourly[0].score if self.hourly else 0
+
+    @property
+    def best(self) -> Optional[HourlyScore]:
+        """Première heure atteignant le meilleur score"""
+        return max(self.hourly, key=lambda h: h.score) if self.hourly else None
+
+    def score_at(self, hour: int) -> Optional[int]:
+        """Score de la première heure hour (0-23), sinon celui de la première heure"""
+        for h in self.hourly:
+            if h.hour == hour:
+                return h.score
+        return self.current_score if self.hourly else None
+
+    def trend(self) -> str:
+        """Tendance sur les 3 prochaines heures"""
+        scores = self.scores
+        if len(scores) >= 4:
+            if scores[3] > scores[0] + 3:
+                return 'rising'
+            if scores[3] < scores[0] - 3:
+                return 'falling'
+        return 'stable'
+
+    def best_windows(self, size: int = 3, top: int = 3) -> List[ScoreWindow]:
+        """Meilleurs créneaux de size heures, par score moyen décroissant"""
+        windows = []
+        for i in range(len(self.hourly) - size + 1):
+            window = self.hourly[i:i + size]
+            window_scores = [h.score for h in window]
+            windows.append(ScoreWindow(
+                start=window[0].time,
+                end=window[-1].time,
+                avg_score=round(sum(window_scores) / size, 1),
+                peak=max(window_scores),
+                start_hour=window[0].hour,
+                end_hour=window[-1].hour
+            ))
+        windows.sort(key=lambda w: w.avg_score, reverse=True)
+        return windows[:top]
+
+    def note(self) -> Optional[str]:
+        best = self.best
+        if best is None or best.score != self.current_score:
+            return None
+        if best is self.hourly[0]:
+            return "🔥 Le meilleur moment est MAINTENANT !"
+        return f"🔥 Meilleur moment également à {best.hour}h"
+
+    def to_dict(self) -> Dict:
+        """Réponse JSON de /api/24h_forecast"""
+        best = self.best
+        return {
+            'status': 'success',
+            'hours': self.hours,
+            'scores': self.scores,
+            'current_hour': self.generated_at.hour,
+            'current_score': self.current_score,
+            'best_hour': f"{best.hour}h" if best else '--',
+            'best_time': best.time if best else '--:--',
+            'best_hour_number': best.hour if best else None,
+            'best_score': best.score if best else 0,
+            'best_windows': [asdict(w) for w in self.best_windows()],
+            'trend': self.trend(),
+            'note': self.note(),
+            'metadata': {
+                'location': {'lat': self.lat, 'lon': self.lon},
+                'species': self.species,
+                'data_source': 'scientific_complete',
+                'timestamp': datetime.now().isoformat()
+            }
+        }
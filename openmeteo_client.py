@@ -0,0 +1,223 @@
+# openmeteo_client.py
+"""
+Adaptateur Open-Meteo unique
+Une requête par maille et par jeu de données (prévisions / marine) demandant
+l'union des variables utiles ; le résultat colonnaire est mis en cache et
+chaque consommateur (vent actuel, série horaire, 10 jours, SST, vagues)
+en extrait sa tranche
+"""
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import config
+from cache_manager import cache, single_flight, snap_to_grid
+from upstream import call_upstream, http_client
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+MARINE_URL = "https://marine-api.open-meteo.com/v1/marine"
+
+# Union des variables de tous les consommateurs
+FORECAST_HOURLY = ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'precipitation',
+                   'wind_speed_10m', 'wind_direction_10m', 'weather_code']
+FORECAST_DAILY = ['temperature_2m_max', 'temperature_2m_min', 'precipitation_sum',
+                  'wind_speed_10m_max', 'wind_direction_10m_dominant', 'weather_code']
+MARINE_HOURLY = ['wave_height', 'sea_surface_temperature']
+MARINE_DAILY = ['wave_height_max']
+
+# Codes WMO -> conditions au format OpenWeather (calculate_weather_score)
+WMO_CONDITIONS = [((0,), 'Clear'), ((1, 2, 3), 'Clouds'), ((45, 48), 'Fog'), ((51, 53, 55, 56, 57), 'Drizzle'),
+                  ((61, 63, 65, 66, 67, 80, 81, 82), 'Rain'), ((71, 73, 75, 77, 85, 86), 'Snow'),
+                  ((95, 96, 99), 'Thunderstorm')]
+
+
+def wmo_condition(code) -> str:
+    for codes, condition in WMO_CONDITIONS:
+        if code in codes:
+            return condition
+    return 'Clouds'
+
+
+class OpenMeteoClient:
+    """Accès mutualisé aux API Open-Meteo (prévisions et marine)
+
+    Jeux de données :
+    - 'openmeteo' : horaire + quotidien sur forecast_days jours
+    - 'openmeteo_marine' : vagues et SST horaires + vagues max quotidiennes
+    Chaque jeu est un namespace du cache partagé (maille CACHE_GRID_RESOLUTION),
+    protégé par le disjoncteur du même nom ; les appels concurrents sur une
+    même maille sont coalescés.
+    """
+
+    def __init__(self, forecast_days: int = 10, marine_days: int = 3, timeout: float = 10, batch_size: int = 50):
+        self.forecast_days = forecast_days
+        self.marine_days = marine_days
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.stats = {'requests': 0, 'slices': 0, 'batch_requests': 0, 'batch_locations': 0}
+        # jeu de données -> (namespace du cache / disjoncteur, URL, variables demandées)
+        self.datasets = {
+            'forecast': ('openmeteo', FORECAST_URL, {
+                'hourly': ','.join(FORECAST_HOURLY),
+                'daily': ','.join(FORECAST_DAILY),
+                'forecast_days': forecast_days
+            }),
+            'marine': ('openmeteo_marine', MARINE_URL, {
+                'hourly': ','.join(MARINE_HOURLY),
+                'daily': ','.join(MARINE_DAILY),
+                'forecast_days': marine_days
+            })
+        }
+
+    # ===== JEUX DE DONNÉES =====
+
+    def get_forecast(self, lat: float, lon: float) -> Optional[Dict]:
+        """Prévisions colonnaires {'hourly': {...}, 'daily': {...}}, None si indisponible"""
+        return self._dataset('forecast', lat, lon)
+
+    def get_marine(self, lat: float, lon: float) -> Optional[Dict]:
+        """Données marines colonnaires (vagues, SST), None si indisponible"""
+        return self._dataset('marine', lat, lon)
+
+    def _dataset(self, dataset: str, lat: float, lon: float) -> Optional[Dict]:
+        namespace, url, variables = self.datasets[dataset]
+        grid_lat, grid_lon = snap_to_grid(namespace, lat, lon)
+        params = {'lat': grid_lat, 'lon': grid_lon}
+        self.stats['slices'] += 1
+        cached = cache.get(namespace, params)
+        if cached:
+            return cached
+
+        def fetch():
+            data = call_upstream(namespace, self._request, url, grid_lat, grid_lon, variables,
+                                 negative_params=params)
+            if data:
+                cache.set(namespace, params, data)
+            return data
+        return single_flight.do((namespace, grid_lat, grid_lon), fetch)
+
+    def _request(self, url: str, lat: float, lon: float, variables: Dict) -> Optional[Dict]:
+        results = self._request_batch(url, [lat], [lon], variables)
+        return results[0] if results else None
+
+    def _request_batch(self, url: str, lats: List[float], lons: List[float], variables: Dict) -> Optional[List[Dict]]:
+        """Une requête pour plusieurs positions (listes séparées par des virgules)"""
+        self.stats['requests'] += 1
+        response = http_client.get(url, params={'latitude': ','.join(str(lat) for lat in lats),
+                                                'longitude': ','.join(str(lon) for lon in lons),
+                                                'timezone': 'Africa/Tunis', **variables}, timeout=self.timeout)
+        if response.status_code != 200:
+            print(f"⚠️ Open-Meteo {url.split('//')[1].split('/')[0]} erreur {response.status_code}")
+            return None
+        data = response.json()
+        locations = data if isinstance(data, list) else [data]
+        if len(locations) != len(lats):
+            print(f"⚠️ Open-Meteo: {len(locations)} positions reçues pour {len(lats)} demandées")
+            return None
+        return [self._columnar(location) for location in locations]
+
+    @staticmethod
+    def _columnar(data: Dict) -> Dict:
+        hourly = data.get('hourly', {})
+        # Horodatages unix pour les recherches par heure (heures locales -> UTC)
+        offset = data.get('utc_offset_seconds', 0)
+        hourly['epoch'] = [int(datetime.fromisoformat(t).replace(tzinfo=timezone.utc).timestamp()) - offset
+                           for t in hourly.get('time', [])]
+        return {'hourly': hourly, 'daily': data.get('daily', {}), 'utc_offset_seconds': offset,
+                'fetched_at': time.time()}
+
+    def prefetch(self, positions: Iterable[Tuple[float, float]], datasets: Iterable[str] = ('forecast', 'marine')) -> Dict:
+        """Remplit le cache pour de nombreuses positions en requêtes multi-positions
+
+        Les positions sont ramenées à leur maille, dédoublonnées, les mailles déjà
+        en cache ignorées ; le reste part par lots de batch_size positions.
+        """
+        positions = list(positions)
+        report = {}
+        for dataset in datasets:
+            namespace, url, variables = self.datasets[dataset]
+            cells = list(dict.fromkeys(snap_to_grid(namespace, lat, lon) for lat, lon in positions))
+            missing = [cell for cell in cells if not cache.get(namespace, {'lat': cell[0], 'lon': cell[1]})]
+            fetched = requests_sent = 0
+            for start in range(0, len(missing), self.batch_size):
+                batch = missing[start:start + self.batch_size]
+                requests_sent += 1
+                results = call_upstream(namespace, self._request_batch, url, [lat for lat, _ in batch],
+                                        [lon for _, lon in batch], variables)
+                if not results:
+                    continue
+                for (lat, lon), data in zip(batch, results):
+                    cache.set(namespace, {'lat': lat, 'lon': lon}, data)
+                fetched += len(batch)
+            self.stats['batch_requests'] += requests_sent
+            self.stats['batch_locations'] += fetched
+            report[dataset] = {'positions': len(positions), 'cells': len(cells), 'cached': len(cells) - len(missing),
+                               'fetched': fetched, 'requests': requests_sent}
+        return report
+
+    # ===== TRANCHES PAR CONSOMMATEUR =====
+
+    @staticmethod
+    def hour_index(data: Dict, timestamp: float) -> Optional[int]:
+        """Index de l'heure contenant timestamp dans la série horaire"""
+        epoch = int(timestamp) // 3600 * 3600
+        try:
+            return data['hourly']['epoch'].index(epoch)
+        except (KeyError, ValueError):
+            return None
+
+    def hourly_series(self, lat: float, lon: float) -> Optional[Dict]:
+        """Série horaire pour le prédicteur {'time': [unix], 'temperature': [...], ...}"""
+        data = self.get_forecast(lat, lon)
+        if not data:
+            return None
+        hourly = data['hourly']
+        return {
+            'time': hourly['epoch'],
+            'temperature': hourly['temperature_2m'],
+            'humidity': hourly['relative_humidity_2m'],
+            'pressure': hourly['pressure_msl'],
+            'wind_speed': hourly['wind_speed_10m'],
+            'wind_direction': hourly['wind_direction_10m'],
+            'weather_code': hourly['weather_code']
+        }
+
+    def current_wind(self, lat: float, lon: float) -> Optional[Dict]:
+        """Vent de l'heure courante (km/h, degrés)"""
+        data = self.get_forecast(lat, lon)
+        i = self.hour_index(data, time.time()) if data else None
+        if i is None:
+            return None
+        speed = data['hourly']['wind_speed_10m'][i]
+        direction = data['hourly']['wind_direction_10m'][i]
+        if speed is None or direction is None:
+            return None
+        return {'wind_speed_kmh': speed, 'wind_direction_deg': direction}
+
+    def sea_surface_temperature(self, lat: float, lon: float, hours: int = 24) -> Optional[float]:
+        """Médiane de la SST sur les prochaines heures (°C)"""
+        values = self._next_hours(self.get_marine(lat, lon), 'sea_surface_temperature', hours)
+        if not values:
+            return None
+        values.sort()
+        return values[len(values) // 2]
+
+    def wave_height_max(self, lat: float, lon: float) -> Optional[float]:
+        """Hauteur de vague maximale du jour (m)"""
+        data = self.get_marine(lat, lon)
+        values = data['daily'].get('wave_height_max', []) if data else []
+        return values[0] if values and values[0] is not None else None
+
+    def _next_hours(self, data: Optional[Dict], variable: str, hours: int) -> List[float]:
+        if not data:
+            return []
+        start = self.hour_index(data, time.time()) or 0
+        column = data['hourly'].get(variable, [])
+        return [v for v in column[start:start + hours] if v is not None]
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+
+# Instance globale
+openmeteo = OpenMeteoClient(batch_size=config.OPENMETEO_BATCH_SIZE)
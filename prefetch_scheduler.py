@@ -0,0 +1,236 @@
+# prefetch_scheduler.py
+"""
+Rafraîchissement anticipé des mailles les plus demandées
+La popularité de chaque maille (demandes avec décroissance exponentielle) est
+partagée entre workers ; le budget journalier réservé est réparti sur la
+journée et dépensé sur les mailles chaudes juste avant l'expiration de leur
+cache. Les mailles rares ne consomment que la part non réservée du quota,
+puis passent au modèle de secours.
+"""
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache_manager import SQLiteCacheStore, SharedCounters
+
+
+class PopularityTracker:
+    """Compteur de demandes par maille, décroissance de demi-vie half_life
+
+    Les demandes sont accumulées en mémoire puis fusionnées dans la base
+    partagée par flush() (une transaction par passe, pas d'écriture par requête).
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cell_popularity ("
+        " namespace TEXT NOT NULL,"
+        " lat REAL NOT NULL,"
+        " lon REAL NOT NULL,"
+        " score REAL NOT NULL,"
+        " updated_at REAL NOT NULL,"
+        " PRIMARY KEY (namespace, lat, lon)"
+        ") WITHOUT ROWID"
+    )
+
+    def __init__(self, store: SQLiteCacheStore, half_life: float = 24 * 3600, min_score: float = 0.05):
+        self.store = store
+        self.half_life = half_life
+        self.min_score = min_score
+        self._pending: Dict[Tuple[str, float, float], int] = {}
+        self._lock = threading.Lock()
+        self.store._connect().execute(self.SCHEMA)
+
+    def hit(self, namespace: str, lat: float, lon: float):
+        """Une demande pour la maille (lat, lon déjà ramenés à la grille)"""
+        with self._lock:
+            key = (namespace, lat, lon)
+            self._pending[key] = self._pending.get(key, 0) + 1
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated_at) / self.half_life)
+
+    def flush(self) -> int:
+        """Fusionne les demandes en attente dans la base ; purge les mailles oubliées"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        now = time.time()
+        conn = self.store._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for (namespace, lat, lon), hits in pending.items():
+                row = conn.execute("SELECT score, updated_at FROM cell_popularity WHERE namespace = ? AND lat = ? AND lon = ?",
+                                   (namespace, lat, lon)).fetchone()
+                score = (self._decayed(row[0], row[1], now) if row else 0.0) + hits
+                conn.execute("INSERT OR REPLACE INTO cell_popularity (namespace, lat, lon, score, updated_at)"
+                             " VALUES (?, ?, ?, ?, ?)", (namespace, lat, lon, score, now))
+            # Score décru sous min_score : la maille n'est plus demandée
+            forgotten = [row[:3] for row in conn.execute(
+                "SELECT namespace, lat, lon, score, updated_at FROM cell_popularity WHERE updated_at < ?",
+                (now - self.half_life,)) if self._decayed(row[3], row[4], now) < self.min_score]
+            conn.executemany("DELETE FROM cell_popularity WHERE namespace = ? AND lat = ? AND lon = ?", forgotten)
+            conn.execute("COMMIT")
+            return len(pending)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._lock:  # demandes conservées pour la passe suivante
+                for key, hits in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + hits
+            print(f"⚠️ Popularité des mailles: {e}")
+            return 0
+
+    def top(self, namespace: str, limit: int) -> List[Tuple[float, float, float]]:
+        """[(lat, lon, score)] des mailles les plus demandées, score décru à maintenant"""
+        now = time.time()
+        try:
+            rows = self.store._connect().execute(
+                "SELECT lat, lon, score, updated_at FROM cell_popularity WHERE namespace = ?", (namespace,)).fetchall()
+        except Exception as e:
+            print(f"⚠️ Lecture popularité: {e}")
+            return []
+        cells = [(lat, lon, self._decayed(score, updated_at, now)) for lat, lon, score, updated_at in rows]
+        cells = [cell for cell in cells if cell[2] >= self.min_score]
+        cells.sort(key=lambda cell: cell[2], reverse=True)
+        return cells[:limit]
+
+
+class PrefetchScheduler:
+    """Dépense la part réservée d'un quota journalier sur les mailles chaudes
+
+    À chaque passe (toutes les interval secondes, une seule passe par créneau
+    pour l'ensemble des workers via claim_tick) :
+    - autorisé = quota réservé x fraction de la journée écoulée (+ une passe),
+      moins les rafraîchissements déjà faits aujourd'hui : le budget est lissé
+      sur 24h et le reliquat d'une passe est reporté sur les suivantes
+    - les max_cells mailles les plus demandées dont le cache expire dans moins
+      de lead secondes (ou absent) sont rafraîchies, par popularité décroissante
+
+    Callables fournis par l'application :
+    - refresh(lat, lon) -> Optional[bool] : appel amont forcé pour la maille ;
+      True succès, False échec, None aucun appel fait (disjoncteur, quota) :
+      seuls les appels réellement faits sont décomptés de la réserve
+    - entry_age(lat, lon) -> Optional[float] : âge de l'entrée en cache (s)
+    - budget() -> {'used_today': int, 'max_per_day': int} : quota de la source
+    Les rafraîchissements du jour sont comptés dans counters (partagés).
+    """
+
+    def __init__(self, tracker: PopularityTracker, namespace: str, refresh: Callable[[float, float], Optional[bool]],
+                 entry_age: Callable[[float, float], Optional[float]], budget: Callable[[], Dict],
+                 counters: SharedCounters, ttl: float, reserve_share: float = 0.5,
+                 lead: float = 300, interval: float = 300, max_cells: int = 50,
+                 claim_tick: Optional[Callable[[int], bool]] = None):
+        self.tracker = tracker
+        self.namespace = namespace
+        self.refresh = refresh
+        self.entry_age = entry_age
+        self.budget = budget
+        self.counters = counters
+        self.ttl = ttl
+        self.reserve_share = reserve_share
+        self.lead = lead
+        self.interval = interval
+        self.max_cells = max_cells
+        self.claim_tick = claim_tick
+        self._hot = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.stats = {'ticks': 0, 'refreshed': 0, 'failed': 0, 'skipped': 0, 'on_demand_denied': 0, 'hot_cells': 0,
+                      'last_allowance': 0, 'last_due': 0, 'last_run': None}
+
+    def hit(self, lat: float, lon: float):
+        self.tracker.hit(self.namespace, lat, lon)
+
+    def _used_key(self) -> str:
+        return f"prefetch_{self.namespace}_{datetime.now().strftime('%Y%m%d')}"
+
+    def allow_on_demand(self, lat: float, lon: float) -> bool:
+        """Appel amont à la demande autorisé ? Toujours pour une maille chaude ;
+        sinon tant que la part non réservée du quota du jour n'est pas épuisée"""
+        if (lat, lon) in self._hot:
+            return True
+        budget = self.budget()
+        on_demand_used = budget.get('used_today', 0) - self.counters.get(self._used_key())
+        if on_demand_used < budget['max_per_day'] * (1 - self.reserve_share):
+            return True
+        self.stats['on_demand_denied'] += 1
+        return False
+
+    def allowance(self) -> int:
+        """Rafraîchissements autorisés pour cette passe (budget lissé sur la journée)"""
+        now = datetime.now()
+        elapsed = (now - now.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds()
+        budget = self.budget()
+        reserve = budget['max_per_day'] * self.reserve_share
+        paced = reserve * min(1.0, (elapsed + self.interval) / 86400)
+        remaining_today = budget['max_per_day'] - budget.get('used_today', 0)
+        return max(0, min(int(paced) - self.counters.get(self._used_key()), remaining_today))
+
+    def run_once(self) -> Dict:
+        """Une passe : fusion des demandes, mailles chaudes, rafraîchissements dus"""
+        self.tracker.flush()
+        hot = self.tracker.top(self.namespace, self.max_cells)
+        self._hot = {(lat, lon) for lat, lon, _ in hot}
+        self.stats['hot_cells'] = len(hot)
+        slot = int(time.time() // self.interval)
+        if self.claim_tick is not None and not self.claim_tick(slot):
+            return {'hot_cells': len(hot), 'claimed': False}
+
+        due = []
+        for lat, lon, score in hot:
+            age = self.entry_age(lat, lon)
+            if age is None or age >= self.ttl - self.lead:
+                due.append((lat, lon, score))
+        allowance = self.allowance()
+        refreshed = failed = skipped = 0
+        for lat, lon, _ in due:
+            if refreshed + failed >= allowance or self._stop.is_set():
+                break
+            outcome = self.refresh(lat, lon)
+            if outcome is None:  # aucun appel amont : quota non consommé
+                skipped += 1
+                continue
+            self.counters.incr(self._used_key())
+            if outcome:
+                refreshed += 1
+            else:
+                failed += 1
+        self.stats.update({'ticks': self.stats['ticks'] + 1, 'refreshed': self.stats['refreshed'] + refreshed,
+                           'failed': self.stats['failed'] + failed, 'skipped': self.stats['skipped'] + skipped,
+                           'last_allowance': allowance, 'last_due': len(due), 'last_run': datetime.now().isoformat()})
+        if refreshed or failed:
+            print(f"🔄 Préchargement {self.namespace}: {refreshed} mailles rafraîchies "
+                  f"({len(due)} dues, {allowance} autorisées)")
+        return {'hot_cells': len(hot), 'claimed': True, 'due': len(due), 'allowance': allowance,
+                'refreshed': refreshed, 'failed': failed, 'skipped': skipped}
+
+    def start(self):
+        """Démarre la boucle de passes (un thread par processus, sûr après fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f'prefetch-{self.namespace}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval - time.time() % self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Préchargement {self.namespace}: {e}")
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['refreshed_today'] = self.counters.get(self._used_key())
+        stats['reserve_per_day'] = int(self.budget()['max_per_day'] * self.reserve_share)
+        stats['hot'] = [{'lat': lat, 'lon': lon, 'score': round(score, 2)}
+                        for lat, lon, score in self.tracker.top(self.namespace, 10)]
+        return stats
@@ -0,0 +1,223 @@
+# rate_limiter.py
+"""
+Limitation des appels aux API amont, partagée entre tous les workers
+Seau à jetons (débit + rafale) et plafonds horaire / journalier par source,
+état persistant en SQLite (même base que le cache), blocage temporaire avec
+backoff exponentiel après un 429 puis reprise automatique
+"""
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from config import config
+from cache_manager import cache, SQLiteCacheStore
+
+
+class RateLimiter:
+    """Budget d'appels par source amont
+
+    limits : {source: {'rate': jetons/s, 'burst': capacité du seau,
+                       'max_per_hour': ..., 'max_per_day': ..., 'host': ...}}
+    Un appel consomme un jeton et une unité des fenêtres horaire et journalière
+    (heure et jour calendaires locaux : remise à zéro réelle à chaque changement).
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS rate_limits ("
+        " source TEXT PRIMARY KEY,"
+        " tokens REAL NOT NULL,"
+        " refilled_at REAL NOT NULL,"
+        " hour_key TEXT NOT NULL,"
+        " hour_count INTEGER NOT NULL,"
+        " day_key TEXT NOT NULL,"
+        " day_count INTEGER NOT NULL,"
+        " blocked_until REAL NOT NULL,"
+        " strikes INTEGER NOT NULL"
+        ") WITHOUT ROWID"
+    )
+
+    def __init__(self, store: SQLiteCacheStore, limits: Dict[str, Dict], penalty_base: float = 60.0,
+                 penalty_max: float = 3600.0):
+        self.store = store
+        self.limits = limits
+        self.penalty_base = penalty_base
+        self.penalty_max = penalty_max
+        self.hosts = {spec['host']: source for source, spec in limits.items() if spec.get('host')}
+        self._penalized = set()  # sources pénalisées par ce processus (remise à zéro au prochain succès)
+        self._lock = threading.Lock()
+        self.stats = {source: {'acquired': 0, 'rejected': 0, 'throttled_429': 0} for source in limits}
+        self.store._connect().execute(self.SCHEMA)
+
+    # ===== ÉTAT PERSISTANT =====
+
+    def _load(self, conn, source: str, now: float) -> Dict:
+        spec = self.limits[source]
+        row = conn.execute(
+            "SELECT tokens, refilled_at, hour_key, hour_count, day_key, day_count, blocked_until, strikes"
+            " FROM rate_limits WHERE source = ?", (source,)).fetchone()
+        state = dict(zip(('tokens', 'refilled_at', 'hour_key', 'hour_count', 'day_key', 'day_count',
+                          'blocked_until', 'strikes'), row)) if row else {
+            'tokens': float(spec.get('burst', 1)), 'refilled_at': now, 'hour_key': '', 'hour_count': 0,
+            'day_key': '', 'day_count': 0, 'blocked_until': 0.0, 'strikes': 0}
+        # Remplissage du seau et changement de fenêtre
+        if spec.get('rate'):
+            state['tokens'] = min(float(spec.get('burst', 1)),
+                                  state['tokens'] + (now - state['refilled_at']) * spec['rate'])
+        state['refilled_at'] = now
+        local = datetime.fromtimestamp(now)
+        hour_key, day_key = local.strftime('%Y%m%d%H'), local.strftime('%Y%m%d')
+        if state['hour_key'] != hour_key:
+            state['hour_key'], state['hour_count'] = hour_key, 0
+        if state['day_key'] != day_key:
+            state['day_key'], state['day_count'] = day_key, 0
+        return state
+
+    @staticmethod
+    def _save(conn, source: str, state: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO rate_limits (source, tokens, refilled_at, hour_key, hour_count,"
+            " day_key, day_count, blocked_until, strikes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (source, state['tokens'], state['refilled_at'], state['hour_key'], state['hour_count'],
+             state['day_key'], state['day_count'], state['blocked_until'], state['strikes']))
+
+    def _transaction(self, source: str, update) -> Optional[Dict]:
+        """Lecture-modification-écriture atomique de l'état de source (BEGIN IMMEDIATE)"""
+        conn = self.store._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            state = self._load(conn, source, time.time())
+            result = update(state)
+            self._save(conn, source, state)
+            conn.execute("COMMIT")
+            return result
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️ Erreur limiteur {source}: {e}")
+            return None
+
+    def _blocking_reason(self, source: str, state: Dict, now: float):
+        """(raison, secondes avant nouvel essai) ou (None, 0) si un appel est possible"""
+        spec = self.limits[source]
+        if state['blocked_until'] > now:
+            return '429', state['blocked_until'] - now
+        if spec.get('max_per_day') and state['day_count'] >= spec['max_per_day']:
+            tomorrow = (datetime.fromtimestamp(now) + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            return 'daily', tomorrow.timestamp() - now
+        if spec.get('max_per_hour') and state['hour_count'] >= spec['max_per_hour']:
+            return 'hourly', 3600 - now % 3600
+        if spec.get('rate') and state['tokens'] < 1:
+            return 'rate', (1 - state['tokens']) / spec['rate']
+        return None, 0.0
+
+    # ===== API =====
+
+    def acquire(self, source: str, wait: float = 0.0) -> bool:
+        """Consomme un appel du budget de source ; attend au plus wait secondes un jeton"""
+        if source not in self.limits:
+            return True
+        deadline = time.time() + wait
+
+        def take(state):
+            reason, retry_in = self._blocking_reason(source, state, state['refilled_at'])
+            if reason is None:
+                state['tokens'] -= 1 if self.limits[source].get('rate') else 0
+                state['hour_count'] += 1
+                state['day_count'] += 1
+            return reason, retry_in
+
+        while True:
+            outcome = self._transaction(source, take)
+            if outcome is None:
+                return True  # base indisponible : ne pas bloquer les appels
+            reason, retry_in = outcome
+            if reason is None:
+                with self._lock:
+                    self.stats[source]['acquired'] += 1
+                return True
+            if reason != 'rate' or time.time() + retry_in > deadline:
+                with self._lock:
+                    self.stats[source]['rejected'] += 1
+                return False
+            time.sleep(retry_in)
+
+    def penalize(self, source: str, retry_after: Optional[float] = None):
+        """429 reçu : blocage retry_after secondes, sinon backoff exponentiel"""
+        if source not in self.limits:
+            return
+
+        def block(state):
+            state['strikes'] += 1
+            delay = retry_after or min(self.penalty_max, self.penalty_base * 2 ** (state['strikes'] - 1))
+            state['blocked_until'] = max(state['blocked_until'], state['refilled_at'] + delay)
+            return delay
+
+        delay = self._transaction(source, block)
+        with self._lock:
+            self.stats[source]['throttled_429'] += 1
+            self._penalized.add(source)
+        print(f"⏳ {source}: limite amont atteinte (429), pause de {delay or 0:.0f}s")
+
+    def record_success(self, source: str):
+        """Réponse normale après une pénalité : le backoff repart de zéro"""
+        with self._lock:
+            if source not in self._penalized:
+                return
+            self._penalized.discard(source)
+
+        def reset(state):
+            state['strikes'] = 0
+        self._transaction(source, reset)
+
+    def observe(self, host: str, status_code: int, retry_after: Optional[str] = None):
+        """Appelé par le client HTTP pour chaque réponse d'un hôte limité"""
+        source = self.hosts.get(host)
+        if source is None:
+            return
+        if status_code == 429:
+            try:
+                delay = float(retry_after) if retry_after else None
+            except ValueError:
+                delay = None
+            self.penalize(source, delay)
+        elif status_code < 400:
+            self.record_success(source)
+
+    def status(self, source: str) -> Dict:
+        """Budget restant de source (lecture seule)"""
+        spec = self.limits.get(source, {})
+        now = time.time()
+        conn = self.store._connect()
+        try:
+            state = self._load(conn, source, now) if spec else None
+        except Exception as e:
+            print(f"⚠️ Erreur lecture limiteur {source}: {e}")
+            state = None
+        if state is None:
+            return {'source': source, 'limited': bool(spec)}
+        reason, retry_in = self._blocking_reason(source, state, now)
+        return {
+            'source': source,
+            'limited': True,
+            'available': reason is None,
+            'blocked_reason': reason,
+            'retry_in_seconds': round(retry_in, 1),
+            'tokens': round(state['tokens'], 2) if spec.get('rate') else None,
+            'burst': spec.get('burst'),
+            'rate_per_second': spec.get('rate'),
+            'used_this_hour': state['hour_count'],
+            'remaining_this_hour': max(0, spec['max_per_hour'] - state['hour_count']) if spec.get('max_per_hour') else None,
+            'used_today': state['day_count'],
+            'remaining_today': max(0, spec['max_per_day'] - state['day_count']) if spec.get('max_per_day') else None,
+            'penalty_strikes': state['strikes'],
+            **self.stats.get(source, {})
+        }
+
+    def get_status(self) -> Dict:
+        return {source: self.status(source) for source in self.limits}
+
+
+# Instance globale (état partagé dans la base du cache)
+rate_limiter = RateLimiter(cache.disk, config.RATE_LIMITS, penalty_base=config.RATE_LIMIT_PENALTY_BASE,
+                           penalty_max=config.RATE_LIMIT_PENALTY_MAX)
@@ -2,58 +2,65 @@
 """
 Source unique pour données océanographiques RÉELLES - VERSION FONCTIONNELLE
 """
-import requests
-import json
-import os
 from datetime import datetime, timedelta
 import time
-import hashlib
 import math
+from functools import partial
 from typing import Optional, Dict, List
 
+from config import config
+from cache_manager import cache, position_params, single_flight, snap_to_grid
+from upstream import call_upstream, has_value, http_client, io_executor, source_registry
+from openmeteo_client import openmeteo
+
+SST_SOURCE_LABELS = {'noaa_mur': 'NOAA', 'openmeteo_sst': 'Open-Meteo', 'cmems': 'CMEMS'}
+# Datasets chlorophylle NOAA par ordre de préférence (nom du disjoncteur, URL)
+CHL_DATASETS = [
+    ('noaa_chl', "https://coastwatch.pfeg.noaa.gov/erddap/griddap/erdMH1chla8day.json"),
+    ('noaa_chl_mw', "https://coastwatch.pfeg.noaa.gov/erddap/griddap/erdMWchla8day.json")
+]
+
 class RealOceanData:
     """Récupère des données océanographiques RÉELLES - CORRIGÉ"""
     
-    def __init__(self):
-        self.cache_dir = os.path.join(os.path.dirname(__file__), 'data', 'real_ocean_cache')
-        os.makedirs(self.cache_dir, exist_ok=True)
-        
     # ===== TEMPÉRATURE SURFACE MER (SST) - VERSION CORRIGÉE =====
     
     def get_sea_surface_temperature(self, lat: float, lon: float) -> Dict:
-        """SST RÉELLE - VERSION ROBUSTE"""
-        cache_key = self._cache_key('sst', lat, lon)
-        cached = self._load_cache(cache_key, max_age_hours=6)
+        """SST RÉELLE - VERSION ROBUSTE (appels concurrents coalescés)"""
+        return single_flight.do(('sst',) + snap_to_grid('sst', lat, lon), self._fetch_sea_surface_temperature, lat, lon)
+    
+    def _fetch_sea_surface_temperature(self, lat: float, lon: float) -> Dict:
+        """Cascade SST : cache → NOAA MUR / Open-Meteo / CMEMS (ordre adaptatif) → climatologie"""
+        cache_params = position_params('sst', lat, lon)
+        cached = cache.get('sst', cache_params)
         if cached:
             return cached
         
         print(f"🔍 Recherche SST réelle pour ({lat}, {lon})...")
         
-        # ESSAYER NOAA MUR SST (LE PLUS FIABLE)
-        sst = self._get_sst_noaa_mur(lat, lon)
-        if sst and sst['value']:
-            print(f"✅ SST NOAA: {sst['value']}°C")
-            self._save_cache(cache_key, sst)
-            return sst
-        
-        # ESSAYER OPEN-METEO AVEC COORDONNÉES OFFSHORE
-        sst = self._get_sst_openmeteo_robust(lat, lon)
-        if sst and sst['value']:
-            print(f"✅ SST Open-Meteo: {sst['value']}°C")
-            self._save_cache(cache_key, sst)
-            return sst
-        
-        # ESSAYER CMEMS (Copernicus Marine)
-        sst = self._get_sst_cmems(lat, lon)
-        if sst and sst['value']:
-            print(f"✅ SST CMEMS: {sst['value']}°C")
-            self._save_cache(cache_key, sst)
+        # Ordre de qualité : NOAA MUR (le plus fiable), Open-Meteo (coordonnées offshore), CMEMS
+        steps = [(name, partial(call_upstream, name, fn, lat, lon, negative_params=cache_params, is_success=has_value))
+                 for name, fn in (('noaa_mur', self._get_sst_noaa_mur),
+                                  ('openmeteo_sst', self._get_sst_openmeteo_robust),
+                                  ('cmems', self._get_sst_cmems))]
+        source, sst = self._run_sources('sst', steps)
+        if sst:
+            print(f"✅ SST {SST_SOURCE_LABELS[source]}: {sst['value']}°C")
+            cache.set('sst', cache_params, sst)
             return sst
         
         print("⚠️ SST réelle non disponible, utilisation modèle")
         # FALLBACK: Estimation améliorée
         return self._estimate_sst_improved(lat, lon)
     
+    def _run_sources(self, cascade: str, steps: List) -> tuple:
+        """Sources en course parallèle (mode couvert) ou en cascade ordonnée ; (source, résultat)"""
+        budget = config.CASCADE_LATENCY_BUDGET[cascade]
+        if config.HEDGE_ENABLED:
+            return source_registry.race(cascade, steps, deadline=budget, stagger=config.HEDGE_STAGGER,
+                                        grace=config.HEDGE_GRACE, is_success=has_value)
+        return source_registry.cascade(cascade, steps, budget=budget, is_success=has_value)
+    
     def _get_sst_noaa_mur(self, lat: float, lon: float) -> Optional[Dict]:
         """NOAA MUR SST - VERSION SIMPLIFIÉE QUI MARCHE"""
         try:
@@ -76,7 +83,7 @@ class RealOceanData:
             }
             
             print(f"🌡️  Requête NOAA MUR: {test_url}")
-            response = requests.get(test_url, params=query, timeout=20)
+            response = http_client.get(test_url, params=query, timeout=20)
             
             if response.status_code == 200:
                 print("✅ Données NOAA reçues")
@@ -133,58 +140,24 @@ class RealOceanData:
         return None
     
     def _get_sst_openmeteo_robust(self, lat: float, lon: float) -> Optional[Dict]:
-        """Open-Meteo SST - VERSION ROBUSTE"""
-        try:
-            # Essayer d'abord avec coordonnées offshore (plus de chances d'avoir des données)
-            offshore_lat, offshore_lon = self._get_offshore_coords(lat, lon)
-            
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                'latitude': offshore_lat,
-                'longitude': offshore_lon,
-                'hourly': 'sea_surface_temperature',
-                'timezone': 'auto',
-                'forecast_days': 1
-            }
-            
-            print(f"🌡️  Requête Open-Meteo: offshore ({offshore_lat}, {offshore_lon})")
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if 'hourly' in data and 'sea_surface_temperature' in data['hourly']:
-                    sst_list = data['hourly']['sea_surface_temperature']
-                    
-                    # Compter les valeurs non-null
-                    valid_values = [v for v in sst_list if v is not None]
-                    
-                    if valid_values:
-                        # Prendre la médiane
-                        valid_values.sort()
-                        median_value = valid_values[len(valid_values) // 2]
-                        
-                        print(f"✅ Open-Meteo: {len(valid_values)}/{len(sst_list)} valeurs valides")
-                        
-                        return {
-                            'value': round(float(median_value), 2),
-                            'unit': '°C',
-                            'source': 'Open-Meteo (offshore)',
-                            'date': datetime.now().strftime('%Y-%m-%d'),
-                            'accuracy': 'medium',
-                            'timestamp': datetime.now().isoformat()
-                        }
-                    else:
-                        print("⚠️ Open-Meteo: Toutes les valeurs SST sont None")
-                else:
-                    print("⚠️ Open-Meteo: Pas de données SST dans la réponse")
-            else:
-                print(f"❌ Open-Meteo erreur {response.status_code}")
-                
-        except Exception as e:
-            print(f"❌ Open-Meteo exception: {e}")
+        """Open-Meteo Marine SST (requête marine mutualisée) - médiane sur 24h"""
+        # Coordonnées offshore (plus de chances d'avoir des données)
+        offshore_lat, offshore_lon = self._get_offshore_coords(lat, lon)
         
-        return None
+        print(f"🌡️  SST Open-Meteo: offshore ({offshore_lat}, {offshore_lon})")
+        median_value = openmeteo.sea_surface_temperature(offshore_lat, offshore_lon)
+        if median_value is None:
+            print("⚠️ Open-Meteo: Pas de données SST")
+            return None
+        
+        return {
+            'value': round(float(median_value), 2),
+            'unit': '°C',
+            'source': 'Open-Meteo (offshore)',
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'accuracy': 'medium',
+            'timestamp': datetime.now().isoformat()
+        }
     
     def _get_sst_cmems(self, lat: float, lon: float) -> Optional[Dict]:
         """CMEMS SST - Alternative"""
@@ -193,7 +166,7 @@ class RealOceanData:
             # On va utiliser l'API publique d'information
             info_url = "https://data.marine.copernicus.eu/api/v1/products"
             
-            response = requests.get(info_url, timeout=10)
+            response = http_client.get(info_url, timeout=10)
             if response.status_code == 200:
                 print("✅ CMEMS API accessible")
                 # Pour l'instant on retourne None car besoin d'authentification
@@ -242,86 +215,78 @@ class RealOceanData:
             'date': datetime.now().strftime('%Y-%m-%d'),
             'accuracy': 'medium',  # Amélioré de 'low' à 'medium'
             'timestamp': datetime.now().isoformat(),
-            'note': 'Basé sur moyennes mensuelles réelles'
+            'note': 'Basé sur moyennes mensuelles réelles',
+            'estimated': True
         }
     
     # ===== CHLOROPHYLLE - VERSION CORRIGÉE =====
     
     def get_chlorophyll(self, lat: float, lon: float) -> Dict:
         """Chlorophylle RÉELLE - VERSION ROBUSTE"""
-        cache_key = self._cache_key('chl', lat, lon)
-        cached = self._load_cache(cache_key, max_age_hours=24)
+        cache_params = position_params('chl', lat, lon)
+        cached = cache.get('chl', cache_params)
         if cached:
             return cached
         
         print(f"🔍 Recherche chlorophylle réelle...")
         
-        # NOAA MODIS
-        chl = self._get_chlorophyll_noaa_simple(lat, lon)
-        if chl and chl['value']:
+        # NOAA MODIS puis NOAA MW (un disjoncteur par jeu de données)
+        steps = [(name, partial(call_upstream, name, self._get_chlorophyll_noaa_simple, lat, lon, dataset_url,
+                                negative_params=cache_params, is_success=has_value))
+                 for name, dataset_url in CHL_DATASETS]
+        _, chl = self._run_sources('chl', steps)
+        if chl:
             print(f"✅ Chlorophylle NOAA: {chl['value']} mg/m³")
-            self._save_cache(cache_key, chl)
+            cache.set('chl', cache_params, chl)
             return chl
         
         print("⚠️ Chlorophylle réelle non disponible")
         return self._estimate_chlorophyll_improved(lat, lon)
     
-    def _get_chlorophyll_noaa_simple(self, lat: float, lon: float) -> Optional[Dict]:
-        """NOAA Chlorophylle - VERSION SIMPLE"""
+    def _get_chlorophyll_noaa_simple(self, lat: float, lon: float, dataset_url: str) -> Optional[Dict]:
+        """NOAA Chlorophylle - VERSION SIMPLE (un dataset)"""
         try:
-            # Essayer plusieurs datasets NOAA
-            datasets = [
-                "https://coastwatch.pfeg.noaa.gov/erddap/griddap/erdMH1chla8day.json",
-                "https://coastwatch.pfeg.noaa.gov/erddap/griddap/erdMWchla8day.json"
-            ]
+            print(f"🌿 Test dataset: {dataset_url.split('/')[-1]}")
             
-            for dataset_url in datasets:
-                try:
-                    print(f"🌿 Test dataset: {dataset_url.split('/')[-1]}")
-                    
-                    # Zone large
-                    bbox = [lon-1, lat-1, lon+1, lat+1]
-                    
-                    query = {
-                        'chlorophyll': f'[(2024-02-01T00:00:00Z)][({bbox[1]}):({bbox[3]})][({bbox[0]}):({bbox[2]})]'
-                    }
-                    
-                    response = requests.get(dataset_url, params=query, timeout=15)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        # Vérifier structure simple
-                        if isinstance(data, dict):
-                            print(f"✅ Données reçues, format: {type(data)}")
-                            
-                            # Essayer d'extraire une valeur
-                            if 'table' in data and 'rows' in data['table']:
-                                rows = data['table']['rows']
-                                if rows and len(rows) > 0:
-                                    for row in rows[:5]:  # Voir les 5 premiers
-                                        if len(row) > 3 and row[3] is not None:
-                                            chl_value = float(row[3])
-                                            
-                                            # Convertir unités
-                                            if chl_value > 10:  # µg/L probablement
-                                                chl_value = chl_value / 1000
-                                            
-                                            if 0 < chl_value < 10:  # Plage réaliste
-                                                return {
-                                                    'value': round(chl_value, 3),
-                                                    'unit': 'mg/m³',
-                                                    'source': f'NOAA {dataset_url.split("/")[-1].split(".")[0]}',
-                                                    'date': '2024-02-01',  # Date fixe pour test
-                                                    'accuracy': 'medium',
-                                                    'timestamp': datetime.now().isoformat()
-                                                }
-                except Exception as e:
-                    print(f"⚠️ Dataset {dataset_url} error: {e}")
-                    continue
+            # Zone large
+            bbox = [lon-1, lat-1, lon+1, lat+1]
+            
+            query = {
+                'chlorophyll': f'[(2024-02-01T00:00:00Z)][({bbox[1]}):({bbox[3]})][({bbox[0]}):({bbox[2]})]'
+            }
+            
+            response = http_client.get(dataset_url, params=query, timeout=15)
             
+            if response.status_code == 200:
+                data = response.json()
+                
+                # Vérifier structure simple
+                if isinstance(data, dict):
+                    print(f"✅ Données reçues, format: {type(data)}")
+                    
+                    # Essayer d'extraire une valeur
+                    if 'table' in data and 'rows' in data['table']:
+                        rows = data['table']['rows']
+                        if rows and len(rows) > 0:
+                            for row in rows[:5]:  # Voir les 5 premiers
+                                if len(row) > 3 and row[3] is not None:
+                                    chl_value = float(row[3])
+                                    
+                                    # Convertir unités
+                                    if chl_value > 10:  # µg/L probablement
+                                        chl_value = chl_value / 1000
+                                    
+                                    if 0 < chl_value < 10:  # Plage réaliste
+                                        return {
+                                            'value': round(chl_value, 3),
+                                            'unit': 'mg/m³',
+                                            'source': f'NOAA {dataset_url.split("/")[-1].split(".")[0]}',
+                                            'date': '2024-02-01',  # Date fixe pour test
+                                            'accuracy': 'medium',
+                                            'timestamp': datetime.now().isoformat()
+                                        }
         except Exception as e:
-            print(f"❌ Chlorophylle exception: {e}")
+            print(f"⚠️ Dataset {dataset_url} error: {e}")
         
         return None
     
@@ -353,57 +318,34 @@ class RealOceanData:
             'date': datetime.now().strftime('%Y-%m-%d'),
             'accuracy': 'medium',
             'timestamp': datetime.now().isoformat(),
-            'note': f'Basé sur climatologie ({month}/12)'
+            'note': f'Basé sur climatologie ({month}/12)',
+            'estimated': True
         }
     
     # ===== MÉTÉO MARINE - VERSION CORRIGÉE =====
     
     def get_marine_weather(self, lat: float, lon: float) -> Dict:
         """Météo marine - CORRECTION BUG NoneType"""
-        try:
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                'latitude': lat,
-                'longitude': lon,
-                'hourly': 'wind_speed_10m,wind_direction_10m',
-                'daily': 'wave_height_max',
-                'timezone': 'auto',
-                'forecast_days': 1
-            }
-            
-            response = requests.get(url, params=params, timeout=8)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if 'hourly' in data:
-                    # CORRECTION: Vérifier que les valeurs ne sont pas None
-                    wind_speed_raw = data['hourly']['wind_speed_10m'][0]
-                    wind_dir_raw = data['hourly']['wind_direction_10m'][0]
-                    
-                    # Convertir en float avec sécurité
-                    wind_speed = float(wind_speed_raw) if wind_speed_raw is not None else 10.0
-                    wind_dir = float(wind_dir_raw) if wind_dir_raw is not None else 270.0
-                    
-                    # Vagues (peut être absent, utiliser valeur par défaut)
-                    wave_height = 1.0
-                    if 'daily' in data and 'wave_height_max' in data['daily']:
-                        wave_raw = data['daily']['wave_height_max'][0]
-                        wave_height = float(wave_raw) if wave_raw is not None else 1.0
-                    
-                    return {
-                        'wind_speed_kmh': round(wind_speed, 1),
-                        'wind_direction_deg': round(wind_dir, 0),
-                        'wave_height_m': round(wave_height, 2),
-                        'source': 'Open-Meteo',
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    
-        except Exception as e:
-            print(f"⚠️ Marine weather error: {e}")
-        
+        marine = self._get_marine_weather_openmeteo(lat, lon)
         # Fallback amélioré
-        return self._estimate_marine_weather_improved(lat, lon)
+        return marine or self._estimate_marine_weather_improved(lat, lon)
+    
+    def _get_marine_weather_openmeteo(self, lat: float, lon: float) -> Optional[Dict]:
+        """Vent et vagues Open-Meteo (tranches des requêtes mutualisées), None si indisponible"""
+        wind = openmeteo.current_wind(lat, lon)
+        if not wind:
+            return None
+        
+        # Vagues (peut être absent, utiliser valeur par défaut)
+        wave_height = openmeteo.wave_height_max(lat, lon)
+        
+        return {
+            'wind_speed_kmh': round(float(wind['wind_speed_kmh']), 1),
+            'wind_direction_deg': round(float(wind['wind_direction_deg']), 0),
+            'wave_height_m': round(float(wave_height), 2) if wave_height is not None else 1.0,
+            'source': 'Open-Meteo',
+            'timestamp': datetime.now().isoformat()
+        }
     
     def _estimate_marine_weather_improved(self, lat: float, lon: float) -> Dict:
         """Estimation météo marine améliorée"""
@@ -448,13 +390,16 @@ class RealOceanData:
     # ===== DONNÉES COMPLÈTES - VERSION CORRIGÉE =====
     
     def get_all_fishing_data(self, lat: float, lon: float) -> Dict:
-        """TOUTES les données - SANS ERREUR"""
+        """TOUTES les données - SANS ERREUR (SST, chlorophylle et météo marine en parallèle)"""
         try:
+            results = io_executor.gather({
+                'sea_temperature': (self.get_sea_surface_temperature, lat, lon),
+                'chlorophyll': (self.get_chlorophyll, lat, lon),
+                'marine_weather': (self.get_marine_weather, lat, lon)
+            })
             return {
                 'location': {'lat': lat, 'lon': lon},
-                'sea_temperature': self.get_sea_surface_temperature(lat, lon),
-                'chlorophyll': self.get_chlorophyll(lat, lon),
-                'marine_weather': self.get_marine_weather(lat, lon),
+                **results,
                 'current': self._calculate_current(lat, lon),
                 'timestamp': datetime.now().isoformat(),
                 'data_status': 'real'
@@ -488,46 +433,6 @@ class RealOceanData:
             'tide_phase': 'flood' if current_speed > 0 else 'ebb',
             'source': 'modèle de marée'
         }
-    
-    # ===== UTILITAIRES CACHE =====
-    
-    def _cache_key(self, data_type: str, lat: float, lon: float) -> str:
-        key_str = f"{data_type}_{lat:.4f}_{lon:.4f}_{datetime.now().strftime('%Y%m%d%H')}"
-        return hashlib.md5(key_str.encode()).hexdigest()[:12]
-    
-    def _load_cache(self, cache_key: str, max_age_hours: int = 6) -> Optional[Dict]:
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-        
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                cache_time = datetime.fromisoformat(data.get('cached_at', '2000-01-01'))
-                age_hours = (datetime.now() - cache_time).total_seconds() / 3600
-                
-                if age_hours < max_age_hours:
-                    return data.get('data')
-                    
-            except Exception as e:
-                print(f"⚠️ Cache load error: {e}")
-        
-        return None
-    
-    def _save_cache(self, cache_key: str, data: Dict):
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-        
-        cache_data = {
-            'data': data,
-            'cached_at': datetime.now().isoformat(),
-            'cache_key': cache_key
-        }
-        
-        try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"⚠️ Cache save error: {e}")
 
 # Instance globale
 real_ocean = RealOceanData()
\ No newline at end of file
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Les modules créent leurs instances globales (cache, limiteur) à l'import :
+# base SQLite isolée, jamais celle de api_cache/
+os.environ['CACHE_DB_FILE'] = os.path.join(tempfile.mkdtemp(prefix='amine-tests-'), 'cache.sqlite3')
+os.environ['PREFETCH_ENABLED'] = 'False'  # pas de thread de préchargement à l'import de app
+
+from cache_manager import SQLiteCacheStore, SharedCounters  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Base SQLite temporaire propre à chaque test"""
+    return SQLiteCacheStore(str(tmp_path / 'cache.sqlite3'))
+
+
+@pytest.fixture
+def counters(store):
+    return SharedCounters(store)
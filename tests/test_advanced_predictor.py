@@ -0,0 +1,78 @@
+import itertools
+import logging
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from advanced_predictor import ScientificFishingPredictor, _round_vec
+
+SEED = 20260317
+MONTHS = range(1, 13)
+HOURS = range(24)
+# Côtes tunisiennes nord / centre / sud ; coordonnées à mi-chemin de la grille de 0,01°
+POSITIONS = [(37.275, 9.865), (36.805, 10.185), (36.4, 10.6), (35.825, 10.635), (33.875, 10.855)]
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    logging.disable(logging.WARNING)
+    yield ScientificFishingPredictor()
+    logging.disable(logging.NOTSET)
+
+
+def half_step(rng, low, high):
+    """Valeur au dixième, ou à mi-chemin entre deux dixièmes (cas d'arrondi de _quantize / _round_vec)
+
+    Floats Python comme une réponse JSON : round() sur un np.float64 suit les règles de NumPy.
+    """
+    return round(int(rng.integers(low, high)) / 10 + 0.05 * int(rng.integers(2)), 2)
+
+
+def make_rows(predictor, rng, water_temperature=False, turbidity=False):
+    """Toutes les espèces x mois x heures, météo tirée sur des grilles à pas demi-unité"""
+    rows = []
+    for species, month, hour in itertools.product(predictor.species_profiles, MONTHS, HOURS):
+        lat, lon = POSITIONS[rng.integers(len(POSITIONS))]
+        weather = {
+            'temperature': half_step(rng, 80, 320),
+            'wind_speed': int(rng.integers(0, 80)) / 2,
+            'pressure': half_step(rng, 9900, 10350),
+            'wave_height': round(int(rng.integers(0, 60)) * 0.05, 2),
+            'salinity': half_step(rng, 360, 395),
+        }
+        if water_temperature:
+            weather['water_temperature'] = half_step(rng, 120, 290)
+        if turbidity:
+            weather['turbidity'] = int(rng.integers(5, 30)) / 10
+        date = datetime(2026, month, 1 + int(rng.integers(28)), hour)
+        rows.append((lat, lon, date, species, weather))
+    return rows
+
+
+@pytest.mark.parametrize('water_temperature, turbidity', [(False, False), (True, False), (True, True)])
+def test_predict_batch_matches_predict_daily_activity(predictor, water_temperature, turbidity):
+    rows = make_rows(predictor, np.random.default_rng(SEED), water_temperature, turbidity)
+    lats, lons, dates, species, weathers = zip(*rows)
+    columns = {key: [weather[key] for weather in weathers] for key in weathers[0]}
+
+    batch = predictor.predict_batch(lats, lons, dates, species, columns)
+
+    mismatches = []
+    for index, (lat, lon, date, code, weather) in enumerate(rows):
+        scalar = predictor.predict_daily_activity(lat, lon, date, code, weather)
+        assert not scalar.get('fallback'), scalar
+        if (batch['score'][index], batch['activity_score_decimal'][index]) != \
+                (scalar['score'], scalar['activity_score_decimal']):
+            mismatches.append((code, date, weather, batch['score'][index], scalar['score']))
+    assert len(rows) == len(predictor.species_profiles) * 12 * 24
+    assert mismatches == []
+
+
+def test_round_vec_follows_builtin_round_on_half_way_values():
+    # np.round diffère de round() sur chacune de ces valeurs
+    values = [2.675, 0.0005, 0.1125]
+    digits = [2, 3, 3]
+    for value, digit in zip(values, digits):
+        assert np.round(value, digit) != round(value, digit)
+        assert _round_vec(np.array([value, -value]), digit).tolist() == [round(value, digit), round(-value, digit)]
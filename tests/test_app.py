@@ -0,0 +1,116 @@
+import pytest
+
+import app as app_module
+import upstream
+from config import config
+from upstream import CircuitBreaker
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+# ===== PRÉCHAUFFAGE MANUEL =====
+
+@pytest.fixture
+def warmup_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, 'start_cache_warmup', lambda exclusive=True: calls.append(exclusive) or True)
+    return calls
+
+
+def test_warmup_progress_is_public(client, warmup_calls):
+    body = client.get('/api/cache/warmup').get_json()
+    assert body['status'] == 'success' and body['started'] is False
+    assert warmup_calls == []
+
+
+@pytest.mark.parametrize('configured, sent', [('', ''), ('', 'secret'), ('secret', ''), ('secret', 'autre')])
+def test_warmup_post_requires_the_admin_token(client, warmup_calls, monkeypatch, configured, sent):
+    monkeypatch.setattr(config, 'WARMUP_ADMIN_TOKEN', configured)
+    response = client.post('/api/cache/warmup', headers={'X-Admin-Token': sent})
+    assert response.status_code == 403
+    assert warmup_calls == []
+
+
+def test_warmup_post_starts_once_then_conflicts(client, warmup_calls, monkeypatch):
+    monkeypatch.setattr(config, 'WARMUP_ADMIN_TOKEN', 'secret')
+    response = client.post('/api/cache/warmup', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200 and response.get_json()['started'] is True
+    assert warmup_calls == [False]
+
+    monkeypatch.setattr(app_module, 'start_cache_warmup', lambda exclusive=True: False)  # préchauffage en cours
+    response = client.post('/api/cache/warmup', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 409
+
+
+# ===== 429 SUR LA SONDE OPENWEATHER =====
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_429_on_the_half_open_probe_frees_the_breaker(monkeypatch):
+    breaker = CircuitBreaker('openweather', failure_threshold=3, recovery_timeout=60.0)
+    monkeypatch.setitem(upstream._breakers, 'openweather', breaker)
+    monkeypatch.setattr(app_module.rate_limiter, 'acquire', lambda source, wait=0.0: True)
+    calls = []
+    monkeypatch.setattr(app_module.http_client, 'get', lambda url, **kwargs: calls.append(url) or FakeResponse(429))
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.recovery_timeout  # délai de rétablissement écoulé
+
+    app_module.get_openweather_data_with_limits(37.05, 11.05)
+
+    assert len(calls) == 1  # la sonde a bien interrogé OpenWeather
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is True  # sonde suivante autorisée
+
+
+# ===== DEMANDES COMPTÉES POUR LE PRÉCHARGEMENT =====
+
+WEATHER = {'success': True, 'source': 'api', 'weather': {'wind_speed': 12.0, 'wind_direction': 90}}
+
+
+@pytest.fixture
+def hits(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(app_module.weather_prefetcher, 'hit', lambda lat, lon: recorded.append((lat, lon)))
+    return recorded
+
+
+def cached_weather_at(lat, lon):
+    grid_lat, grid_lon = app_module.snap_to_grid('weather', lat, lon)
+    app_module.cache.set('weather', {'lat': grid_lat, 'lon': grid_lon}, WEATHER, ttl=600)
+    return grid_lat, grid_lon
+
+
+def test_internal_weather_lookups_are_not_counted(hits):
+    cell = cached_weather_at(36.41, 10.61)
+
+    assert app_module.get_cached_weather(36.41, 10.61, count_hit=False) == WEATHER
+    assert hits == []
+
+    app_module.get_cached_weather(36.41, 10.61)
+    assert hits == [cell]
+
+
+def test_prediction_route_counts_one_hit_per_request(client, hits, monkeypatch):
+    cell = cached_weather_at(35.83, 10.64)
+    builds = []
+
+    def build(lat, lon, species):
+        builds.append(species)
+        for _ in range(2):  # météo et repli du vent, comme le constructeur réel
+            app_module.get_cached_weather(lat, lon, count_hit=False)
+        return {'status': 'success'}
+
+    monkeypatch.setattr(app_module, 'build_tunisian_prediction', build)
+    for _ in range(2):  # construite puis servie du cache
+        response = client.get('/api/tunisian_prediction?lat=35.83&lon=10.64&species=pageot')
+        assert response.get_json()['status'] == 'success'
+
+    assert builds == ['pageot']
+    assert hits == [cell, cell]
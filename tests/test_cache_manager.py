@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+
+import cache_manager
+from cache_manager import SingleFlight, TieredCache
+
+WORKERS = 8
+PARAMS = {'lat': 36.8, 'lon': 10.2}
+
+
+# ===== TIER MÉMOIRE =====
+
+def test_memory_and_disk_tiers_both_return_copies(tmp_path):
+    tiered = TieredCache(str(tmp_path / 'tiered.sqlite3'))
+    data = {'weather': {'temperature': 20}, 'hours': [1, 2]}
+    tiered.set('weather', PARAMS, data, ttl=60)
+    data['weather']['temperature'] = 99  # l'objet de l'appelant n'est pas l'entrée
+
+    for _ in range(2):  # tier mémoire, puis disque après vidage de la mémoire
+        served = tiered.get('weather', PARAMS)
+        served['weather']['temperature'] = 30
+        served['hours'].append(3)
+        assert tiered.get('weather', PARAMS) == {'weather': {'temperature': 20}, 'hours': [1, 2]}
+        tiered.memory.clear()
+
+    stats = tiered.get_stats()['namespaces']['weather']
+    assert stats['memory_hits'] == 3 and stats['disk_hits'] == 1
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition non atteinte')
+        time.sleep(0.005)
+
+
+def run_concurrently(target, count=WORKERS):
+    results, errors = [None] * count, [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+# ===== SINGLE FLIGHT =====
+
+def test_single_flight_runs_builder_once_for_concurrent_callers():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def builder():
+        calls.append(1)
+        release.wait(5)
+        return {'value': 42}
+
+    threads, results, errors = run_concurrently(lambda: flight.do(('weather', 'k'), builder))
+    wait_until(lambda: flight.get_stats()['namespaces'].get('weather', {}).get('calls') == WORKERS)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert errors == [None] * WORKERS
+    assert all(result is results[0] for result in results) and results[0] == {'value': 42}
+    stats = flight.get_stats()
+    assert stats['in_flight'] == 0 and stats['collapsed_total'] == WORKERS - 1
+    assert stats['namespaces']['weather'] == {'calls': WORKERS, 'executed': 1, 'collapsed': WORKERS - 1,
+                                              'errors': 0}
+
+
+def test_single_flight_shares_the_leader_error():
+    flight, release = SingleFlight(), threading.Event()
+
+    def builder():
+        release.wait(5)
+        raise RuntimeError('amont indisponible')
+
+    threads, _, errors = run_concurrently(lambda: flight.do(('weather', 'k'), builder))
+    wait_until(lambda: flight.get_stats()['namespaces'].get('weather', {}).get('calls') == WORKERS)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert flight.get_stats()['namespaces']['weather']['errors'] == 1
+    # la clé est libérée : l'appel suivant repart
+    assert flight.do(('weather', 'k'), lambda: 'ok') == 'ok'
+
+
+# ===== STALE-WHILE-REVALIDATE =====
+
+TTL, GRACE = 60.0, 600.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(cache_manager.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def tiered(tmp_path):
+    return TieredCache(str(tmp_path / 'tiered.sqlite3'))
+
+
+def refresh_threads():
+    return [t for t in threading.enumerate() if t.name == 'cache-refresh-weather']
+
+
+def test_fresh_then_stale_schedules_a_single_refresh(tiered, clock):
+    tiered.set('weather', PARAMS, {'temp': 20}, ttl=TTL + GRACE)
+    release, calls = threading.Event(), []
+
+    def builder():
+        calls.append(1)
+        release.wait(5)
+        return {'temp': 25}
+
+    assert tiered.get_or_revalidate('weather', PARAMS, builder, TTL, GRACE)[:2] == ({'temp': 20}, 'fresh')
+    assert calls == []
+
+    clock[0] += TTL + 30
+    served = [tiered.get_or_revalidate('weather', PARAMS, builder, TTL, GRACE) for _ in range(5)]
+    assert [(data, freshness) for data, freshness, _ in served] == [({'temp': 20}, 'stale')] * 5
+    assert served[0][2] == pytest.approx(TTL + 30)
+
+    wait_until(lambda: calls)
+    assert len(refresh_threads()) == 1
+    release.set()
+    for thread in refresh_threads():
+        thread.join(5)
+
+    assert len(calls) == 1
+    stats = tiered.get_stats()['namespaces']['weather']
+    assert stats['stale_hits'] == 5 and stats['refreshes'] == 1 and stats['refresh_errors'] == 0
+    assert tiered.get_or_revalidate('weather', PARAMS, builder, TTL, GRACE)[:2] == ({'temp': 25}, 'fresh')
+
+
+def test_entry_past_grace_is_rebuilt_synchronously(tiered, clock):
+    tiered.set('weather', PARAMS, {'temp': 20}, ttl=TTL + GRACE)
+    clock[0] += TTL + GRACE + 1
+
+    data, freshness, age = tiered.get_or_revalidate('weather', PARAMS, lambda: {'temp': 25}, TTL, GRACE)
+
+    assert (data, freshness, age) == ({'temp': 25}, 'miss', 0.0)
+    assert refresh_threads() == []
+    assert tiered.get('weather', PARAMS) == {'temp': 25}
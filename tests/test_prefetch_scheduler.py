@@ -0,0 +1,84 @@
+import pytest
+
+from prefetch_scheduler import PopularityTracker, PrefetchScheduler
+
+TTL = 1800
+
+
+def make_scheduler(store, counters, refresh, ages, used_today=0, max_per_day=4, claim_tick=None):
+    """Réserve = max_per_day / 2 ; interval d'une journée : toute la réserve est autorisée dès la première passe"""
+    tracker = PopularityTracker(store)
+    budget = {'used_today': used_today, 'max_per_day': max_per_day}
+    return PrefetchScheduler(tracker, 'weather', refresh, lambda lat, lon: ages.get((lat, lon)),
+                             lambda: dict(budget), counters, ttl=TTL, reserve_share=0.5, lead=300,
+                             interval=86400, claim_tick=claim_tick), budget
+
+
+def hit(scheduler, cell, times):
+    for _ in range(times):
+        scheduler.hit(*cell)
+
+
+A, B, C, D = (36.8, 10.2), (36.4, 10.6), (35.8, 10.6), (33.8, 10.9)
+
+
+def test_refreshes_due_hot_cells_by_popularity_within_allowance(store, counters):
+    calls = []
+    ages = {B: TTL, C: 0}  # A absente, B expirée, C fraîche
+    scheduler, _ = make_scheduler(store, counters, lambda lat, lon: calls.append((lat, lon)) or True, ages)
+    hit(scheduler, A, 3)
+    hit(scheduler, B, 2)
+    hit(scheduler, C, 1)
+
+    report = scheduler.run_once()
+
+    assert calls == [A, B]
+    assert report['due'] == 2 and report['allowance'] == 2
+    assert report['refreshed'] == 2 and report['failed'] == 0
+    assert counters.get(scheduler._used_key()) == 2
+    assert scheduler.allowance() == 0
+
+
+def test_only_upstream_calls_count_against_the_reserve(store, counters):
+    outcomes = {A: None, B: False, C: True, D: True}  # A : aucun appel (disjoncteur, quota)
+    calls = []
+    scheduler, _ = make_scheduler(store, counters, lambda lat, lon: calls.append((lat, lon)) or outcomes[(lat, lon)], {})
+    for times, cell in enumerate((D, C, B, A), start=1):
+        hit(scheduler, cell, times)
+
+    report = scheduler.run_once()
+
+    assert calls == [A, B, C]  # A ignorée, la réserve (2 appels) passe aux suivantes
+    assert (report['skipped'], report['failed'], report['refreshed']) == (1, 1, 1)
+    assert counters.get(scheduler._used_key()) == 2
+
+
+def test_on_demand_calls_limited_to_unreserved_share(store, counters):
+    scheduler, budget = make_scheduler(store, counters, lambda lat, lon: True, {}, used_today=2)
+    hit(scheduler, A, 1)
+    scheduler.claim_tick = lambda slot: False
+    scheduler.run_once()  # mailles chaudes connues, aucun rafraîchissement
+
+    assert scheduler.allow_on_demand(*A)  # maille chaude : toujours
+    assert not scheduler.allow_on_demand(*D)  # 2 appels à la demande = part non réservée épuisée
+
+    counters.incr(scheduler._used_key(), 2)  # ces 2 appels étaient des rafraîchissements planifiés
+    assert scheduler.allow_on_demand(*D)
+
+
+def test_unclaimed_slot_does_not_refresh(store, counters):
+    calls = []
+    scheduler, _ = make_scheduler(store, counters, lambda lat, lon: calls.append((lat, lon)) or True, {},
+                                  claim_tick=lambda slot: False)
+    hit(scheduler, A, 1)
+
+    report = scheduler.run_once()
+
+    assert report == {'hot_cells': 1, 'claimed': False}
+    assert calls == [] and counters.get(scheduler._used_key()) == 0
+
+
+@pytest.mark.parametrize('used_today', [0, 3])
+def test_allowance_capped_by_remaining_quota(store, counters, used_today):
+    scheduler, _ = make_scheduler(store, counters, lambda lat, lon: True, {}, used_today=used_today)
+    assert scheduler.allowance() == min(2, 4 - used_today)
@@ -0,0 +1,133 @@
+from datetime import datetime
+
+import pytest
+
+import rate_limiter as rate_limiter_module
+from rate_limiter import RateLimiter
+
+HOST = 'api.example.org'
+
+
+class Clock:
+    """Horloge contrôlée par le test (remplace time.time dans rate_limiter)"""
+
+    def __init__(self, start: datetime):
+        self.now = start.timestamp()
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    def set(self, moment: datetime):
+        self.now = moment.timestamp()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(datetime(2026, 3, 10, 10, 0, 0))
+    monkeypatch.setattr(rate_limiter_module.time, 'time', clock)
+    return clock
+
+
+def make_limiter(store, penalty_max=3600.0, **spec):
+    return RateLimiter(store, {'api': {'host': HOST, **spec}}, penalty_base=60.0, penalty_max=penalty_max)
+
+
+# ===== SEAU À JETONS =====
+
+def test_burst_then_refill_at_rate(store, clock):
+    limiter = make_limiter(store, rate=2.0, burst=3)
+
+    assert [limiter.acquire('api') for _ in range(4)] == [True, True, True, False]
+    assert limiter.status('api')['blocked_reason'] == 'rate'
+    assert limiter.status('api')['retry_in_seconds'] == pytest.approx(0.5)
+
+    clock.advance(0.5)  # un jeton à 2 jetons/s
+    assert limiter.acquire('api') is True
+    assert limiter.acquire('api') is False
+
+    clock.advance(60)  # le seau ne dépasse jamais la rafale
+    assert limiter.status('api')['tokens'] == 3
+    assert [limiter.acquire('api') for _ in range(4)] == [True, True, True, False]
+    assert limiter.stats['api']['acquired'] == 7
+
+
+def test_unlimited_source_is_never_blocked(store, clock):
+    limiter = make_limiter(store, rate=1.0, burst=1)
+    assert all(limiter.acquire('other') for _ in range(10))
+
+
+# ===== FENÊTRES HORAIRE / JOURNALIÈRE =====
+
+def test_hourly_window_resets_on_the_hour(store, clock):
+    limiter = make_limiter(store, max_per_hour=2)
+    clock.set(datetime(2026, 3, 10, 10, 59, 0))
+
+    assert [limiter.acquire('api') for _ in range(3)] == [True, True, False]
+    status = limiter.status('api')
+    assert status['blocked_reason'] == 'hourly'
+    assert status['used_this_hour'] == 2 and status['remaining_this_hour'] == 0
+
+    clock.set(datetime(2026, 3, 10, 11, 0, 1))
+    assert limiter.status('api')['used_this_hour'] == 0
+    assert [limiter.acquire('api') for _ in range(3)] == [True, True, False]
+
+
+def test_daily_window_resets_at_midnight(store, clock):
+    limiter = make_limiter(store, max_per_hour=2, max_per_day=3)
+
+    assert [limiter.acquire('api') for _ in range(3)] == [True, True, False]
+    clock.advance(3600)
+    assert [limiter.acquire('api') for _ in range(2)] == [True, False]
+    status = limiter.status('api')
+    assert status['blocked_reason'] == 'daily'  # prioritaire sur l'heure encore disponible
+    assert status['used_today'] == 3 and status['used_this_hour'] == 1
+
+    clock.set(datetime(2026, 3, 10, 23, 59, 0))
+    assert limiter.acquire('api') is False
+    clock.set(datetime(2026, 3, 11, 0, 0, 1))
+    assert limiter.acquire('api') is True
+    assert limiter.status('api')['used_today'] == 1
+
+
+# ===== 429 ET BACKOFF =====
+
+def test_429_backoff_doubles_up_to_the_cap(store, clock):
+    limiter = make_limiter(store, penalty_max=200.0)
+    delays = []
+    for _ in range(4):
+        limiter.observe(HOST, 429)
+        status = limiter.status('api')
+        assert status['blocked_reason'] == '429'
+        assert limiter.acquire('api') is False
+        delays.append(status['retry_in_seconds'])
+        clock.advance(status['retry_in_seconds'])
+
+    assert delays == [60, 120, 200, 200]
+    assert limiter.status('api')['penalty_strikes'] == 4
+    assert limiter.acquire('api') is True
+
+
+def test_retry_after_header_overrides_backoff(store, clock):
+    limiter = make_limiter(store)
+    limiter.observe(HOST, 429, retry_after='15')
+    assert limiter.status('api')['retry_in_seconds'] == 15
+    clock.advance(15)
+    assert limiter.acquire('api') is True
+
+
+def test_success_after_penalty_resets_strikes(store, clock):
+    limiter = make_limiter(store)
+    limiter.observe(HOST, 429)
+    clock.advance(60)
+    limiter.observe(HOST, 429)
+    assert limiter.status('api')['penalty_strikes'] == 2
+    clock.advance(120)
+
+    limiter.observe(HOST, 200)
+    assert limiter.status('api')['penalty_strikes'] == 0
+
+    limiter.observe(HOST, 429)  # le backoff repart du délai de base
+    assert limiter.status('api')['retry_in_seconds'] == 60
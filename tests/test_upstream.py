@@ -0,0 +1,405 @@
+import contextvars
+import threading
+import time
+import uuid
+
+import pytest
+
+import upstream
+from upstream import CircuitBreaker, call_upstream, get_breaker
+
+
+class Clock:
+    """Horloge monotone contrôlée par le test (remplace time.monotonic dans upstream)"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(upstream.time, 'monotonic', clock)
+    return clock
+
+
+def source_name():
+    """Disjoncteurs partagés par le processus : un nom de source par test"""
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+# ===== DISJONCTEUR =====
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('src', failure_threshold=3, recovery_timeout=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is False
+    assert breaker.info()['retry_in_seconds'] == 60
+    assert breaker.stats['opened'] == 1 and breaker.stats['rejected'] == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker('src', failure_threshold=3, recovery_timeout=60)
+    for outcome in (False, False, True, False, False):
+        assert breaker.allow()
+        breaker.record_success() if outcome else breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 2
+
+
+def test_half_open_allows_a_single_probe_then_closes(clock):
+    breaker = CircuitBreaker('src', failure_threshold=2, recovery_timeout=60)
+    open_breaker(breaker)
+
+    clock.advance(59)
+    assert breaker.allow() is False
+    clock.advance(1)
+    assert breaker.allow() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is False  # une seule sonde en vol
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert all(breaker.allow() for _ in range(3))
+
+
+def test_failed_probe_reopens_for_a_full_timeout(clock):
+    breaker = CircuitBreaker('src', failure_threshold=2, recovery_timeout=60)
+    open_breaker(breaker)
+    clock.advance(60)
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.advance(59)
+    assert breaker.allow() is False
+    clock.advance(1)
+    assert breaker.allow() is True
+    assert breaker.stats['opened'] == 2
+
+
+# ===== call_upstream ET CACHE NÉGATIF =====
+
+def test_call_upstream_opens_breaker_and_skips_calls(clock):
+    name, calls = source_name(), []
+
+    def failing():
+        calls.append(1)
+        raise ConnectionError('timeout')
+
+    breaker = get_breaker(name)
+    for _ in range(breaker.failure_threshold):
+        assert call_upstream(name, failing) is None
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert call_upstream(name, failing) is None
+    assert len(calls) == breaker.failure_threshold
+
+    clock.advance(breaker.recovery_timeout)
+    assert call_upstream(name, lambda: {'value': 21.5}) == {'value': 21.5}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_negative_cache_skips_a_recent_failure_per_position(clock):
+    name, calls = source_name(), []
+
+    def fetch(lat, lon):
+        calls.append((lat, lon))
+        return {'value': None}
+
+    def value(result):
+        return bool(result and result.get('value'))
+
+    here, there = {'lat': 36.8, 'lon': 10.2}, {'lat': 35.8, 'lon': 10.6}
+    assert call_upstream(name, fetch, 36.8, 10.2, negative_params=here, is_success=value) is None
+    assert call_upstream(name, fetch, 36.8, 10.2, negative_params=here, is_success=value) is None
+    assert call_upstream(name, fetch, 35.8, 10.6, negative_params=there, is_success=value) is None
+
+    assert calls == [(36.8, 10.2), (35.8, 10.6)]
+    assert get_breaker(name).stats['negative_hits'] == 1
+
+
+# ===== EXÉCUTEUR I/O =====
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+@pytest.fixture
+def executor():
+    return upstream.IOExecutor(max_workers=4, max_queue=8)
+
+
+def test_gather_runs_tasks_concurrently(executor):
+    barrier = threading.Barrier(3, timeout=5)  # bloquerait si les tâches étaient séquentielles
+
+    def task(name):
+        barrier.wait()
+        return name, threading.current_thread().name
+
+    results = executor.gather({name: (task, name) for name in ('a', 'b', 'c')}, timeout=5)
+
+    assert {name: result[0] for name, result in results.items()} == {'a': 'a', 'b': 'b', 'c': 'c'}
+    assert all(result[1].startswith('io-worker') for result in results.values())
+    assert executor.get_stats()['completed'] == 3
+
+
+def test_gather_propagates_contextvars_and_flask_app_context(executor):
+    from flask import Flask, current_app, g, has_app_context
+
+    app = Flask('test-app')
+
+    def task():
+        return request_id.get(), has_app_context() and current_app.name, g.get('user')
+
+    token = request_id.set('req-42')
+    try:
+        with app.app_context():
+            g.user = 'pêcheur'
+            results = executor.gather({'task': (task,)}, timeout=5)
+    finally:
+        request_id.reset(token)
+
+    assert results['task'] == ('req-42', 'test-app', 'pêcheur')
+
+
+def test_gather_reraises_task_errors(executor):
+    def failing():
+        raise ValueError('source en panne')
+
+    with pytest.raises(ValueError, match='source en panne'):
+        executor.gather({'ok': (lambda: 1,), 'ko': (failing,)}, timeout=5)
+    assert executor.get_stats()['tasks']['ko']['errors'] == 1
+
+
+def test_nested_and_overflow_submissions_run_inline():
+    executor = upstream.IOExecutor(max_workers=1, max_queue=1)
+
+    def outer():
+        # Le seul worker est occupé : sans exécution en ligne, interblocage
+        return executor.gather({'inner': (lambda: threading.current_thread().name,)}, timeout=5)['inner']
+
+    assert executor.gather({'outer': (outer,)}, timeout=5)['outer'].startswith('io-worker')
+    assert executor.get_stats()['inline'] == 1
+
+    release = threading.Event()
+    blocker = executor.submit('blocker', release.wait, 5)
+    queued = executor.submit('queued', lambda: 'queued')  # file pleine au-delà de celle-ci
+    overflow = executor.submit('overflow', threading.current_thread)
+    assert overflow.result(timeout=0) is threading.current_thread()
+    release.set()
+    assert blocker.result(timeout=5) and queued.result(timeout=5) == 'queued'
+
+
+# ===== SONDE LIBÉRÉE (BUDGET ÉPUISÉ) =====
+
+def test_release_frees_the_half_open_probe(clock):
+    breaker = CircuitBreaker('src', failure_threshold=2, recovery_timeout=60)
+    open_breaker(breaker)
+    clock.advance(60)
+    assert breaker.allow()
+    assert breaker.allow() is False
+
+    breaker.release()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is True
+
+
+def test_call_upstream_without_budget_leaves_breaker_untouched(clock, monkeypatch):
+    name, calls = source_name(), []
+    breaker = get_breaker(name)
+    open_breaker(breaker)
+    clock.advance(breaker.recovery_timeout)
+    budget = {'available': False}
+    monkeypatch.setattr(upstream.rate_limiter, 'acquire', lambda source, wait=0.0: budget['available'])
+
+    assert call_upstream(name, lambda: calls.append(1)) is None
+
+    assert calls == [] and breaker.state == CircuitBreaker.HALF_OPEN
+    budget['available'] = True
+    assert call_upstream(name, lambda: {'value': 1}) == {'value': 1}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+# ===== REGISTRE DES SOURCES : CASCADE ORDONNÉE =====
+
+@pytest.fixture
+def registry():
+    return upstream.SourceRegistry(min_success=0.5, min_samples=3, probe_interval=60)
+
+
+def stub(calls, name, result=None, error=None, duration=0.0, clock=None):
+    """Source factice : durée simulée sur l'horloge du test, résultat ou exception"""
+    def fetch():
+        calls.append(name)
+        if clock is not None:
+            clock.advance(duration)
+        if error is not None:
+            raise error
+        return result
+    return name, fetch
+
+
+def test_cascade_returns_first_valid_source_in_quality_order(registry, clock):
+    calls = []
+    steps = [stub(calls, 'failing', error=ConnectionError('refused')),
+             stub(calls, 'empty', result={'value': None}),
+             stub(calls, 'good', result={'value': 18.4}),
+             stub(calls, 'unused', result={'value': 19.0})]
+
+    assert registry.cascade('sst', steps, is_success=upstream.has_value) == ('good', {'value': 18.4})
+    assert calls == ['failing', 'empty', 'good']
+    stats = registry.get_stats()
+    assert stats['sst:good']['wins'] == 1
+    assert stats['sst:failing']['success_rate'] < 1.0 and stats['sst:empty']['success_rate'] < 1.0
+
+
+def test_failing_source_drops_behind_until_probe_interval(registry, clock):
+    calls = []
+    steps = [stub(calls, 'primary', error=TimeoutError('read timeout')),
+             stub(calls, 'backup', result={'value': 1})]
+    for _ in range(4):  # taux de succès 0,8 ** 4 < 0,5
+        registry.cascade('wind', steps)
+        clock.advance(1)
+    assert registry.order('wind', ['primary', 'backup']) == ['backup', 'primary']
+
+    calls.clear()
+    assert registry.cascade('wind', steps) == ('backup', {'value': 1})
+    assert calls == ['backup']
+
+    clock.advance(60)  # sonde : la source écartée repasse en tête une fois
+    assert registry.order('wind', ['primary', 'backup']) == ['primary', 'backup']
+
+
+def test_slow_source_is_skipped_when_budget_is_short(registry, clock):
+    calls = []
+    steps = [stub(calls, 'slow', result={'value': 1}, duration=5, clock=clock),
+             stub(calls, 'fast', result={'value': 2}, duration=0.1, clock=clock)]
+    assert registry.cascade('sst', steps, budget=10) == ('slow', {'value': 1})
+
+    calls.clear()
+    assert registry.cascade('sst', steps, budget=2) == ('fast', {'value': 2})
+    assert calls == ['fast']
+    assert registry.get_stats()['sst:slow']['skipped'] == 1
+
+
+def test_cascade_stops_when_budget_is_spent(registry, clock):
+    calls = []
+    steps = [stub(calls, 'slow', result=None, duration=3, clock=clock),
+             stub(calls, 'fast', result={'value': 2})]
+
+    assert registry.cascade('sst', steps, budget=2) == (None, None)
+    assert calls == ['slow']
+
+
+# ===== REGISTRE DES SOURCES : COURSE PARALLÈLE =====
+
+@pytest.fixture
+def race_executor():
+    return upstream.IOExecutor(max_workers=4, max_queue=8)
+
+
+def sleeper(name, release: threading.Event, result):
+    """Source lente : répond quand le test la libère (ou au bout de 5 s)"""
+    def fetch():
+        release.wait(5)
+        return result
+    return name, fetch
+
+
+def test_race_waits_grace_for_the_better_ranked_source(registry, race_executor):
+    def best():
+        time.sleep(0.2)
+        return {'value': 1}
+
+    steps = [('best', best), ('fast', lambda: {'value': 2})]
+    winner = registry.race('sst', steps, deadline=3, stagger=0, grace=1.0, is_success=upstream.has_value,
+                           executor=race_executor)
+    assert winner == ('best', {'value': 1})
+
+
+def test_race_drops_a_slow_source_after_grace(registry, race_executor):
+    release = threading.Event()
+    steps = [sleeper('slow', release, {'value': 1}), ('fast', lambda: {'value': 2})]
+    started = time.monotonic()
+    try:
+        winner = registry.race('sst', steps, deadline=3, stagger=0, grace=0.2, is_success=upstream.has_value,
+                               executor=race_executor)
+    finally:
+        release.set()
+    assert winner == ('fast', {'value': 2})
+    assert time.monotonic() - started < 1.5
+    assert registry.get_stats()['sst:fast']['wins'] == 1
+
+
+def test_race_launches_next_source_as_soon_as_launched_ones_fail(registry, race_executor):
+    def failing():
+        raise ConnectionError('refused')
+
+    steps = [('failing', failing), ('empty', lambda: {'value': None}), ('good', lambda: {'value': 3})]
+    started = time.monotonic()
+    winner = registry.race('sst', steps, deadline=5, stagger=2.0, is_success=upstream.has_value,
+                           executor=race_executor)
+    assert winner == ('good', {'value': 3})
+    assert time.monotonic() - started < 1.5  # sans attendre le décalage de 2 s
+
+
+def test_race_returns_nothing_when_every_source_fails(registry, race_executor):
+    release = threading.Event()
+    steps = [('empty', lambda: {'value': None}), sleeper('slow', release, {'value': 1})]
+    try:
+        winner = registry.race('sst', steps, deadline=0.3, stagger=0, is_success=upstream.has_value,
+                               executor=race_executor)
+    finally:
+        release.set()
+    assert winner == (None, None)
+
+
+def test_sst_race_falls_back_to_climatology(monkeypatch):
+    from config import config
+    from cache_manager import cache, position_params
+    from real_ocean_data import RealOceanData
+
+    monkeypatch.setattr(config, 'HEDGE_ENABLED', True)
+    monkeypatch.setattr(config, 'HEDGE_GRACE', 0.1)
+    monkeypatch.setitem(config.CASCADE_LATENCY_BUDGET, 'sst', 0.3)
+    ocean, release = RealOceanData(), threading.Event()
+
+    def failing(lat, lon):
+        raise ConnectionError('refused')
+
+    monkeypatch.setattr(ocean, '_get_sst_noaa_mur', lambda lat, lon: release.wait(5) and {'value': 19.0})
+    monkeypatch.setattr(ocean, '_get_sst_openmeteo_robust', failing)
+    monkeypatch.setattr(ocean, '_get_sst_cmems', lambda lat, lon: {'value': None})
+    lat, lon = 34.25, 11.35
+    started = time.monotonic()
+    try:
+        sst = ocean.get_sea_surface_temperature(lat, lon)
+    finally:
+        release.set()
+
+    assert sst['source'] == 'climatologie méditerranéenne' and sst['estimated'] is True
+    assert time.monotonic() - started < 1.5
+    assert cache.get('sst', position_params('sst', lat, lon)) is None
@@ -0,0 +1,640 @@
+# upstream.py
+"""
+Couche d'accès aux sources de données amont
+- client HTTP partagé : pools keep-alive par hôte, retries avec backoff,
+  limite de concurrence par hôte, mesures de latence
+- disjoncteurs et cache négatif : pendant une panne, bascule immédiate
+  sur le modèle au lieu d'attendre les timeouts
+- registre des sources : ordre des cascades adapté à la latence et à la
+  fiabilité observées, dans un budget de temps par requête
+"""
+import os
+import time
+import contextvars
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from config import config
+from cache_manager import cache
+from rate_limiter import rate_limiter
+
+
+# ===== CLIENT HTTP PARTAGÉ =====
+
+class JitteredRetry(Retry):
+    """Retry urllib3 avec backoff exponentiel + gigue aléatoire, retries comptés par hôte"""
+
+    def __init__(self, *args, jitter: float = 0.0, **kwargs):
+        self.jitter = jitter
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.jitter = self.jitter
+        return retry
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return backoff + random.uniform(0, self.jitter) if backoff > 0 else backoff
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if _pool is not None:
+            http_client.record(_pool.host, 'retries')
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class _TimedConnectionMixin:
+    """Mesure la durée d'établissement des connexions (TCP + TLS)"""
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        http_client.record_handshake(self.host, time.perf_counter() - started)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+
+class HttpClient:
+    """Session requests partagée (une par processus) pour tous les appels amont
+
+    - pool de connexions keep-alive par hôte (pool_maxsize connexions)
+    - retries bornés sur erreurs de connexion et 502/503/504, backoff avec gigue
+      (pas de retry sur timeout de lecture ni sur 429)
+    - au plus max_concurrency requêtes simultanées par hôte
+    """
+
+    def __init__(self, pool_maxsize: int = 10, max_concurrency: int = 4, host_concurrency: Dict = None,
+                 retries: int = 2, backoff: float = 0.3, jitter: float = 0.3):
+        self.pool_maxsize = pool_maxsize
+        self.max_concurrency = max_concurrency
+        self.host_concurrency = host_concurrency or {}
+        self.retries = retries
+        self.backoff = backoff
+        self.jitter = jitter
+        self._session = None
+        self._pid = None
+        self._semaphores = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _get_session(self) -> requests.Session:
+        """Session créée paresseusement, recréée après fork (connexions non partagées)"""
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                retry = JitteredRetry(total=self.retries, connect=self.retries, read=0,
+                                      status=self.retries, status_forcelist=(502, 503, 504),
+                                      allowed_methods=frozenset({'GET'}), backoff_factor=self.backoff,
+                                      respect_retry_after_header=True, raise_on_status=False,
+                                      jitter=self.jitter)
+                adapter = _TimedAdapter(pool_connections=16, pool_maxsize=self.pool_maxsize, max_retries=retry)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._pid = os.getpid()
+            return self._session
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                limit = self.host_concurrency.get(host, self.max_concurrency)
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(limit)
+            return semaphore
+
+    def get(self, url: str, params: Dict = None, headers: Dict = None, timeout: float = 10) -> requests.Response:
+        """GET via le pool partagé (mêmes exceptions que requests.get)"""
+        host = urlsplit(url).hostname
+        wait_timeout = timeout[0] if isinstance(timeout, tuple) else timeout
+        semaphore = self._semaphore(host)
+        if not semaphore.acquire(timeout=wait_timeout):
+            self.record(host, 'throttled')
+            raise requests.exceptions.ConnectionError(f"Trop de requêtes simultanées vers {host}")
+        started = time.perf_counter()
+        try:
+            response = self._get_session().get(url, params=params, headers=headers, timeout=timeout)
+            self.record(host, 'requests', time.perf_counter() - started)
+            if response.status_code >= 400:
+                self.record(host, 'http_errors')
+            rate_limiter.observe(host, response.status_code, response.headers.get('Retry-After'))
+            return response
+        except Exception:
+            self.record(host, 'errors', time.perf_counter() - started)
+            raise
+        finally:
+            semaphore.release()
+
+    def _host_stats(self, host: str) -> Dict:
+        return self._stats.setdefault(host, {'requests': 0, 'errors': 0, 'http_errors': 0, 'retries': 0,
+                                             'throttled': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                             'connections': 0, 'handshake_ms': 0.0})
+
+    def record(self, host: str, counter: str, duration: float = None):
+        with self._lock:
+            stats = self._host_stats(host)
+            stats[counter] += 1
+            if duration is not None:
+                ms = duration * 1000
+                stats['total_ms'] += ms
+                stats['max_ms'] = max(stats['max_ms'], ms)
+
+    def record_handshake(self, host: str, duration: float):
+        with self._lock:
+            stats = self._host_stats(host)
+            stats['connections'] += 1
+            stats['handshake_ms'] += duration * 1000
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            hosts = {host: dict(stats) for host, stats in self._stats.items()}
+        for host, stats in hosts.items():
+            calls = stats['requests'] + stats['errors']
+            stats['avg_ms'] = round(stats.pop('total_ms') / calls, 1) if calls else 0.0
+            stats['max_ms'] = round(stats['max_ms'], 1)
+            stats['avg_handshake_ms'] = round(stats.pop('handshake_ms') / stats['connections'], 1) if stats['connections'] else 0.0
+            stats['reused'] = max(0, stats['requests'] - stats['connections'])
+            stats['concurrency_limit'] = self.host_concurrency.get(host, self.max_concurrency)
+        return hosts
+
+
+http_client = HttpClient(
+    pool_maxsize=config.HTTP_POOL_MAXSIZE,
+    max_concurrency=config.HTTP_MAX_CONCURRENCY_PER_HOST,
+    host_concurrency=config.HTTP_HOST_CONCURRENCY,
+    retries=config.HTTP_RETRIES,
+    backoff=config.HTTP_RETRY_BACKOFF,
+    jitter=config.HTTP_RETRY_JITTER
+)
+
+
+# ===== EXÉCUTEUR I/O PARTAGÉ =====
+
+class IOExecutor:
+    """Pool de threads unique (par processus) pour les appels amont en parallèle
+
+    - max_workers threads au plus, créés à la demande
+    - au-delà de max_queue tâches en attente, ou si l'appelant est déjà un
+      worker (pas d'interblocage sur les appels imbriqués), la tâche est
+      exécutée directement dans le thread appelant
+    - les tâches s'exécutent dans une copie du contexte de l'appelant
+      (contextvars : contexte d'application Flask, flask.g)
+    - statistiques par nom de tâche (durée moyenne / max, erreurs)
+    """
+
+    def __init__(self, max_workers: int = 16, max_queue: int = 64):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queued = 0
+        self._running = 0
+        self.stats = {'submitted': 0, 'inline': 0, 'completed': 0, 'errors': 0,
+                      'max_queue_depth': 0, 'total_wait_ms': 0.0}
+        self._tasks = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='io-worker')
+                self._pid = os.getpid()
+                self._queued = self._running = 0
+            return self._executor
+
+    def submit(self, name: str, fn: Callable, *args, **kwargs) -> Future:
+        """Soumet fn(*args, **kwargs) ; retourne un Future (déjà résolu si exécuté en ligne)"""
+        executor = self._get_executor()
+        with self._lock:
+            self.stats['submitted'] += 1
+            inline = getattr(self._local, 'worker', False) or self._queued >= self.max_queue
+            if inline:
+                self.stats['inline'] += 1
+            else:
+                self._queued += 1
+                self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self._queued)
+        if not inline:
+            return executor.submit(contextvars.copy_context().run, self._run, name, time.perf_counter(), fn, args, kwargs)
+
+        future = Future()
+        try:
+            future.set_result(self._timed(name, fn, args, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _run(self, name: str, queued_at: float, fn: Callable, args: Tuple, kwargs: Dict):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self.stats['total_wait_ms'] += (time.perf_counter() - queued_at) * 1000
+        self._local.worker = True
+        try:
+            return self._timed(name, fn, args, kwargs)
+        finally:
+            self._local.worker = False
+            with self._lock:
+                self._running -= 1
+
+    def _timed(self, name: str, fn: Callable, args: Tuple, kwargs: Dict):
+        started = time.perf_counter()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.stats['errors' if failed else 'completed'] += 1
+                task = self._tasks.setdefault(name, {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                task['calls'] += 1
+                task['errors'] += failed
+                task['total_ms'] += ms
+                task['max_ms'] = max(task['max_ms'], ms)
+
+    def gather(self, calls: Dict[str, Tuple], timeout: float = None) -> Dict[str, Any]:
+        """Lance toutes les tâches {nom: (fn, *args)} en même temps et attend la dernière
+
+        Les exceptions sont propagées (comme Future.result()).
+        """
+        futures = {name: self.submit(name, call[0], *call[1:]) for name, call in calls.items()}
+        wait(futures.values(), timeout=timeout)
+        return {name: future.result(timeout=0) for name, future in futures.items()}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            tasks = {name: dict(task) for name, task in self._tasks.items()}
+            stats.update({'queue_depth': self._queued, 'running': self._running,
+                          'max_workers': self.max_workers, 'max_queue': self.max_queue})
+        queued = stats['submitted'] - stats['inline']
+        stats['avg_wait_ms'] = round(stats.pop('total_wait_ms') / queued, 1) if queued else 0.0
+        for task in tasks.values():
+            task['avg_ms'] = round(task.pop('total_ms') / task['calls'], 1) if task['calls'] else 0.0
+            task['max_ms'] = round(task['max_ms'], 1)
+        stats['tasks'] = tasks
+        return stats
+
+
+io_executor = IOExecutor(max_workers=config.IO_EXECUTOR_WORKERS, max_queue=config.IO_EXECUTOR_MAX_QUEUE)
+# Pool distinct pour les courses entre sources (lancées depuis les workers d'io_executor)
+hedge_executor = IOExecutor(max_workers=config.HEDGE_EXECUTOR_WORKERS, max_queue=config.IO_EXECUTOR_MAX_QUEUE)
+
+
+# ===== DISJONCTEURS ET CACHE NÉGATIF =====
+
+
+class CircuitBreaker:
+    """Disjoncteur d'une source amont
+
+    - fermé : les appels passent, les échecs consécutifs sont comptés
+    - ouvert : après failure_threshold échecs, les appels sont refusés
+      pendant recovery_timeout secondes
+    - semi-ouvert : une seule sonde est autorisée ; succès → fermé,
+      échec → ouvert à nouveau
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'successes': 0, 'failures': 0, 'rejected': 0,
+                      'negative_hits': 0, 'opened': 0}
+
+    def allow(self) -> bool:
+        """True si un appel amont peut être tenté maintenant"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.stats['rejected'] += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.stats['rejected'] += 1
+                    return False
+                self._probe_in_flight = True
+            self.stats['calls'] += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"🔌 Disjoncteur '{self.name}' refermé")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self.stats['successes'] += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.stats['failures'] += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats['opened'] += 1
+                    print(f"🔌 Disjoncteur '{self.name}' ouvert pour {self.recovery_timeout:.0f}s "
+                          f"({self.consecutive_failures} échecs consécutifs)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Appel autorisé par allow() sans issue imputable à la source (budget épuisé, 429)
+
+        Libère la sonde semi-ouverte : sans cela, plus aucun appel ne serait autorisé.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+            self.stats['calls'] -= 1
+
+    def record_negative_hit(self):
+        with self._lock:
+            self.stats['negative_hits'] += 1
+
+    def info(self) -> Dict:
+        with self._lock:
+            info = {**self.stats, 'state': self.state,
+                    'consecutive_failures': self.consecutive_failures}
+            if self.state == self.OPEN:
+                info['retry_in_seconds'] = round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+            return info
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Disjoncteur (partagé par le processus) de la source name"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name, config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RECOVERY_TIMEOUT)
+        return breaker
+
+
+def call_upstream(name: str, fn: Callable, *args, negative_params: Dict = None,
+                  is_success: Callable[[Any], bool] = None, **kwargs) -> Optional[Any]:
+    """Appelle fn via le disjoncteur de la source name
+
+    Retourne None sans appeler fn si le disjoncteur est ouvert ou si un échec
+    récent est en cache négatif pour negative_params. Un résultat refusé par
+    is_success (par défaut : None) compte comme un échec.
+    """
+    breaker = get_breaker(name)
+    negative_key = {'source': name, **negative_params} if negative_params is not None else None
+    if negative_key is not None and cache.get('negative', negative_key):
+        breaker.record_negative_hit()
+        return None
+    if not breaker.allow():
+        return None
+    if not rate_limiter.acquire(name):
+        # Budget épuisé : pas un échec de la source, le disjoncteur n'est pas touché
+        breaker.release()
+        return None
+
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        print(f"⚠️ Source {name}: {e}")
+        result = None
+
+    if (is_success(result) if is_success else result is not None):
+        breaker.record_success()
+        return result
+
+    breaker.record_failure()
+    if negative_key is not None:
+        cache.set('negative', negative_key, {'failed_at': time.time()}, ttl=config.NEGATIVE_CACHE_TTL)
+    return None
+
+
+def has_value(result: Optional[Dict]) -> bool:
+    """Critère de succès des mesures {'value': ...} (SST, chlorophylle)"""
+    return bool(result and result.get('value'))
+
+
+# ===== REGISTRE DES SOURCES (CASCADES ADAPTATIVES) =====
+
+class SourceHealth:
+    """Latence et taux de succès glissants (moyennes exponentielles) d'une étape de cascade"""
+
+    def __init__(self, name: str, alpha: float = 0.2):
+        self.name = name
+        self.alpha = alpha
+        self.latency = None  # secondes
+        self.success_rate = 1.0
+        self.samples = 0
+        self.skipped = 0
+        self.wins = 0
+        self.last_attempt = 0.0
+
+    def record(self, duration: float, ok: bool):
+        self.samples += 1
+        self.last_attempt = time.monotonic()
+        self.latency = duration if self.latency is None else self.latency + self.alpha * (duration - self.latency)
+        self.success_rate += self.alpha * ((1.0 if ok else 0.0) - self.success_rate)
+
+    def info(self) -> Dict:
+        return {'samples': self.samples, 'skipped': self.skipped, 'wins': self.wins,
+                'avg_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+                'success_rate': round(self.success_rate, 3)}
+
+
+class SourceRegistry:
+    """Ordonne les cascades multi-sources selon la santé observée de chaque source
+
+    L'ordre de qualité fourni est conservé tant que les sources sont saines
+    (taux de succès >= min_success). Une source défaillante passe après les
+    autres, et une source dont la latence habituelle dépasse le budget restant
+    de la requête est sautée. Une source écartée est retentée en priorité au
+    plus tard toutes les probe_interval secondes pour constater son rétablissement.
+    """
+
+    def __init__(self, alpha: float = 0.2, min_success: float = 0.5, min_samples: int = 3,
+                 probe_interval: float = 60.0):
+        self.alpha = alpha
+        self.min_success = min_success
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self._sources: Dict[str, SourceHealth] = {}
+        self._lock = threading.Lock()
+
+    def health(self, key: str) -> SourceHealth:
+        with self._lock:
+            health = self._sources.get(key)
+            if health is None:
+                health = self._sources[key] = SourceHealth(key, self.alpha)
+            return health
+
+    def _probe_due(self, health: SourceHealth) -> bool:
+        return time.monotonic() - health.last_attempt >= self.probe_interval
+
+    def is_healthy(self, health: SourceHealth) -> bool:
+        return health.samples < self.min_samples or health.success_rate >= self.min_success
+
+    def order(self, cascade: str, names: List[str]) -> List[str]:
+        """Sources saines (ou à sonder) dans l'ordre de qualité, puis les autres par fiabilité"""
+        healths = {name: self.health(f"{cascade}:{name}") for name in names}
+        healthy = [name for name in names if self.is_healthy(healths[name]) or self._probe_due(healths[name])]
+        degraded = [name for name in names if name not in healthy]
+        degraded.sort(key=lambda name: (-healths[name].success_rate, healths[name].latency or 0.0))
+        return healthy + degraded
+
+    def cascade(self, cascade: str, steps: List[Tuple[str, Callable[[], Any]]], budget: float = None,
+                is_success: Callable[[Any], bool] = None) -> Tuple[Optional[str], Optional[Any]]:
+        """Exécute les étapes (nom, fn) jusqu'au premier succès dans la limite de budget secondes
+
+        Retourne (nom de la source, résultat) ou (None, None).
+        """
+        steps = dict(steps)
+        started = time.monotonic()
+        for name in self.order(cascade, list(steps)):
+            health = self.health(f"{cascade}:{name}")
+            remaining = budget - (time.monotonic() - started) if budget else None
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                if health.latency is not None and health.latency > remaining and not self._probe_due(health):
+                    health.skipped += 1
+                    continue
+            call_started = time.monotonic()
+            try:
+                result = steps[name]()
+            except Exception as e:
+                print(f"⚠️ Source {cascade}:{name}: {e}")
+                result = None
+            ok = is_success(result) if is_success else result is not None
+            health.record(time.monotonic() - call_started, ok)
+            if ok:
+                health.wins += 1
+                return name, result
+        return None, None
+
+    def race(self, cascade: str, steps: List[Tuple[str, Callable[[], Any]]], deadline: float,
+             stagger: float = 0.0, grace: float = 2.0, is_success: Callable[[Any], bool] = None,
+             executor: 'IOExecutor' = None) -> Tuple[Optional[str], Optional[Any]]:
+        """Mode couvert : étapes lancées en parallèle, meilleure réponse valide avant deadline
+
+        Les sources partent dans l'ordre de order(), décalées de stagger secondes
+        (la suivante part aussitôt si toutes les lancées ont échoué). Une réponse
+        valide est retenue dès que toutes les sources mieux classées ont échoué ;
+        sinon les mieux classées ont encore grace secondes pour répondre.
+        Les réponses tardives sont ignorées (elles restent comptées dans les statistiques).
+        """
+        executor = executor or hedge_executor
+        steps = dict(steps)
+        names = self.order(cascade, list(steps))
+        futures: Dict[str, Future] = {}
+
+        def attempt(name):
+            health = self.health(f"{cascade}:{name}")
+            call_started = time.monotonic()
+            try:
+                result = steps[name]()
+            except Exception as e:
+                print(f"⚠️ Source {cascade}:{name}: {e}")
+                result = None
+            ok = is_success(result) if is_success else result is not None
+            health.record(time.monotonic() - call_started, ok)
+            return result if ok else None
+
+        def best(final: bool):
+            """Meilleure réponse décidable (toutes les mieux classées terminées en échec)"""
+            for name in names:
+                future = futures.get(name)
+                if future is None or not future.done():
+                    if not final:
+                        return None
+                    continue
+                if future.result() is not None:
+                    return name
+            return None
+
+        started = time.monotonic()
+        end = started + deadline
+        next_launch = started
+        while True:
+            now = time.monotonic()
+            if len(futures) < len(names) and (now >= next_launch or all(f.done() for f in futures.values())):
+                name = names[len(futures)]
+                futures[name] = executor.submit(f"{cascade}:{name}", attempt, name)
+                next_launch = now + stagger
+                continue
+            winner = best(final=False)
+            if winner or now >= end or (len(futures) == len(names) and all(f.done() for f in futures.values())):
+                break
+            # Une réponse valide moins bien classée : délai de grâce pour les meilleures
+            if any(f.done() and f.result() is not None for f in futures.values()):
+                end = min(end, now + grace)
+            pending = [f for f in futures.values() if not f.done()]
+            timeout = min(end, next_launch) - now if len(futures) < len(names) else end - now
+            wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+
+        winner = winner or best(final=True)
+        if winner is None:
+            return None, None
+        self.health(f"{cascade}:{winner}").wins += 1
+        return winner, futures[winner].result()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            sources = list(self._sources.values())
+        return {health.name: {**health.info(), 'healthy': self.is_healthy(health)} for health in sources}
+
+
+# Instance globale
+source_registry = SourceRegistry(min_success=config.SOURCE_MIN_SUCCESS_RATE,
+                                 probe_interval=config.SOURCE_PROBE_INTERVAL)
+
+
+def get_upstream_stats() -> Dict:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.info() for breaker in breakers}
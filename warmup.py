@@ -0,0 +1,117 @@
+# warmup.py
+"""
+Préchauffage du cache pour les spots les plus demandés
+Météo, données marines, bathymétrie et prédictions par espèce calculées
+avant l'arrivée des premiers utilisateurs, dans la limite des quotas d'API
+"""
+import time
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class CacheWarmer:
+    """Exécute warm_spot(spot, species) pour chaque spot/espèce, en arrière-plan
+
+    - quota_ok() est consulté avant chaque spot : la passe s'arrête dès que
+      la part de quota réservée au préchauffage est consommée
+    - delay espace les spots (politesse envers les API gratuites)
+    - claim_run(slot) permet de ne lancer qu'une passe par créneau pour
+      l'ensemble des workers (créneau = interval, ou boot_window au démarrage)
+    - prefetch(spots) est appelé une fois en début de passe pour remplir le
+      cache en requêtes groupées (multi-positions) avant le traitement spot par spot
+    """
+
+    def __init__(self, warm_spot: Callable, quota_ok: Callable[[], bool],
+                 claim_run: Optional[Callable[[int], bool]] = None, delay: float = 1.0,
+                 boot_window: float = 600, prefetch: Optional[Callable[[List[Dict]], Dict]] = None):
+        self.warm_spot = warm_spot
+        self.quota_ok = quota_ok
+        self.claim_run = claim_run
+        self.prefetch = prefetch
+        self.delay = delay
+        self.boot_window = boot_window
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.progress = {'status': 'idle', 'runs': 0, 'total': 0, 'done': 0, 'failed': 0,
+                         'skipped': 0, 'current': None, 'prefetch': None, 'started_at': None, 'finished_at': None}
+
+    def start(self, get_spots: Callable[[], List[Dict]], species: List[str],
+              interval: float = 0, exclusive: bool = True) -> bool:
+        """Lance le préchauffage (une fois, ou toutes les interval secondes si > 0)
+
+        exclusive=False ignore claim_run (lancement manuel).
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, args=(get_spots, species, interval, exclusive),
+                                            name='cache-warmup', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self, get_spots, species, interval, exclusive):
+        while True:
+            slot = int(time.time() // (interval or self.boot_window))
+            if not exclusive or self.claim_run is None or self.claim_run(slot):
+                try:
+                    self.run(get_spots(), species)
+                except Exception as e:
+                    self.progress['status'] = 'error'
+                    print(f"⚠️ Préchauffage cache: {e}")
+            else:
+                self.progress['status'] = 'skipped_other_worker'
+            if not interval or self._stop.wait(interval - time.time() % interval):
+                return
+
+    def run(self, spots: List[Dict], species: List[str]) -> Dict:
+        """Préchauffe tous les spots pour toutes les espèces (appel bloquant)"""
+        progress = self.progress
+        progress.update({'status': 'running', 'total': len(spots) * len(species), 'done': 0,
+                         'failed': 0, 'skipped': 0, 'current': None,
+                         'started_at': datetime.now().isoformat(), 'finished_at': None})
+        print(f"🔥 Préchauffage cache: {len(spots)} spots x {len(species)} espèces")
+        if self.prefetch and spots:
+            try:
+                progress['prefetch'] = self.prefetch(spots)
+            except Exception as e:
+                print(f"⚠️ Préchargement groupé: {e}")
+        for index, spot in enumerate(spots):
+            if self._stop.is_set():
+                progress['status'] = 'stopped'
+                break
+            if not self.quota_ok():
+                progress['skipped'] = (len(spots) - index) * len(species)
+                progress['status'] = 'quota_reached'
+                print(f"⏸️ Préchauffage interrompu (quota): {progress['done']} prédictions prêtes")
+                break
+            progress['current'] = spot.get('name')
+            for code in species:
+                try:
+                    self.warm_spot(spot, code)
+                    progress['done'] += 1
+                except Exception as e:
+                    progress['failed'] += 1
+                    print(f"⚠️ Préchauffage {spot.get('name')} / {code}: {e}")
+            if self.delay and index < len(spots) - 1:
+                self._stop.wait(self.delay)
+        else:
+            progress['status'] = 'done'
+        progress['current'] = None
+        progress['runs'] += 1
+        progress['finished_at'] = datetime.now().isoformat()
+        if progress['status'] == 'done':
+            print(f"✅ Préchauffage terminé: {progress['done']}/{progress['total']} prédictions")
+        return dict(progress)
+
+    def get_progress(self) -> Dict:
+        progress = dict(self.progress)
+        total = progress['total']
+        progress['percent'] = round(100 * (progress['done'] + progress['failed']) / total, 1) if total else 0.0
+        progress['running'] = self._thread is not None and self._thread.is_alive()
+        return progress
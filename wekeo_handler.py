@@ -9,13 +9,13 @@ import tempfile
 import os
 import shutil
 from typing import Optional, Dict, Tuple
-import hashlib
-import json
-import time
 import math
-import requests
 import logging
 
+from cache_manager import cache, position_params, single_flight, snap_to_grid
+from upstream import call_upstream
+from openmeteo_client import openmeteo
+
 # Configurer un logger silencieux
 logging.getLogger("hda").setLevel(logging.WARNING)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
@@ -54,8 +54,6 @@ class WekeoEnhancedHandler:
         self.username = os.getenv('WEKEO_USERNAME', 'aminech')
         self.password = os.getenv('WEKEO_PASSWORD', 'Nour2024')
         self.client = None
-        self.cache_dir = os.path.join(os.path.dirname(__file__), 'data', 'wekeo_cache')
-        os.makedirs(self.cache_dir, exist_ok=True)
         
         # Datasets optimisés
         self.datasets = {
@@ -154,11 +152,16 @@ class WekeoEnhancedHandler:
         """
         Récupère les données de vent avec cascade intelligente
         1. WEkEO → 2. Open-Meteo → 3. Modèle climatique
+        Les appels concurrents pour la même position partagent un seul appel amont.
         """
-        cache_key = self._get_cache_key('wind', lat, lon)
+        return single_flight.do(('wind',) + snap_to_grid('wind', lat, lon), self._fetch_wind_data, lat, lon)
+    
+    def _fetch_wind_data(self, lat: float, lon: float) -> Optional[Dict]:
+        """Cascade vent effective (exécutée par le leader single-flight)"""
+        cache_params = position_params('wind', lat, lon)
         
-        # Vérifier cache (1 heure)
-        cached = self._load_from_cache(cache_key)
+        # Vérifier cache (TTL du namespace 'wind')
+        cached = cache.get('wind', cache_params)
         if cached:
             print(f"💾 Vent depuis cache: {cached.get('source', 'cache')}")
             return cached
@@ -166,20 +169,20 @@ class WekeoEnhancedHandler:
         print(f"🌬️  Récupération vent pour ({lat:.3f}, {lon:.3f})")
         
         # 1. Essayer WEkEO
-        wekeo_data = self._try_wekeo_wind(lat, lon)
+        wekeo_data = call_upstream('wekeo', self._try_wekeo_wind, lat, lon) if self.client else None
         if wekeo_data:
-            self._save_to_cache(cache_key, wekeo_data)
+            cache.set('wind', cache_params, wekeo_data)
             return wekeo_data
         
         # 2. Essayer Open-Meteo (fallback fiable)
         om_data = self._try_openmeteo_wind(lat, lon)
         if om_data:
-            self._save_to_cache(cache_key, om_data)
+            cache.set('wind', cache_params, om_data)
             return om_data
         
         # 3. Modèle climatique (dernier recours)
         model_data = self._get_climatic_wind(lat, lon)
-        self._save_to_cache(cache_key, model_data)
+        cache.set('wind', cache_params, model_data)
         return model_data
     
     def _try_wekeo_wind(self, lat: float, lon: float) -> Optional[Dict]:
@@ -242,36 +245,21 @@ class WekeoEnhancedHandler:
         return None
     
     def _try_openmeteo_wind(self, lat: float, lon: float) -> Optional[Dict]:
-        """Open-Meteo fallback (rapide et fiable)"""
-        try:
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                'latitude': lat,
-                'longitude': lon,
-                'current': 'wind_speed_10m,wind_direction_10m',
-                'timezone': 'Africa/Tunis'
-            }
-            
-            print("  🌐 Requête Open-Meteo...")
-            response = requests.get(url, params=params, timeout=3)
-            
-            if response.status_code == 200:
-                data = response.json()['current']
-                wind_data = {
-                    'wind_speed_kmh': data['wind_speed_10m'],
-                    'wind_direction_deg': data['wind_direction_10m'],
-                    'wind_speed_ms': round(data['wind_speed_10m'] / 3.6, 1),
-                    'source': 'Open-Meteo',
-                    'quality': 'medium',
-                    'resolution': '11km'
-                }
-                print(f"  ✅ Vent Open-Meteo: {data['wind_speed_10m']} km/h")
-                return wind_data
-                
-        except Exception as e:
-            print(f"  ⚠️  Open-Meteo erreur: {e}")
+        """Open-Meteo fallback (tranche de la requête Open-Meteo mutualisée)"""
+        wind = openmeteo.current_wind(lat, lon)
+        if not wind:
+            return None
         
-        return None
+        wind_data = {
+            'wind_speed_kmh': wind['wind_speed_kmh'],
+            'wind_direction_deg': wind['wind_direction_deg'],
+            'wind_speed_ms': round(wind['wind_speed_kmh'] / 3.6, 1),
+            'source': 'Open-Meteo',
+            'quality': 'medium',
+            'resolution': '11km'
+        }
+        print(f"  ✅ Vent Open-Meteo: {wind['wind_speed_kmh']} km/h")
+        return wind_data
     
     def _get_climatic_wind(self, lat: float, lon: float) -> Dict:
         """Modèle climatique réaliste Tunisie"""
@@ -330,39 +318,6 @@ class WekeoEnhancedHandler:
     
     # ===== FONCTIONS UTILITAIRES =====
     
-    def _get_cache_key(self, data_type: str, lat: float, lon: float) -> str:
-        """Génère une clé de cache"""
-        hour_block = datetime.now().hour // 3
-        key_str = f"{data_type}_{lat:.2f}_{lon:.2f}_{hour_block}"
-        return hashlib.md5(key_str.encode()).hexdigest()[:10]
-    
-    def _load_from_cache(self, cache_key: str) -> Optional[Dict]:
-        """Charge depuis cache"""
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    data = json.load(f)
-                if time.time() - data.get('timestamp', 0) < 3600:  # 1 heure
-                    return data.get('data')
-            except:
-                pass
-        return None
-    
-    def _save_to_cache(self, cache_key: str, data: Dict):
-        """Sauvegarde en cache"""
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-        try:
-            cache_data = {
-                'data': data,
-                'timestamp': time.time(),
-                'expires': time.time() + 3600
-            }
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
-        except:
-            pass
-    
     def _adjust_for_sea(self, lat: float, lon: float) -> Tuple[float, float]:
         """Ajuste position pour être en mer"""
         adjusted_lon = lon + 0.15